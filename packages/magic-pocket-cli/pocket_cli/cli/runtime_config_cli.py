@@ -9,6 +9,7 @@ from pathlib import Path
 
 import click
 
+from pocket.context_snapshot import CONTEXT_SNAPSHOT_FILENAME, write_context_snapshot
 from pocket.utils import GENERATOR_VERSION_MARKER, get_toml_path
 
 if sys.version_info >= (3, 11):
@@ -250,9 +251,12 @@ def generate_runtime_config(output_path: Path) -> None:
 
     runtime が INIT で読むファイルのため、strict な umask 環境でも
     other-read を保証する (context_check がエラーにする条件を自ら作らない)。
+    隣に検証済み Context の snapshot (pocket.runtime.context.pickle) も書き出す。
+    runtime は snapshot が使える限り pocket.runtime.toml の再検証を省く。
     """
     output_path.write_text(_runtime_config_str())
     output_path.chmod(0o644)
+    write_context_snapshot(output_path)
 
 
 @click.command("runtime-config")
@@ -270,3 +274,7 @@ def runtime_config(output: str):
     else:
         generate_runtime_config(Path(output))
         click.echo("runtime-config を出力しました: %s" % output)
+        click.echo(
+            "context snapshot を出力しました: %s"
+            % Path(output).with_name(CONTEXT_SNAPSHOT_FILENAME)
+        )
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import base64
+import json
 import secrets
+from functools import cached_property
 from typing import TYPE_CHECKING, Literal
 
+from pocket.runtime import build_resource_manifest
 from pocket.utils import echo
 from pocket_cli import migrations
 from pocket_cli.resources.neon import Neon, NeonResourceIsNotReady
@@ -23,6 +26,19 @@ class Mediator:
     def __init__(self, context: Context) -> None:
         self.context = context
 
+    @cached_property
+    def resource_manifest(self) -> str:
+        """stage 全体の discovery manifest (JSON)。
+
+        全 container の Lambda env に同じものを載せるため、deploy 中 1 回だけ
+        解決する。post-deploy (全 stack 作成/更新後) に参照されること。
+        """
+        return json.dumps(
+            build_resource_manifest(self.context),
+            separators=(",", ":"),
+            sort_keys=True,
+        )
+
     def _conditional_error(self, level: ErrorLevel, msg: str):
         if level == "ignore":
             return
@@ -7,6 +7,7 @@ import boto3
 
 from pocket import context
 from pocket.resources.base import ResourceStatus
+from pocket.runtime import RESOURCE_MANIFEST_ENV
 from pocket.utils import echo
 from pocket_cli.cli.runtime_config_cli import generate_runtime_config
 from pocket_cli.mediator import Mediator
@@ -25,6 +26,14 @@ if TYPE_CHECKING:
     )
 
 
+# Lambda の環境変数はキーと値の合計で 4KB まで
+LAMBDA_ENV_SIZE_LIMIT = 4 * 1024
+
+
+def _lambda_env_size(env: dict[str, str]) -> int:
+    return sum(len(k.encode()) + len(v.encode()) for k, v in env.items())
+
+
 class NotCreatedYetError(Exception):
     pass
 
@@ -237,7 +246,7 @@ class Container:
         self.ensure_post_deploy_state()
 
     def ensure_post_deploy_state(self, mediator: Mediator | None = None):
-        """deploy 完了後に Lambda env の DEPLOY_HASH を冪等に同期する。
+        """deploy 完了後に Lambda env の DEPLOY_HASH / manifest を冪等に同期する。
 
         LambdaHandler.update() は update_function_code (code) のみで Environment を
         更新しない。Lambda env は CFn stack.update() 経由でしか書き換わらないため、
@@ -250,24 +259,55 @@ class Container:
         状態によらず side-channel で冪等に同期する (reload-env / waf ip と同様)。
         deploy_resources の post-deploy hook からも呼ばれるため、wait_status が
         timeout して次 deploy で update() がスキップされた場合でも自己治癒する。
+
+        mediator 付き (deploy_resources の post-deploy hook) では、全 stack 作成後の
+        discovery 結果 (RESOURCE_MANIFEST_ENV) も載せる。API endpoint は自 stack の
+        output なので CFn の Environment からは参照できない (循環参照になる)。
+        CFn の stack 更新で消えても次の post-deploy で戻り、その間 runtime は
+        AWS への問い合わせに fallback する。
         """
+        desired: dict[str, str] = {}
         deploy_hash = self.context.envs.get("DEPLOY_HASH")
-        if not deploy_hash:
+        if deploy_hash:
+            desired["DEPLOY_HASH"] = deploy_hash
+        if mediator is not None:
+            desired[RESOURCE_MANIFEST_ENV] = mediator.resource_manifest
+        if not desired:
             return
         for key, handler in self.handlers.items():
             if handler.status == "NOEXIST":
                 continue
             current = handler.get_environment()
-            if current.get("DEPLOY_HASH") == deploy_hash:
+            new_env = {**current, **desired}
+            if _lambda_env_size(new_env) > LAMBDA_ENV_SIZE_LIMIT:
+                # manifest は最適化でしかないので、載らなければ外して live
+                # discovery に任せる (古い manifest も残さない)
+                echo.warning(
+                    "[%s] Lambda env が 4KB を超えるため %s を設定しません"
+                    % (key, RESOURCE_MANIFEST_ENV)
+                )
+                new_env.pop(RESOURCE_MANIFEST_ENV, None)
+            if new_env == current:
                 continue
-            echo.log(
-                "[%s] Lambda env DEPLOY_HASH を同期します (%s → %s)"
-                % (key, current.get("DEPLOY_HASH"), deploy_hash)
-            )
-            handler.update_environment({**current, "DEPLOY_HASH": deploy_hash})
+            if current.get("DEPLOY_HASH") != new_env.get("DEPLOY_HASH"):
+                echo.log(
+                    "[%s] Lambda env DEPLOY_HASH を同期します (%s → %s)"
+                    % (key, current.get("DEPLOY_HASH"), deploy_hash)
+                )
+            if current.get(RESOURCE_MANIFEST_ENV) != new_env.get(RESOURCE_MANIFEST_ENV):
+                echo.log(
+                    "[%s] Lambda env %s を同期します" % (key, RESOURCE_MANIFEST_ENV)
+                )
+            handler.update_environment(new_env)
 
     def get_host(self, key: str):
         handler = self.handlers[key]
+        if handler.context.function_url is not None:
+            function_url_key = key.capitalize() + "FunctionUrl"
+            if self.stack.output and function_url_key in self.stack.output:
+                url = self.stack.output[function_url_key]
+                return url[len("https://") :].rstrip("/")
+            raise NotCreatedYetError(f"Function URL for {key} is not created yet.")
         if handler.context.apigateway is None:
             raise NoApiEndpointError(f"ApiGateway is not defined in {key}")
         if handler.context.apigateway.domain:
@@ -0,0 +1,188 @@
+"""API Gateway (HTTP API, payload v2) の event を ASGI app に渡す Lambda handler。
+
+WSGI の handler では async view が ``async_to_sync`` で呼び出しごとに新しい event
+loop を作る。`AsgiLambdaHandler` は 1 つの event loop を warm な invocation の間で
+使い回すので、lifespan の startup で作った DB pool や HTTP client (loop に紐づく)
+を次の request でもそのまま使え、view の中で ``asyncio.gather`` による上流 API への
+並行呼び出しもできる。
+
+応答の組み立て (圧縮・base64 の判定) は `pocket.apigw_wsgi` と共通。
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Iterable
+from typing import Any, Literal
+from urllib.parse import unquote
+
+from pocket.apigw_wsgi import (
+    DEFAULT_NON_BINARY_CONTENT_TYPE_PREFIXES,
+    build_response,
+    choose_encoding,
+    get_body,
+)
+
+LifespanMode = Literal["auto", "on", "off"]
+
+
+class LifespanError(RuntimeError):
+    """lifespan の startup が失敗した (``lifespan.startup.failed``)。"""
+
+
+def get_scope(
+    event: dict[str, Any], context: Any, state: dict[str, Any]
+) -> dict[str, Any]:
+    """payload v2 の event から ASGI の http scope を作る。"""
+    http = event["requestContext"]["http"]
+    raw_path = event.get("rawPath") or "/"
+    headers: list[tuple[bytes, bytes]] = []
+    server_name, server_port, scheme = "", 443, "https"
+    for name, value in (event.get("headers") or {}).items():
+        if name == "host":
+            server_name = value
+        elif name == "x-forwarded-port":
+            server_port = int(value.rsplit(",", 1)[-1].strip())
+        elif name == "x-forwarded-proto":
+            scheme = value.rsplit(",", 1)[-1].strip()
+        headers.append((name.encode("latin-1"), value.encode("latin-1")))
+    cookies = event.get("cookies")
+    if cookies:
+        headers.append((b"cookie", "; ".join(cookies).encode("latin-1")))
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.3"},
+        "http_version": http["protocol"].rpartition("/")[2] or "1.1",
+        "method": http["method"],
+        "scheme": scheme,
+        "path": unquote(raw_path),
+        "raw_path": raw_path.encode(),
+        "query_string": event.get("rawQueryString", "").encode(),
+        "root_path": "",
+        "headers": headers,
+        "client": (http["sourceIp"], 0),
+        "server": (server_name, server_port),
+        # lifespan の startup が scope["state"] に入れた値を request ごとに浅く copy
+        "state": dict(state),
+        "aws.event": event,
+        "aws.context": context,
+    }
+
+
+class AsgiLambdaHandler:
+    """ASGI app を API Gateway (payload v2) の Lambda handler にする。
+
+    event loop は instance ごとに 1 つで、handler module の import 時 (INIT) に作り
+    lifespan の startup もそこで行う。lifespan は ``"auto"`` なら app が対応して
+    いない場合 (Django の ASGIHandler 等) に黙って無効にする。
+    """
+
+    def __init__(
+        self,
+        app,
+        *,
+        lifespan: LifespanMode = "auto",
+        non_binary_content_type_prefixes: Iterable[str] = (
+            DEFAULT_NON_BINARY_CONTENT_TYPE_PREFIXES
+        ),
+        compress_min_size: int | None = None,
+        offload: Callable[[dict[str, Any]], dict[str, Any]] | None = None,
+        compress_html: bool = False,
+    ) -> None:
+        self.app = app
+        self.text_prefixes = tuple(non_binary_content_type_prefixes)
+        self.compress_min_size = compress_min_size
+        self.compress_html = compress_html
+        self.offload = offload
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.state: dict[str, Any] = {}
+        self._lifespan_queue: asyncio.Queue[dict[str, Any]] | None = None
+        self._lifespan_task: asyncio.Task[None] | None = None
+        if lifespan != "off":
+            self.loop.run_until_complete(self._startup(lifespan == "on"))
+
+    def __call__(self, event: dict[str, Any], context: Any) -> dict[str, Any]:
+        if event.get("version") != "2.0":
+            raise ValueError("unsupported payload version: %r" % event.get("version"))
+        response = self.loop.run_until_complete(self._handle(event, context))
+        # S3 への put は blocking なので event loop の外で行う
+        return response if self.offload is None else self.offload(response)
+
+    async def _handle(self, event: dict[str, Any], context: Any) -> dict[str, Any]:
+        scope = get_scope(event, context, self.state)
+        request = {"type": "http.request", "body": get_body(event), "more_body": False}
+        response_done = asyncio.Event()
+        start: dict[str, Any] = {}
+        chunks: list[bytes] = []
+
+        async def receive() -> dict[str, Any]:
+            nonlocal request
+            if request is not None:
+                message, request = request, None
+                return message
+            # body は 1 回で渡し終えている。以降は応答を返し終えたら切断を通知する
+            await response_done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    response_done.set()
+
+        await self.app(scope, receive, send)
+        if not start:
+            raise RuntimeError("ASGI application did not send http.response.start")
+        headers = [
+            (name.decode("latin-1"), value.decode("latin-1"))
+            for name, value in start.get("headers", [])
+        ]
+        accept_encoding = (event.get("headers") or {}).get("accept-encoding")
+        return build_response(
+            start["status"],
+            headers,
+            b"".join(chunks),
+            encoding=choose_encoding(accept_encoding),
+            compress_min_size=self.compress_min_size,
+            text_prefixes=self.text_prefixes,
+            compress_html=self.compress_html,
+        )
+
+    async def _startup(self, required: bool) -> None:
+        queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        sent: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        await queue.put({"type": "lifespan.startup"})
+        scope = {
+            "type": "lifespan",
+            "asgi": {"version": "3.0", "spec_version": "2.0"},
+            "state": self.state,
+        }
+
+        async def run() -> None:
+            try:
+                await self.app(scope, queue.get, sent.put)
+            # lifespan 非対応の app は scope type の不一致で例外を投げる
+            except Exception as e:
+                await sent.put({"type": "lifespan.unsupported", "error": e})
+            # 何も返さずに終わる app も非対応として扱う (startup 後なら読まれない)
+            await sent.put({"type": "lifespan.unsupported"})
+
+        self._lifespan_task = self.loop.create_task(run())
+        message = await sent.get()
+        if message["type"] == "lifespan.startup.complete":
+            self._lifespan_queue = queue
+            return
+        if message["type"] == "lifespan.startup.failed":
+            raise LifespanError(message.get("message", ""))
+        if required:
+            raise LifespanError("ASGI application does not support lifespan")
+
+    def shutdown(self) -> None:
+        """lifespan の shutdown を送り、event loop を閉じる。"""
+        if self._lifespan_queue is not None and self._lifespan_task is not None:
+            self._lifespan_queue.put_nowait({"type": "lifespan.shutdown"})
+            self.loop.run_until_complete(self._lifespan_task)
+        self.loop.close()
@@ -0,0 +1,338 @@
+"""API Gateway (HTTP API, payload v2) の event を WSGI app に渡す adapter。
+
+pocket の container.yaml が作る API Gateway は常に payload v2 なので、v1 / ALB にも
+対応する apig_wsgi を経由せず、v2 の event から直接 environ を作る。
+
+- environ は dict literal 1 回で作る (header の正規化もこのループ 1 回だけ)
+- PATH_INFO は ``rawPath`` を bytes に percent-decode して latin-1 で str にする
+  (WSGI の規約どおり。非 ASCII を transcode し直す後処理が要らない)
+- ``wsgi.input`` の BytesIO は body の bytes を copy せずに共有する
+- 応答の body は text 系の content type なら str のまま返し、それ以外だけ base64 化する
+- text 系の応答は ``Accept-Encoding`` に応じて brotli / gzip で圧縮する (HTTP API は
+  応答を圧縮しないため。圧縮した body は binary なので base64 で返す)
+
+v2 以外の event (v1 / ALB) は ``fallback`` の handler (Django では apig_wsgi) に渡す。
+"""
+
+from __future__ import annotations
+
+import gzip
+import sys
+from base64 import b64decode, b64encode
+from collections.abc import Callable, Iterable
+from io import BytesIO
+from typing import Any
+from urllib.parse import unquote_to_bytes
+
+try:
+    import brotli  # type: ignore[import-not-found]
+except ImportError:
+    brotli = None
+
+DEFAULT_NON_BINARY_CONTENT_TYPE_PREFIXES = (
+    "text/",
+    "application/json",
+    "application/problem+json",
+    "application/vnd.api+json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+# 圧縮を有効にした時の既定の閾値。これより小さい body は圧縮しない (圧縮後の
+# base64 で却って大きくなりうる)
+DEFAULT_COMPRESS_MIN_SIZE = 1024
+# CSRF token 等の secret と利用者の入力が同じ応答に載る HTML は、圧縮後の長さから
+# secret を推測される (BREACH) ので、compress_html=True でなければ圧縮しない
+_HTML_CONTENT_TYPE = "text/html"
+# Lambda の CPU 時間と圧縮率の釣り合う level (最大の 11 / 9 は遅い)
+_BROTLI_QUALITY = 5
+_GZIP_LEVEL = 6
+# body を持たない status
+_NO_BODY_STATUSES = (204, 304)
+
+# environ に昇格させる header (HTTP_* に加えて CGI 変数にも入れる)
+_CONTENT_TYPE = "content-type"
+_CONTENT_LENGTH = "content-length"
+_HOST = "host"
+_X_FORWARDED_PROTO = "x-forwarded-proto"
+_X_FORWARDED_PORT = "x-forwarded-port"
+_COOKIE = "cookie"
+
+
+def decode_path(raw_path: str) -> str:
+    """``rawPath`` を WSGI の PATH_INFO (bytes を latin-1 で表した str) にする。
+
+    rawPath は通常 percent-encode されたままだが、生の非 ASCII が混じっていても
+    ``unquote_to_bytes`` が UTF-8 の bytes にするので、どちらも 1 回で正しくなる。
+    """
+    if "%" not in raw_path and raw_path.isascii():
+        return raw_path
+    return unquote_to_bytes(raw_path).decode("iso-8859-1")
+
+
+def get_body(event: dict[str, Any]) -> bytes:
+    body = event.get("body")
+    if not body:
+        return b""
+    if event.get("isBase64Encoded"):
+        return b64decode(body)
+    return body.encode()
+
+
+def get_environ(event: dict[str, Any], context: Any) -> dict[str, Any]:
+    """payload v2 の event から WSGI environ を作る。"""
+    body = get_body(event)
+    http = event["requestContext"]["http"]
+    cookies = event.get("cookies")
+    environ: dict[str, Any] = {
+        "REQUEST_METHOD": http["method"],
+        "SCRIPT_NAME": "",
+        "PATH_INFO": decode_path(event.get("rawPath") or "/"),
+        "QUERY_STRING": event.get("rawQueryString", ""),
+        "CONTENT_LENGTH": str(len(body)),
+        "REMOTE_ADDR": http["sourceIp"],
+        "SERVER_NAME": "",
+        "SERVER_PORT": "",
+        "SERVER_PROTOCOL": http["protocol"],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        # BytesIO に bytes を渡すと、書き込まれない限り copy せず共有される
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": False,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+        # apig_wsgi と同じ key (既存の app が参照していても動くように)
+        "apig_wsgi.request_context": event["requestContext"],
+        "apig_wsgi.full_event": event,
+        "apig_wsgi.context": context,
+    }
+    if cookies:
+        environ["HTTP_COOKIE"] = "; ".join(cookies)
+    for name, value in (event.get("headers") or {}).items():
+        # v2 の header 名は小文字で、複数値は "," で結合済み
+        if name == _CONTENT_TYPE:
+            environ["CONTENT_TYPE"] = value
+            continue
+        if name == _CONTENT_LENGTH:
+            continue
+        if name == _HOST:
+            environ["SERVER_NAME"] = value
+        elif name == _X_FORWARDED_PROTO:
+            environ["wsgi.url_scheme"] = value.rsplit(",", 1)[-1].strip()
+        elif name == _X_FORWARDED_PORT:
+            environ["SERVER_PORT"] = value.rsplit(",", 1)[-1].strip()
+        elif name == _COOKIE:
+            # cookies と header の両方にある場合 (手で作った event 等) は結合する
+            if cookies:
+                environ["HTTP_COOKIE"] += "; " + value
+                continue
+        environ["HTTP_" + name.upper().replace("-", "_")] = value
+    return environ
+
+
+def split_headers(
+    headers: Iterable[tuple[str, str]],
+) -> tuple[dict[str, str], list[str]]:
+    """WSGI の header 列を v2 応答の headers (小文字 key) と cookies に分ける。
+
+    同じ名前の header は "," で結合する (後勝ちで消さない)。
+    """
+    merged: dict[str, str] = {}
+    cookies: list[str] = []
+    for name, value in headers:
+        key = name.lower()
+        if key == "set-cookie":
+            cookies.append(value)
+        elif key in merged:
+            merged[key] += ", " + value
+        else:
+            merged[key] = value
+    return merged, cookies
+
+
+def _accepted_codings(accept_encoding: str) -> dict[str, float]:
+    codings: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        param = params.strip()
+        if param.startswith("q="):
+            try:
+                q = float(param[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            codings[name.strip().lower()] = q
+    return codings
+
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    """Accept-Encoding から使う coding を選ぶ (br を優先。どれも不可なら None)。"""
+    if not accept_encoding:
+        return None
+    codings = _accepted_codings(accept_encoding)
+    wildcard = codings.get("*", 0.0)
+    candidates = ("br", "gzip") if brotli is not None else ("gzip",)
+    for name in candidates:
+        if codings.get(name, wildcard) > 0:
+            return name
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        if brotli is None:
+            raise ValueError("br encoding requires the brotli package")
+        return brotli.compress(body, quality=_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=_GZIP_LEVEL, mtime=0)
+
+
+def _compress_response(
+    body: bytes,
+    status: int,
+    headers: dict[str, str],
+    encoding: str | None,
+    min_size: int | None,
+    text_prefixes: tuple[str, ...],
+    compress_html: bool = False,
+) -> bytes | None:
+    """圧縮できれば headers を書き換えて圧縮後の body を返す (しなければ None)。
+
+    圧縮済み (Content-Encoding 付き) や画像などの binary は対象外で、text 系の
+    content type だけを圧縮する。HTML は compress_html=True の時だけ圧縮する。
+    """
+    if min_size is None or len(body) < min_size or status in _NO_BODY_STATUSES:
+        return None
+    if not _is_text(headers, text_prefixes):
+        return None
+    if not compress_html and headers.get("content-type", "").startswith(
+        _HTML_CONTENT_TYPE
+    ):
+        return None
+    vary = headers.get("vary")
+    if vary is None:
+        headers["vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower() and vary.strip() != "*":
+        headers["vary"] = vary + ", Accept-Encoding"
+    if encoding is None:
+        return None
+    compressed = compress(body, encoding)
+    if len(compressed) >= len(body):
+        return None
+    headers["content-encoding"] = encoding
+    if "content-length" in headers:
+        headers["content-length"] = str(len(compressed))
+    # 圧縮後の body は byte 単位では別物なので、Django の GZipMiddleware と同じく
+    # strong ETag を weak にする
+    etag = headers.get("etag")
+    if etag and etag.startswith('"'):
+        headers["etag"] = "W/" + etag
+    return compressed
+
+
+def make_lambda_handler(
+    app,
+    non_binary_content_type_prefixes: Iterable[str] = (
+        DEFAULT_NON_BINARY_CONTENT_TYPE_PREFIXES
+    ),
+    fallback: Callable[[dict[str, Any], Any], dict[str, Any]] | None = None,
+    compress_min_size: int | None = None,
+    offload: Callable[[dict[str, Any]], dict[str, Any]] | None = None,
+    compress_html: bool = False,
+) -> Callable[[dict[str, Any], Any], dict[str, Any]]:
+    """WSGI app を API Gateway (payload v2) の Lambda handler にする。
+
+    fallback は v2 以外の event (v1 / ALB) を受けた時に呼ぶ handler。
+    compress_min_size を指定すると、それ以上の text 系の応答を圧縮する (既定の None
+    では圧縮しない)。HTML は BREACH を避けるため compress_html=True の時だけ圧縮する。
+    offload は組み立てた応答を受けて差し替える関数
+    (`pocket.response_offload.ResponseOffloader`)。
+    """
+    text_prefixes = tuple(non_binary_content_type_prefixes)
+
+    def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
+        if event.get("version") != "2.0":
+            if fallback is None:
+                raise ValueError(
+                    "unsupported payload version: %r" % event.get("version")
+                )
+            return fallback(event, context)
+        state: dict[str, Any] = {}
+        chunks: list[bytes] = []
+
+        # 応答は最後にまとめて返すので、exc_info 付きの再呼び出しも status を
+        # 差し替えるだけでよい (まだ何も送っていない)
+        def start_response(status, response_headers, exc_info=None):
+            state["status"] = status
+            state["headers"] = response_headers
+            return chunks.append
+
+        result = app(get_environ(event, context), start_response)
+        try:
+            for chunk in result:
+                if chunk:
+                    chunks.append(chunk)
+        finally:
+            close = getattr(result, "close", None)
+            if close is not None:
+                close()
+        body = chunks[0] if len(chunks) == 1 else b"".join(chunks)
+        accept_encoding = (event.get("headers") or {}).get("accept-encoding")
+        response = build_response(
+            int(state["status"].split(" ", 1)[0]),
+            state["headers"],
+            body,
+            encoding=choose_encoding(accept_encoding),
+            compress_min_size=compress_min_size,
+            text_prefixes=text_prefixes,
+            compress_html=compress_html,
+        )
+        return response if offload is None else offload(response)
+
+    return handler
+
+
+def build_response(
+    status: int,
+    response_headers: Iterable[tuple[str, str]],
+    body: bytes,
+    *,
+    encoding: str | None,
+    compress_min_size: int | None = None,
+    text_prefixes: tuple[str, ...] = DEFAULT_NON_BINARY_CONTENT_TYPE_PREFIXES,
+    compress_html: bool = False,
+) -> dict[str, Any]:
+    """payload v2 の応答 dict を作る (圧縮と base64 の判定もここで行う)。
+
+    encoding は `choose_encoding` で選んだ coding (圧縮しないなら None)。
+    """
+    headers, cookies = split_headers(response_headers)
+    response: dict[str, Any] = {
+        "statusCode": status,
+        "headers": headers,
+        "cookies": cookies,
+    }
+    compressed = _compress_response(
+        body, status, headers, encoding, compress_min_size, text_prefixes, compress_html
+    )
+    if compressed is not None:
+        body = compressed
+    elif _is_text(headers, text_prefixes):
+        try:
+            response["body"] = body.decode()
+            response["isBase64Encoded"] = False
+            return response
+        # text 系と宣言された UTF-8 でない body は base64 で送る
+        except UnicodeDecodeError:
+            pass
+    response["body"] = b64encode(body).decode()
+    response["isBase64Encoded"] = True
+    return response
+
+
+def _is_text(headers: dict[str, str], text_prefixes: tuple[str, ...]) -> bool:
+    if headers.get("content-encoding"):
+        return False
+    return headers.get("content-type", "").startswith(text_prefixes)
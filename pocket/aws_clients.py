@@ -0,0 +1,76 @@
+"""runtime 用の boto3 client registry (プロセス内で (service, region) ごとに共有)。
+
+boto3 client の生成は 1 つあたり数十 ms かかり、生成ごとに接続プールも捨てる。
+Lambda の warm invocation をまたいで client と keep-alive 済みの接続を使い回す
+ため、runtime の AWS 呼び出しは ``aws_clients.client("svc", region_name=...)``
+で client を得る。
+
+生成は lock の下で行う。boto3 default session は初回の client 生成時に
+component を遅延初期化し、この初期化はスレッドセーフでない (boto/boto3#1592)。
+生成を直列化すれば INIT の並列解決中に初回生成が重なっても落ちない。生成済み
+client はスレッドセーフなので、取得後の API 呼び出しは並列に行ってよい。
+
+service 名は呼び出し側で **リテラル** で渡すこと。`tests/test_permissions_sync.py`
+の AST 解析器は ``aws_clients.client("svc")`` を ``boto3.client("svc")`` と同様に
+追跡し、IAM 権限の網羅チェックに使う。
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any
+
+import boto3
+from botocore.config import Config
+
+from .init_profile import phase
+
+# INIT の並列解決 (POCKET_INIT_CONCURRENCY) や SQS の並列処理で同じ client を
+# 複数スレッドから使っても接続待ちにならないよう、botocore の既定 (10) より広げる
+MAX_POOL_CONNECTIONS = 32
+
+CLIENT_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=MAX_POOL_CONNECTIONS,
+    retries={"mode": "standard", "max_attempts": 3},
+)
+
+_clients: dict[tuple[str, str | None, str | None], Any] = {}
+_lock = threading.Lock()
+
+
+def client(
+    service_name: str,
+    region_name: str | None = None,
+    *,
+    signature_version: str | None = None,
+) -> Any:
+    """(service_name, region_name) の共有 client を返す (初回のみ生成)。
+
+    region_name が None の場合は boto3 の既定 (AWS_REGION 等) で解決する。
+    signature_version は presigned URL を作る client 用 (S3 の既定の client は
+    presign が SigV2 になり、新しい region では使えない)。指定ごとに別の client を
+    共有する。
+    """
+    key = (service_name, region_name, signature_version)
+    found = _clients.get(key)
+    if found is not None:
+        return found
+    with _lock:
+        found = _clients.get(key)
+        if found is None:
+            config = CLIENT_CONFIG
+            if signature_version is not None:
+                config = config.merge(Config(signature_version=signature_version))
+            with phase("boto3_client"):
+                found = boto3.client(
+                    service_name, region_name=region_name, config=config
+                )
+            _clients[key] = found
+        return found
+
+
+def reset_clients() -> None:
+    """共有 client を全て捨てる (テストや credential 切り替え用)。"""
+    with _lock:
+        _clients.clear()
@@ -16,6 +16,42 @@ invocation そのものなので freeze の影響を受けず、最後まで走
 - 出力 / lifecycle の永続化は sink hook (:meth:`on_start` / :meth:`on_output` /
   :meth:`on_finish` / :meth:`on_crash`) に委譲する。基底は永続化先を知らない。
 
+in-process 実行:
+
+- 自分の Python CLI を動かすだけなら、:meth:`BaseCommandHandler.build_callable` で
+  job を callable として返すと subprocess を起動せず同じ interpreter で実行する
+  (interpreter 起動 / Django・boto3 の import / 接続の確立を job ごとに払わない)。
+  :func:`module_callable` で ``python -m <module>`` 相当 (runpy) も組める。
+- job の thread が書いた stdout / stderr は行ごとに :meth:`on_output` に渡す
+  (throttle も subprocess と同じ)。job の例外は traceback を出力して exit code 1、
+  ``SystemExit`` はその code として :meth:`on_finish` に渡す (subprocess と同じ意味)。
+- ``in_process_timeout`` を設定すると job を worker thread で動かし、時間内に
+  終わらなければ ``TimeoutError`` で crash させる。Python の thread は止められない
+  ため、timeout した job は裏で走り続ける点に注意する。その間の job の出力は
+  :meth:`on_output` ではなく元の stdout に流れ、``sys.stdout`` / ``sys.stderr`` は
+  job が終わるまで差し替えたままになる (他の thread の出力は素通しで元の stream に
+  書かれる)。
+
+長時間 job:
+
+- ``heartbeat_interval`` を設定すると、job の間 batch の message の visibility
+  timeout を ``ChangeMessageVisibility`` で延ばし続ける。job が queue の visibility
+  timeout を超えても、同じ message が別の invocation に配られて二重実行されない。
+  失敗した record は延ばすのをやめ、invocation の終わりに visibility timeout を 0 に
+  戻す (延ばした分だけ再配信が遅れないように)。
+- ``timeout_margin`` を設定すると、Lambda の残り時間 (``get_remaining_time_in_millis``)
+  がその秒数を切った時点で subprocess に SIGTERM を送り (``terminate_grace`` 秒後に
+  SIGKILL)、:meth:`on_timeout` を呼ぶ。:meth:`on_timeout` が続きの spec を返すと
+  同じ queue に enqueue して record は成功扱い、None なら record を再配信させる。
+  まだ始めていない record は始めずに再配信させる。hard kill で :meth:`on_crash` すら
+  呼ばれずに終わるのを避けるためのもの。
+- in-process の job は止められないので、deadline では :func:`cancel_requested` を
+  True にして ``terminate_grace`` 秒だけ終了を待つ。job は長いループの中でこれを見て
+  checkpoint を残して return する。待っても終わらない job は続きを enqueue せず
+  (裏で走り続ける job と続きが二重に実行されるため) crash として再配信させる。
+- 続きの message は claim check を有効にした queue では閾値を超えると S3 に置き、
+  FIFO queue では元の record と同じ MessageGroupId で送る。
+
 crash 時の挙動:
 
 - 予期せぬ crash (spawn 失敗 / spec 不正 / sink エラー / OOM / timeout 等) で UI が
@@ -33,19 +69,217 @@ crash 時の挙動:
 
 from __future__ import annotations
 
+import io
 import json
 import os
+import queue
+import runpy
 import subprocess
 import sys
+import threading
 import time
 import traceback
-from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+from pocket import aws_clients
+from pocket.sqs_claim_check import offload_body, resolved_body
+
+if TYPE_CHECKING:
+    from pocket.context import SqsClaimCheckContext
+
+#: in-process の job。返り値 (None は 0) か ``SystemExit`` の code が exit code になる。
+JobCallable = Callable[[], "int | None"]
+
+# in-process の job が出力を捕捉している thread の状態 (_LineBuffer)
+_capture = threading.local()
+_capture_lock = threading.Lock()
+_capture_users = 0
+
+# in-process の job を動かしている worker thread の停止要求 (threading.Event)
+_job = threading.local()
+
+
+def cancel_requested() -> bool:
+    """in-process の job の中で、Lambda の deadline による停止を求められているか.
+
+    ``timeout_margin`` を設定した handler の job は、長いループの中でこれを見て
+    checkpoint を残して return する (:meth:`BaseCommandHandler.on_timeout` が続きの
+    spec を返せる)。job の外や subprocess の job では常に False。
+    """
+    cancel = getattr(_job, "cancel", None)
+    return cancel is not None and cancel.is_set()
+
+
+class _LineBuffer:
+    """書き込みを行に分け、完成した行ごとに emit を呼ぶ."""
+
+    def __init__(self, emit: Callable[[str], None]) -> None:
+        self.emit = emit
+        self.pending = ""
+
+    def feed(self, text: str) -> None:
+        *lines, self.pending = (self.pending + text).split("\n")
+        for line in lines:
+            self._emit(line)
+
+    def close(self) -> None:
+        if self.pending:
+            line, self.pending = self.pending, ""
+            self._emit(line)
+
+    def _emit(self, line: str) -> None:
+        # emit (on_output) の中の print は捕捉せず元の stream に流す (再帰しない)
+        _capture.state = None
+        try:
+            self.emit(line)
+        finally:
+            _capture.state = self
+
+
+class _CaptureStream(io.TextIOBase):
+    """sys.stdout / sys.stderr の代わり。捕捉中の thread の出力だけを行に分ける."""
+
+    def __init__(self, original) -> None:
+        self.original = original
+
+    @property
+    def encoding(self):  # type: ignore[override]
+        return getattr(self.original, "encoding", "utf-8")
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        state = getattr(_capture, "state", None)
+        if state is None:
+            return self.original.write(text)
+        state.feed(text)
+        return len(text)
 
+    def flush(self) -> None:
+        self.original.flush()
 
-class BaseCommandHandler(ABC):
+
+@contextmanager
+def _capture_output(emit: Callable[[str], None]) -> Iterator[None]:
+    """with の間、この thread の stdout / stderr を行ごとに emit へ渡す.
+
+    stream の差し替えは process 全体に効くため、捕捉中の thread が 1 つでも残って
+    いる間は戻さない (他の thread の出力は元の stream にそのまま流れる)。
+    """
+    global _capture_users
+    with _capture_lock:
+        if _capture_users == 0:
+            sys.stdout = _CaptureStream(sys.stdout)
+            sys.stderr = _CaptureStream(sys.stderr)
+        _capture_users += 1
+    state = _LineBuffer(emit)
+    _capture.state = state
+    try:
+        yield
+    finally:
+        state.close()
+        _capture.state = None
+        with _capture_lock:
+            _capture_users -= 1
+            if _capture_users == 0:
+                for name in ("stdout", "stderr"):
+                    stream = getattr(sys, name)
+                    if isinstance(stream, _CaptureStream):
+                        setattr(sys, name, stream.original)
+
+
+def _call_job(func: JobCallable) -> int:
+    """job を呼び、subprocess の exit code と同じ意味の値を返す."""
+    try:
+        result = func()
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    # subprocess と同様、job の例外は job の失敗 (exit 1) として出力に残す
+    except Exception:
+        traceback.print_exc()
+        return 1
+    return result or 0
+
+
+# worker thread の job が終わったことを出力の queue で知らせる印
+_JOB_DONE = object()
+
+
+def _start_job_thread(
+    func: JobCallable,
+    lines: queue.SimpleQueue,
+    cancel: threading.Event,
+    detached: threading.Event,
+) -> tuple[threading.Thread, dict]:
+    """job を worker thread で始める. 出力の行と最後の _JOB_DONE を lines に入れる.
+
+    返す dict には終了後に ``exit_code`` か ``error`` (job の外へ出た例外) が入る。
+    detached が立った後 (timeout で呼び出し元が待つのをやめた後) の出力は、誰も
+    読まない lines に溜めずに元の stdout へ流す。
+    """
+    result: dict = {}
+
+    def sink(line: str) -> None:
+        if detached.is_set():
+            print(line)
+        else:
+            lines.put(line)
+
+    def target() -> None:
+        _job.cancel = cancel
+        try:
+            with _capture_output(sink):
+                result["exit_code"] = _call_job(func)
+        # KeyboardInterrupt 等も呼び出し元で crash として扱う
+        except BaseException as e:
+            result["error"] = e
+        finally:
+            lines.put(_JOB_DONE)
+
+    thread = threading.Thread(target=target, name="pocket-command", daemon=True)
+    thread.start()
+    return thread, result
+
+
+# ChangeMessageVisibilityBatch の 1 回あたりの上限
+_VISIBILITY_BATCH_SIZE = 10
+
+
+class JobTimeoutError(Exception):
+    """Lambda の timeout 前に job を止めた (続きが無ければ record は再配信される)."""
+
+
+def _queue_url(event_source_arn: str) -> tuple[str, str]:
+    """SQS の queue ARN から (region, queue URL) を組み立てる."""
+    _, _, _, region, account, name = event_source_arn.split(":", 5)
+    return region, f"https://sqs.{region}.amazonaws.com/{account}/{name}"
+
+
+def module_callable(module: str, args: list[str]) -> JobCallable:
+    """``python -m <module> <args>`` を in-process で実行する callable を返す."""
+
+    def run() -> None:
+        saved = sys.argv
+        sys.argv = [module, *args]
+        try:
+            runpy.run_module(module, run_name="__main__", alter_sys=True)
+        finally:
+            sys.argv = saved
+
+    return run
+
+
+class BaseCommandHandler:
     """SQS event を受け、argv を invocation 本体として完走させる worker 基盤.
 
-    subclass は最低限 :meth:`build_argv` を実装すればよい。ステータス / 出力を永続化
+    subclass は最低限 :meth:`build_argv` (subprocess) か :meth:`build_callable`
+    (in-process) を実装すればよい。ステータス / 出力を永続化
     したい場合は sink hook (:meth:`on_start` / :meth:`on_output` / :meth:`on_finish` /
     :meth:`on_crash`) を override する (既定は no-op)。
 
@@ -57,6 +291,34 @@ class BaseCommandHandler(ABC):
     #: 完了時 (:meth:`on_finish`) は throttle に関係なく確実に書く想定。
     throttle: float = 1.0
 
+    #: in-process の job を worker thread で動かす時の制限時間 (秒)。None なら
+    #: 呼び出し元の thread でそのまま動かす。
+    in_process_timeout: float | None = None
+
+    #: batch の message の visibility timeout を延ばす間隔 (秒)。None なら延ばさない。
+    heartbeat_interval: float | None = None
+    #: 延ばすたびに設定する visibility timeout (秒)。heartbeat_interval より長くする。
+    heartbeat_visibility_timeout: int = 300
+
+    #: Lambda の残り時間がこの秒数を切ったら job を止めて :meth:`on_timeout` を呼ぶ。
+    #: None なら止めない (Lambda の timeout で hard kill される)。
+    timeout_margin: float | None = None
+    #: SIGTERM から SIGKILL まで (in-process の job は停止要求から終了まで) の猶予
+    #: (秒)。timeout_margin より短くする。
+    terminate_grace: float = 5.0
+
+    def __new__(cls, *args, **kwargs):
+        # command の dotted-path が指すインスタンスは handler module の import 時に
+        # 作られるので、実装漏れを最初の job ではなく INIT で落とす
+        if (
+            cls.build_argv is BaseCommandHandler.build_argv
+            and cls.build_callable is BaseCommandHandler.build_callable
+        ):
+            raise TypeError(
+                f"{cls.__name__} must implement build_argv or build_callable"
+            )
+        return super().__new__(cls)
+
     def __call__(self, event, context) -> dict:
         """SQS event source の Lambda entrypoint.
 
@@ -72,50 +334,162 @@ class BaseCommandHandler(ABC):
         返り値を無視するだけで、返して害は無い。
         """
         batch_item_failures = []
-        for record in event["Records"]:
-            try:
-                self._run(json.loads(record["body"]))
-            # 失敗 record を batchItemFailures で報告するには、job が投げる任意の例外を
-            # 捕捉する必要がある (仕組み上の要請)。型で絞ると絞り漏れた例外で handler
-            # 全体が落ち、成功済み record まで再配信されてしまう。
-            except Exception:
-                traceback.print_exc()
-                batch_item_failures.append({"itemIdentifier": record["messageId"]})
+        deadline = self._deadline(context)
+        with self._heartbeat(event["Records"]) as failed:
+            for record in event["Records"]:
+                if deadline is not None and time.monotonic() >= deadline:
+                    # 残り時間の無い record は始めずに再配信させる
+                    batch_item_failures.append({"itemIdentifier": record["messageId"]})
+                    failed.add(record["messageId"])
+                    continue
+                try:
+                    # claim check の body は S3 から読み、成功したら object を消す
+                    with resolved_body(record["body"]) as body:
+                        continuation = self._run(json.loads(body), deadline=deadline)
+                        if continuation is not None:
+                            self._enqueue_continuation(record, continuation)
+                # 失敗 record を batchItemFailures で報告するには、job が投げる任意の
+                # 例外を捕捉する必要がある (仕組み上の要請)。型で絞ると絞り漏れた例外で
+                # handler 全体が落ち、成功済み record まで再配信されてしまう。
+                except Exception:
+                    traceback.print_exc()
+                    batch_item_failures.append({"itemIdentifier": record["messageId"]})
+                    failed.add(record["messageId"])
         return {"batchItemFailures": batch_item_failures}
 
-    def _run(self, spec: dict) -> None:
-        """1 job 分のコマンドを完走させ、進捗 / 結果を sink hook 経由で永続化する."""
-        self.on_start(spec)
-        done_ok = False
+    def _deadline(self, context) -> float | None:
+        """job を止める時刻 (time.monotonic 基準)。timeout_margin 未設定なら None."""
+        remaining = getattr(context, "get_remaining_time_in_millis", None)
+        if self.timeout_margin is None or remaining is None:
+            return None
+        return time.monotonic() + remaining() / 1000 - self.timeout_margin
+
+    @contextmanager
+    def _heartbeat(self, records: list[dict]) -> Iterator[set[str]]:
+        """with の間、batch の message の visibility timeout を延ばし続ける.
+
+        成功した record の message も invocation が返るまで SQS に残っている
+        (削除は Lambda が返り値を見て行う) ため、処理中の record だけでなく batch
+        全体を延ばす。ただし yield した set に messageId を入れた (失敗した) record は
+        延ばすのをやめ、with を抜ける時に visibility timeout を 0 に戻してすぐに
+        再配信させる (延ばした分だけ retry が遅れないように)。
+        """
+        failed: set[str] = set()
+        if self.heartbeat_interval is None or not records:
+            yield failed
+            return
+        stop = threading.Event()
+        extended = threading.Event()
+
+        def beat() -> None:
+            while not stop.wait(self.heartbeat_interval):
+                pending = [r for r in records if r["messageId"] not in failed]
+                try:
+                    self._extend_visibility(pending, self.heartbeat_visibility_timeout)
+                    extended.set()
+                # heartbeat の失敗で job を落とさない (延長できなければ再配信される
+                # だけで、従来と同じ)
+                except Exception:
+                    traceback.print_exc()
+
+        thread = threading.Thread(target=beat, name="pocket-heartbeat", daemon=True)
+        thread.start()
         try:
-            argv = self.build_argv(spec)
-            # PYTHONUNBUFFERED=1: subprocess 側の stdout を即 flush させ、Pipe 経由の
-            # block buffering でエラー時にログが消える事故を避ける。
-            env = {**os.environ, "PYTHONUNBUFFERED": "1"}
-            proc = subprocess.Popen(  # noqa: S603 shell=False + 制御された引数
-                argv,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                env=env,
+            yield failed
+        finally:
+            stop.set()
+            thread.join()
+            if failed and extended.is_set():
+                try:
+                    self._extend_visibility(
+                        [r for r in records if r["messageId"] in failed], 0
+                    )
+                except Exception:
+                    traceback.print_exc()
+
+    def _extend_visibility(self, records: list[dict], visibility_timeout: int) -> None:
+        by_queue: dict[str, list[dict]] = {}
+        for record in records:
+            by_queue.setdefault(record["eventSourceARN"], []).append(record)
+        for arn, queued in by_queue.items():
+            region, queue_url = _queue_url(arn)
+            sqs = aws_clients.client("sqs", region_name=region)
+            for i in range(0, len(queued), _VISIBILITY_BATCH_SIZE):
+                chunk = queued[i : i + _VISIBILITY_BATCH_SIZE]
+                sqs.change_message_visibility_batch(
+                    QueueUrl=queue_url,
+                    Entries=[
+                        {
+                            "Id": str(n),
+                            "ReceiptHandle": r["receiptHandle"],
+                            "VisibilityTimeout": visibility_timeout,
+                        }
+                        for n, r in enumerate(chunk)
+                    ],
+                )
+
+    def _enqueue_continuation(self, record: dict, spec: dict) -> None:
+        """:meth:`on_timeout` が返した続きの spec を record と同じ queue に送る."""
+        region, queue_url = _queue_url(record["eventSourceARN"])
+        body = json.dumps(spec)
+        claim_check = self._claim_check(record["eventSourceARN"])
+        if claim_check is not None:
+            body = offload_body(
+                body,
+                bucket_name=claim_check.bucket_name,
+                prefix=claim_check.prefix,
+                threshold=claim_check.threshold,
+                region=claim_check.region,
             )
-            if proc.stdout is None:
-                raise RuntimeError("subprocess stdout is not available")
+        params = {"QueueUrl": queue_url, "MessageBody": body}
+        if queue_url.endswith(".fifo"):
+            # 元の record と同じ group で順序を保つ。重複排除 id を messageId にして、
+            # 送信後に record が再配信されても続きを二重に enqueue しない
+            params["MessageGroupId"] = record["attributes"]["MessageGroupId"]
+            params["MessageDeduplicationId"] = record["messageId"]
+        aws_clients.client("sqs", region_name=region).send_message(**params)
 
-            last_flush = 0.0
-            for line in proc.stdout:
-                now = time.time()
-                flush = now - last_flush >= self.throttle
-                self.on_output(spec, line.rstrip("\n"), flush=flush)
-                if flush:
-                    last_flush = now
+    def _claim_check(self, event_source_arn: str) -> SqsClaimCheckContext | None:
+        """queue が pocket の handler のものなら、その claim check 設定を返す."""
+        stage = os.environ.get("POCKET_STAGE")
+        if not stage:
+            return None
+        from pocket.runtime import get_context
+
+        name = event_source_arn.rsplit(":", 1)[-1]
+        for container in get_context(stage).container.values():
+            for handler in container.handlers.values():
+                if handler.sqs and handler.sqs.name == name:
+                    return handler.sqs.claim_check
+        return None
+
+    def _run(self, spec: dict, *, deadline: float | None = None) -> dict | None:
+        """1 job 分のコマンドを完走させ、進捗 / 結果を sink hook 経由で永続化する.
 
-            proc.wait()
+        deadline までに終わらず止めた場合は :meth:`on_timeout` の返した続きの spec を
+        返す (続きが無ければ ``JobTimeoutError``)。完走した場合は None。
+        """
+        self.on_start(spec)
+        done_ok = False
+        try:
+            func = self.build_callable(spec)
+            try:
+                if func is None:
+                    exit_code = self._run_subprocess(spec, deadline)
+                else:
+                    exit_code = self._run_in_process(spec, func, deadline)
+            except JobTimeoutError:
+                # 止めた job の finalize も on_crash ではなく on_timeout で行う
+                continuation = self.on_timeout(spec)
+                done_ok = True
+                if continuation is None:
+                    raise
+                return continuation
             # 本体内 (= 同一 invocation) での最終 finalize なので freeze の影響を
             # 受けず確実。
-            self.on_finish(spec, proc.returncode)
+            self.on_finish(spec, exit_code)
             done_ok = True
+            return None
         finally:
             if not done_ok:
                 # 例外が伝播中 (= worker crash)。UI が failed を読めるよう sink に
@@ -124,14 +498,163 @@ class BaseCommandHandler(ABC):
             # 例外は finally を抜けて自然に伝播 (= re-raise)。__call__ が捕捉して
             # この record を batchItemFailures に載せる → 再配信 → DLQ。
 
-    @abstractmethod
+    def _output_emitter(self, spec: dict) -> Callable[[str], None]:
+        """1 行ずつ :meth:`on_output` に渡す関数 (throttle 間隔ごとに flush=True)."""
+        last_flush = 0.0
+
+        def emit(line: str) -> None:
+            nonlocal last_flush
+            now = time.time()
+            flush = now - last_flush >= self.throttle
+            self.on_output(spec, line, flush=flush)
+            if flush:
+                last_flush = now
+
+        return emit
+
+    def _run_subprocess(self, spec: dict, deadline: float | None = None) -> int:
+        argv = self.build_argv(spec)
+        # PYTHONUNBUFFERED=1: subprocess 側の stdout を即 flush させ、Pipe 経由の
+        # block buffering でエラー時にログが消える事故を避ける。
+        env = {**os.environ, "PYTHONUNBUFFERED": "1"}
+        proc = subprocess.Popen(  # noqa: S603 shell=False + 制御された引数
+            argv,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            env=env,
+        )
+        if proc.stdout is None:
+            raise RuntimeError("subprocess stdout is not available")
+
+        timed_out = threading.Event()
+        watchdog = None
+        if deadline is not None:
+            watchdog = threading.Timer(
+                max(deadline - time.monotonic(), 0),
+                self._terminate,
+                args=(proc, timed_out),
+            )
+            watchdog.daemon = True
+            watchdog.start()
+        try:
+            emit = self._output_emitter(spec)
+            for line in proc.stdout:
+                emit(line.rstrip("\n"))
+            exit_code = proc.wait()
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+        if timed_out.is_set():
+            raise JobTimeoutError("job was terminated before the Lambda timeout")
+        return exit_code
+
+    def _terminate(self, proc: subprocess.Popen, timed_out: threading.Event) -> None:
+        """SIGTERM を送り、terminate_grace 秒待っても終わらなければ SIGKILL する."""
+        timed_out.set()
+        proc.terminate()
+        try:
+            proc.wait(self.terminate_grace)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    def _run_in_process(
+        self, spec: dict, func: JobCallable, deadline: float | None = None
+    ) -> int:
+        emit = self._output_emitter(spec)
+        if self.in_process_timeout is None and deadline is None:
+            with _capture_output(emit):
+                return _call_job(func)
+        return self._run_in_thread(func, emit, self.in_process_timeout, deadline)
+
+    def _run_in_thread(
+        self,
+        func: JobCallable,
+        emit: Callable[[str], None],
+        timeout: float | None,
+        deadline: float | None,
+    ) -> int:
+        """job を worker thread で動かし、出力を呼び出し元の thread で emit する.
+
+        timeout (in_process_timeout) を超えたら ``TimeoutError`` (crash)。Lambda の
+        deadline に達したら :func:`cancel_requested` を立て、``terminate_grace`` 秒
+        以内に job が終われば ``JobTimeoutError`` (:meth:`on_timeout`)、終わらなければ
+        ``TimeoutError`` (crash) を投げる。
+        """
+        lines: queue.SimpleQueue = queue.SimpleQueue()
+        cancel = threading.Event()
+        limit = None if timeout is None else time.monotonic() + timeout
+        detached = threading.Event()
+        thread, result = _start_job_thread(func, lines, cancel, detached)
+        try:
+            self._drain_job_output(lines, emit, cancel, timeout, limit, deadline)
+        except TimeoutError:
+            detached.set()
+            raise
+        thread.join()
+        if "error" in result:
+            raise result["error"]
+        if cancel.is_set():
+            raise JobTimeoutError("job was stopped before the Lambda timeout")
+        return result["exit_code"]
+
+    def _drain_job_output(
+        self,
+        lines: queue.SimpleQueue,
+        emit: Callable[[str], None],
+        cancel: threading.Event,
+        timeout: float | None,
+        limit: float | None,
+        deadline: float | None,
+    ) -> None:
+        """job が終わる (_JOB_DONE が届く) まで出力を emit する."""
+        # deadline で停止を求めた後、job の終了を待つ期限
+        stop_by: float | None = None
+        while True:
+            now = time.monotonic()
+            if stop_by is None and deadline is not None and now >= deadline:
+                cancel.set()
+                stop_by = now + self.terminate_grace
+            if stop_by is not None:
+                if now >= stop_by:
+                    # 裏で走り続ける job と続きが二重に動かないよう、続きは出さない
+                    raise TimeoutError(
+                        f"job did not stop in {self.terminate_grace} seconds "
+                        "after the Lambda deadline"
+                    )
+                ends = [stop_by]
+            else:
+                if limit is not None and now >= limit:
+                    raise TimeoutError(f"job did not finish in {timeout} seconds")
+                ends = [t for t in (deadline, limit) if t is not None]
+            try:
+                item = lines.get(timeout=min(ends) - now if ends else None)
+            except queue.Empty:
+                continue
+            if item is _JOB_DONE:
+                return
+            emit(item)
+
     def build_argv(self, spec: dict) -> list[str]:
         """job spec を実行する argv (list[str]) に変換する.
 
         安全境界はここ: 実行ファイルを自分の CLI に固定し、shell を介さず list で
         渡す。``spec`` の中身 (どの引数を許すか) の検証も必要ならここで行う。
         """
-        ...
+        raise NotImplementedError(
+            f"{type(self).__name__} must implement build_argv or build_callable"
+        )
+
+    def build_callable(self, spec: dict) -> JobCallable | None:
+        """job を in-process で実行する callable を返す (None なら subprocess).
+
+        既定は None (:meth:`build_argv` の subprocess で実行)。自分の Python CLI を
+        動かす場合は ``module_callable("myapp.cli", [...])`` や CLI の main 関数を
+        包んだ callable を返すと interpreter の起動を省ける。安全境界は
+        :meth:`build_argv` と同じく、何を実行するかをここで固定すること。
+        """
+        return None
 
     # --- sink hooks ---
     # 既定はいずれも stdout への print (= CloudWatch Logs に残る)。subclass が
@@ -150,6 +673,15 @@ class BaseCommandHandler(ABC):
         """subprocess 完走時 (exit_code は 0 以外もあり得る = job の失敗)."""
         print(f"finished: exit {exit_code}")
 
+    def on_timeout(self, spec: dict) -> dict | None:
+        """Lambda の timeout 前に job を止めたとき (``timeout_margin`` 設定時のみ).
+
+        続きを実行する spec を返すと同じ queue に enqueue し、この record は成功として
+        消える。None を返すと record を batchItemFailures に載せて再配信させる。
+        """
+        print("timed out: stopped before the Lambda timeout")
+        return None
+
     def on_crash(self, spec: dict, exc: BaseException | None) -> None:
         """worker が正常完了せず抜けたとき (crash)。例外はこの後 re-raise される."""
         print(f"crashed: {type(exc).__name__}: {exc}")
@@ -0,0 +1,212 @@
+"""`BaseCommandHandler` の出力を S3 に逐次書き出す sink ``S3OutputCommandHandler``.
+
+出力全体を文字列で持ち、flush のたびに丸ごと put し直すと、job が長くなるほど
+メモリと flush の時間が伸びる。この sink は前回の flush 以降の出力だけを保持し、
+throttle ごと (または ``max_chunk_bytes`` を超えた時点) に番号付きの part object
+として put する。メモリに残るのは未 flush の chunk と、status document 用の末尾
+``tail_lines`` 行 (ring buffer) だけなので、数 GB の出力でも一定に収まる。
+
+S3 の配置 (``<prefix><job_id>/``):
+
+- ``output/000000.log``, ``output/000001.log``, ... — 出力の chunk (追記順)
+- ``status.json`` — 状態 (running / succeeded / failed / crashed / timed_out)、
+  part 数、bytes、試行回数 (attempt)、末尾の行。flush と終了時 (on_finish /
+  on_crash / on_timeout) に書き直す。
+
+同じ job_id が再配信された場合 (crash・timeout 後の retry や重複配信) は、既存の
+status.json の part 数の続きから書くので、前回の試行の出力は上書きされない。
+
+multipart upload は complete するまで object が読めず (part も 5 MB 以上が必要)、
+実行中の出力を tail できないため、part object + status document にしている。
+読む側は :class:`CommandOutput` の :meth:`~CommandOutput.tail` で、前回の続きの
+part だけを取得できる。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from collections import deque
+from typing import Any
+
+from pocket import aws_clients
+from pocket.command_handler import BaseCommandHandler
+
+_PART_FORMAT = "output/{:06d}.log"
+
+
+def _job_prefix(prefix: str, job_id: str) -> str:
+    return f"{prefix}{job_id}/"
+
+
+class _OutputState:
+    """1 job 分の未 flush の chunk と末尾の行."""
+
+    def __init__(self, job_id: str, tail_lines: int) -> None:
+        self.job_id = job_id
+        self.pending: list[str] = []
+        self.pending_bytes = 0
+        self.tail: deque[str] = deque(maxlen=tail_lines)
+        self.parts = 0
+        self.bytes = 0
+        self.started_at = time.time()
+        self.attempt = 1
+
+
+class S3OutputCommandHandler(BaseCommandHandler):
+    """出力を part object として S3 に逐次書き出す `BaseCommandHandler`.
+
+    subclass は :meth:`build_argv` / :meth:`build_callable` を実装する。job の識別子は
+    spec の ``job_id`` (変える場合は :meth:`job_id` を override)。bucket は
+    ``bucket_name`` を指定しなければ stage の ``[s3]`` bucket を使う。
+    """
+
+    #: 出力を置く bucket。None なら POCKET_STAGE の [s3] bucket。
+    bucket_name: str | None = None
+    #: job ごとの出力を置く prefix。
+    prefix: str = "pocket/command-output/"
+    #: throttle を待たずに part を書き出す未 flush の bytes。
+    max_chunk_bytes: int = 1024 * 1024
+    #: status document に載せる末尾の行数。
+    tail_lines: int = 100
+
+    def job_id(self, spec: dict) -> str:
+        job_id = str(spec["job_id"])
+        if not job_id or "/" in job_id:
+            raise ValueError(f"invalid job_id: {job_id!r}")
+        return job_id
+
+    def get_bucket_name(self) -> str:
+        if self.bucket_name:
+            return self.bucket_name
+        from pocket.runtime import get_context
+
+        stage = os.environ.get("POCKET_STAGE")
+        context = get_context(stage) if stage else None
+        if context is None or context.s3 is None:
+            raise RuntimeError(
+                "S3OutputCommandHandler requires bucket_name or [s3] with POCKET_STAGE"
+            )
+        return context.s3.bucket_name
+
+    def output(self, spec: dict) -> CommandOutput:
+        """job の出力の reader."""
+        return CommandOutput(self.get_bucket_name(), self.prefix, self.job_id(spec))
+
+    # --- sink hooks ---
+
+    def on_start(self, spec: dict) -> None:
+        state = _OutputState(self.job_id(spec), self.tail_lines)
+        # 同じ job の再配信 (crash / timeout 後の retry、重複配信) は前回の part を
+        # 上書きせず、その続きの番号から書く
+        previous = self.output(spec).status()
+        if previous is not None:
+            state.parts = previous.get("parts", 0)
+            state.bytes = previous.get("bytes", 0)
+            state.started_at = previous.get("started_at", state.started_at)
+            state.tail.extend(previous.get("tail", []))
+            state.attempt = previous.get("attempt", 1) + 1
+        self._state = state
+        self._write_status("running")
+
+    def on_output(self, spec: dict, line: str, *, flush: bool) -> None:
+        state = self._state
+        state.pending.append(line)
+        state.pending_bytes += len(line.encode()) + 1
+        state.tail.append(line)
+        if flush or state.pending_bytes >= self.max_chunk_bytes:
+            self._flush()
+            self._write_status("running")
+
+    def on_finish(self, spec: dict, exit_code: int) -> None:
+        self._flush()
+        status = "succeeded" if exit_code == 0 else "failed"
+        self._write_status(status, exit_code=exit_code)
+
+    def on_crash(self, spec: dict, exc: BaseException | None) -> None:
+        # on_start は _run の try の外なので、ここに来るのは on_start が成功した job
+        self._flush()
+        self._write_status("crashed", error=f"{type(exc).__name__}: {exc}")
+
+    def on_timeout(self, spec: dict) -> dict | None:
+        self._flush()
+        self._write_status("timed_out")
+        return None
+
+    # --- S3 ---
+
+    def _flush(self) -> None:
+        state = self._state
+        if not state.pending:
+            return
+        body = ("\n".join(state.pending) + "\n").encode()
+        key = _job_prefix(self.prefix, state.job_id) + _PART_FORMAT.format(state.parts)
+        aws_clients.client("s3").put_object(
+            Bucket=self.get_bucket_name(),
+            Key=key,
+            Body=body,
+            ContentType="text/plain; charset=utf-8",
+        )
+        state.parts += 1
+        state.bytes += len(body)
+        state.pending = []
+        state.pending_bytes = 0
+
+    def _write_status(self, status: str, **extra: Any) -> None:
+        state = self._state
+        document = {
+            "job_id": state.job_id,
+            "status": status,
+            "parts": state.parts,
+            "bytes": state.bytes,
+            "started_at": state.started_at,
+            "attempt": state.attempt,
+            "updated_at": time.time(),
+            "tail": list(state.tail),
+            **extra,
+        }
+        aws_clients.client("s3").put_object(
+            Bucket=self.get_bucket_name(),
+            Key=_job_prefix(self.prefix, state.job_id) + "status.json",
+            Body=json.dumps(document).encode(),
+            ContentType="application/json",
+        )
+
+
+class CommandOutput:
+    """`S3OutputCommandHandler` が書いた job の出力を読む (実行中でも読める)."""
+
+    def __init__(self, bucket_name: str, prefix: str, job_id: str) -> None:
+        self.bucket_name = bucket_name
+        self.job_prefix = _job_prefix(prefix, job_id)
+
+    def status(self) -> dict | None:
+        """status document (まだ無ければ None)."""
+        s3 = aws_clients.client("s3")
+        try:
+            obj = s3.get_object(
+                Bucket=self.bucket_name, Key=self.job_prefix + "status.json"
+            )
+        except s3.exceptions.NoSuchKey:
+            return None
+        return json.loads(obj["Body"].read())
+
+    def tail(self, after: int = 0) -> tuple[str, int]:
+        """part ``after`` 以降の出力と、次に渡す ``after`` を返す.
+
+        ``after`` を前回の返り値にして繰り返し呼ぶと、増えた分だけを読める。
+        """
+        status = self.status()
+        parts = status["parts"] if status else 0
+        s3 = aws_clients.client("s3")
+        chunks = [
+            s3.get_object(
+                Bucket=self.bucket_name,
+                Key=self.job_prefix + _PART_FORMAT.format(n),
+            )["Body"]
+            .read()
+            .decode()
+            for n in range(after, parts)
+        ]
+        return "".join(chunks), max(parts, after)
@@ -11,6 +11,8 @@ from pydantic import BaseModel, computed_field, model_validator
 from . import settings
 from .django.context import DjangoContext
 from .general_context import GeneralContext, VpcContext
+from .init_profile import phase
+from .resources.aws import secrets_extension
 from .resources.aws.secretsmanager import PocketSecretIsNotReady, SecretsManager
 from .resources.aws.ssm import SsmStore
 from .secret_store import StoredUserSecretStore
@@ -67,6 +69,28 @@ class ApiGatewayContext(BaseModel):
         )
 
 
+class FunctionUrlContext(BaseModel):
+    auth_type: Literal["NONE", "AWS_IAM"] = "NONE"
+    invoke_mode: Literal["BUFFERED", "RESPONSE_STREAM"] = "BUFFERED"
+
+    @classmethod
+    def from_settings(
+        cls, function_url: settings.FunctionUrl | None, *, streaming: bool
+    ) -> FunctionUrlContext:
+        return cls(
+            auth_type=function_url.auth_type if function_url else "NONE",
+            invoke_mode="RESPONSE_STREAM" if streaming else "BUFFERED",
+        )
+
+
+class SqsClaimCheckContext(BaseModel):
+    bucket_name: str
+    region: str
+    prefix: str
+    threshold: int
+    expiration_days: int
+
+
 class SqsContext(BaseModel):
     batch_size: int = 10
     message_retention_period: int = 345600
@@ -74,6 +98,8 @@ class SqsContext(BaseModel):
     dead_letter_max_receive_count: int = 5
     dead_letter_message_retention_period: int = 1209600
     report_batch_item_failures: bool = True
+    concurrency: int = 1
+    claim_check: SqsClaimCheckContext | None = None
     name: str
     visibility_timeout: int
 
@@ -86,7 +112,18 @@ class SqsContext(BaseModel):
         container: str,
         key: str,
         timeout: int,
+        root: settings.Settings,
     ) -> SqsContext:
+        claim_check = None
+        # s3 が無い設定は Settings.check_sqs_claim_check_requires_s3 で弾いている
+        if sqs.claim_check and root.s3:
+            claim_check = SqsClaimCheckContext(
+                bucket_name=root.s3.bucket_name(root.format_vars),
+                region=root.region,
+                prefix=sqs.claim_check.prefix,
+                threshold=sqs.claim_check.threshold,
+                expiration_days=sqs.claim_check.expiration_days,
+            )
         return cls(
             batch_size=sqs.batch_size,
             message_retention_period=sqs.message_retention_period,
@@ -94,6 +131,8 @@ class SqsContext(BaseModel):
             dead_letter_max_receive_count=sqs.dead_letter_max_receive_count,
             dead_letter_message_retention_period=sqs.dead_letter_message_retention_period,
             report_batch_item_failures=sqs.report_batch_item_failures,
+            concurrency=sqs.concurrency,
+            claim_check=claim_check,
             name=f"{resource_prefix}{container}-{key}",
             visibility_timeout=timeout * 6,
         )
@@ -109,11 +148,18 @@ class LambdaHandlerContext(BaseModel):
     region: str
     apigateway: ApiGatewayContext | None = None
     sqs: SqsContext | None = None
+    # streaming = true の handler は function_url 未指定でも Function URL を持つ
+    function_url: FunctionUrlContext | None = None
+    streaming: bool = False
     key: str
     function_name: str
     log_group_name: str
     export_api_domain: str | None = None
 
+    @property
+    def has_http_endpoint(self) -> bool:
+        return self.apigateway is not None or self.function_url is not None
+
     @computed_field
     @property
     def cloudformation_cert_ref_name(self) -> str:
@@ -140,6 +186,12 @@ class LambdaHandlerContext(BaseModel):
                 container=container,
                 key=key,
                 timeout=handler.timeout,
+                root=root,
+            )
+        function_url_ctx = None
+        if handler.function_url or handler.streaming:
+            function_url_ctx = FunctionUrlContext.from_settings(
+                handler.function_url, streaming=handler.streaming
             )
         function_name = f"{resource_prefix}{container}-{key}"
         return cls(
@@ -151,6 +203,8 @@ class LambdaHandlerContext(BaseModel):
             region=root.region,
             apigateway=apigw_ctx,
             sqs=sqs_ctx,
+            function_url=function_url_ctx,
+            streaming=handler.streaming,
             key=key,
             function_name=function_name,
             log_group_name=f"/aws/lambda/{function_name}",
@@ -173,6 +227,8 @@ class SecretsContext(BaseModel):
         """storeに応じたpocket secrets操作クラスを返す"""
         if self.store == "ssm":
             return SsmStore(self)
+        if secrets_extension.serves_region(self.region):
+            return secrets_extension.ExtensionSecretsManager(self)
         return SecretsManager(self)
 
     @cached_property
@@ -456,6 +512,22 @@ class ContainerIamContext(BaseModel):
     inline_policies: dict[str, dict] = {}
 
 
+class SecretsExtensionContext(BaseModel):
+    port: int
+    ttl: int
+
+    @computed_field
+    @property
+    def envs(self) -> dict[str, str]:
+        """Lambda env に入れる extension の設定と、runtime が読む port。"""
+        return {
+            secrets_extension.SECRETS_EXTENSION_PORT_ENV: str(self.port),
+            "PARAMETERS_SECRETS_EXTENSION_HTTP_PORT": str(self.port),
+            "SECRETS_MANAGER_TTL": str(self.ttl),
+            "SSM_PARAMETER_STORE_TTL": str(self.ttl),
+        }
+
+
 class ContainerContext(BaseModel):
     name: str
     vpc: VpcContext | None = None
@@ -492,6 +564,7 @@ class ContainerContext(BaseModel):
     iam: ContainerIamContext = ContainerIamContext()
     efs_local_mount_path: str = ""
     build: BuildContext = BuildContext()
+    secrets_extension: SecretsExtensionContext | None = None
 
     @computed_field
     @property
@@ -606,6 +679,13 @@ class ContainerContext(BaseModel):
             ),
             efs_local_mount_path=efs_local_mount_path,
             build=BuildContext.from_settings(c.build),
+            secrets_extension=(
+                SecretsExtensionContext(
+                    port=c.secrets_extension.port, ttl=c.secrets_extension.ttl
+                )
+                if c.secrets_extension
+                else None
+            ),
         )
 
 
@@ -990,6 +1070,8 @@ class ScheduleEntryContext(BaseModel):
             input_payload: dict = {"manage": entry.manage}
         elif isinstance(entry, settings.SqsScheduleEntry):
             input_payload = entry.message
+        elif isinstance(entry, settings.KeepwarmScheduleEntry):
+            input_payload = {"pocket_keepwarm": {"concurrency": entry.concurrency}}
         else:
             input_payload = entry.input
         return cls(
@@ -1014,6 +1096,9 @@ class SchedulerContext(BaseModel):
     # sqs_scheduler entry が SendMessage する queue の CFN logical name
     # (例: "SqsmanagementSqsQueue")。scheduler role の policy Resource に使う
     sqs_queue_logical_names: list[str] = []
+    # keepwarm_scheduler entry の handler は自分自身を並行に invoke して ping を
+    # 広げるため、Lambda の実行ロールにこれらの関数への InvokeFunction を許可する
+    keepwarm_function_arns: list[str] = []
 
     @computed_field
     @property
@@ -1055,6 +1140,21 @@ class SchedulerContext(BaseModel):
             for h in invoked_handlers
             if h in container_ctx.handlers
         )
+        keepwarm_handlers = {
+            h_key
+            for _key, entry, h_key in entries
+            if isinstance(entry, settings.KeepwarmScheduleEntry)
+            and entry.concurrency > 1
+        }
+        # invoked_function_arn は alias / version 付きで来るため ":*" も許可する
+        keepwarm_function_arns = sorted(
+            f"arn:aws:lambda:{root.region}:${{AWS::AccountId}}:function:"
+            + container_ctx.handlers[h].function_name
+            + suffix
+            for h in keepwarm_handlers
+            if h in container_ctx.handlers
+            for suffix in ("", ":*")
+        )
         sqs_handlers = {
             h_key
             for _key, entry, h_key in entries
@@ -1068,6 +1168,7 @@ class SchedulerContext(BaseModel):
             role_name=f"{resource_prefix}{container_name}-scheduler",
             invoked_function_arns=invoked_function_arns,
             sqs_queue_logical_names=sqs_queue_logical_names,
+            keepwarm_function_arns=keepwarm_function_arns,
         )
 
 
@@ -1112,6 +1213,28 @@ class S3Context(BaseModel):
             )
             for rule in s3.lifecycle_rules
         ]
+        # S3 に置いた大きな応答 (django.response_offload) は短期間で消す
+        for name, c in root.container.items():
+            if c.django and c.django.response_offload:
+                offload = c.django.response_offload
+                lifecycle_ctxs.append(
+                    S3LifecycleRuleContext(
+                        id=f"pocket-response-offload-{name}",
+                        prefix=offload.prefix,
+                        expiration_days=offload.expiration_days,
+                    )
+                )
+            # SQS の claim check で置いた body (消し損ねた分) を消す
+            for key, handler in c.handlers.items():
+                if handler.sqs and handler.sqs.claim_check:
+                    claim_check = handler.sqs.claim_check
+                    lifecycle_ctxs.append(
+                        S3LifecycleRuleContext(
+                            id=f"pocket-sqs-claim-check-{name}-{key}",
+                            prefix=claim_check.prefix,
+                            expiration_days=claim_check.expiration_days,
+                        )
+                    )
         return cls(
             region=root.region,
             bucket_name=s3.bucket_name(root.format_vars),
@@ -1268,6 +1391,8 @@ class CloudFrontContext(BaseModel):
     # distribution 全体に Basic 認証を掛ける managed secret のキー名
     basic_auth: str | None = None
     api_origins: dict[str, str] = {}
+    # api_origins のうち AWS_IAM の Function URL (Lambda 用 OAC で署名する) の handler
+    lambda_oac_origins: list[str] = []
     managed_assets: str | None = None
     deploy_hash: str = ""
     waf: CloudFrontWafContext | None = None
@@ -1346,6 +1471,11 @@ class CloudFrontContext(BaseModel):
     def has_lambda_route(self) -> bool:
         return any(route.is_lambda for route in self.routes)
 
+    @computed_field
+    @property
+    def has_lambda_oac(self) -> bool:
+        return bool(self.lambda_oac_origins)
+
     @computed_field
     @property
     def has_redirect_from(self) -> bool:
@@ -1587,6 +1717,7 @@ class Context(BaseModel):
         """
         for cf_name, cf_ctx in cloudfront_ctx.items():
             api_origins: dict[str, str] = {}
+            lambda_oac_origins: list[str] = []
             for route in cf_ctx.routes:
                 if not (route.is_lambda and route.handler):
                     continue
@@ -1596,13 +1727,23 @@ class Context(BaseModel):
                 container_ctx = containers.get(c_name)
                 if container_ctx and h_key in container_ctx.handlers:
                     handler_ctx = container_ctx.handlers[h_key]
+                    function_url = handler_ctx.function_url
+                    if (
+                        function_url
+                        and function_url.auth_type == "AWS_IAM"
+                        and route.handler not in lambda_oac_origins
+                    ):
+                        lambda_oac_origins.append(route.handler)
                     if not handler_ctx.export_api_domain:
                         container_ctx.handlers[h_key] = handler_ctx.model_copy(
                             update={"export_api_domain": export_name}
                         )
             if api_origins:
                 cloudfront_ctx[cf_name] = cf_ctx.model_copy(
-                    update={"api_origins": api_origins}
+                    update={
+                        "api_origins": api_origins,
+                        "lambda_oac_origins": lambda_oac_origins,
+                    }
                 )
 
     @classmethod
@@ -1704,7 +1845,9 @@ class Context(BaseModel):
 
     @classmethod
     def from_toml(cls, *, stage: str):
-        return cls.from_settings(settings.Settings.from_toml(stage=stage))
+        root_settings = settings.Settings.from_toml(stage=stage)
+        with phase("context_build"):
+            return cls.from_settings(root_settings)
 
     @model_validator(mode="after")
     def check_django(self):
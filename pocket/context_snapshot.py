@@ -0,0 +1,211 @@
+"""検証済み Context の snapshot (Lambda INIT での pocket.toml 再検証の省略)。
+
+`get_context(stage)` は cold start のたびに pocket.runtime.toml を parse し、
+Settings と全 *Context の pydantic 検証を走らせる。この結果は deploy ごとに
+決定的なので、CLI が pocket.runtime.toml の生成時に全 stage 分の Context を
+組み立てて pickle し、隣に CONTEXT_SNAPSHOT_FILENAME として置く。runtime は
+snapshot が使える条件を満たす限り unpickle だけで Context を得る (validator は
+走らない)。
+
+snapshot は以下のどれかが食い違えば使わず、通常の構築に fallback する:
+
+- 読んでいる toml の内容・stage・magic-pocket / pydantic の版 (content hash)
+- Context の構築が参照する環境変数 (`DEPLOY_HASH` 等) と `.env`
+- pocket.toml に project_name が無い場合の pyproject 由来の project 名
+
+pickle は image に同梱されるファイルからしか読まない (コードと同じ信頼境界)。
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+import pydantic
+
+from . import __version__, settings
+from .context import Context, _get_deploy_hash
+from .utils import echo, get_project_name
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+CONTEXT_SNAPSHOT_FILENAME = "pocket.runtime.context.pickle"
+SNAPSHOT_FORMAT = 1
+
+# 生成時は外し、読み込み時も未設定であることを要求する環境変数。
+# build / provision 専用で runtime の Lambda env には載らない
+_CLEARED_ENV = ("POCKET_PERMISSIONS_BOUNDARY_ARN",)
+
+# .env / 環境変数から値を読む BaseSettings 派生のセクション。credential を
+# image に焼かないよう、生成時は環境変数と .env を読ませずに組み立てる
+_ENV_BACKED_SECTIONS: dict[str, type[pydantic.BaseModel]] = {
+    "neon": settings.Neon,
+    "tidb": settings.TiDb,
+    "upstash": settings.Upstash,
+}
+
+
+def snapshot_path(toml_path: Path) -> Path:
+    return toml_path.with_name(CONTEXT_SNAPSHOT_FILENAME)
+
+
+def snapshot_key(toml_text: str, stage: str) -> str:
+    h = hashlib.sha256()
+    for part in (str(SNAPSHOT_FORMAT), __version__, pydantic.VERSION, stage):
+        h.update(part.encode())
+        h.update(b"\0")
+    h.update(toml_text.encode())
+    return h.hexdigest()
+
+
+def _env_backed_names(sections: list[str]) -> list[str]:
+    """BaseSettings セクションが読みうる環境変数名 (小文字。大小無視で照合される)"""
+    names: set[str] = set()
+    for section in sections:
+        for name, field in _ENV_BACKED_SECTIONS[section].model_fields.items():
+            names.add(name.lower())
+            if field.alias:
+                names.add(field.alias.lower())
+    return sorted(names)
+
+
+@contextmanager
+def _isolated_env(names: list[str], deploy_hash: str) -> Iterator[None]:
+    """環境変数 names を外し、.env の無い一時ディレクトリを CWD にする。
+
+    DEPLOY_HASH は git の無い一時ディレクトリでは解決できないため、事前に
+    解決した値を入れておく (Lambda env に CFn が入れる値と同じ)。
+    """
+    lowered = set(names)
+    saved = {k: v for k, v in os.environ.items() if k.lower() in lowered}
+    saved_deploy_hash = os.environ.get("DEPLOY_HASH")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            for k in saved:
+                del os.environ[k]
+            os.environ["DEPLOY_HASH"] = deploy_hash
+            os.chdir(tmp)
+            yield
+        finally:
+            os.chdir(cwd)
+            os.environ.update(saved)
+            if saved_deploy_hash is None:
+                os.environ.pop("DEPLOY_HASH", None)
+            else:
+                os.environ["DEPLOY_HASH"] = saved_deploy_hash
+
+
+def _build_entry(
+    data: dict, stage: str, toml_text: str, project_name: str | None
+) -> dict[str, Any]:
+    stage_data = copy.deepcopy(data)
+    if project_name is not None:
+        stage_data.setdefault("general", {})["project_name"] = project_name
+    context = Context.from_settings(
+        settings.Settings.from_toml_data(stage_data, stage=stage)
+    )
+    expect_env: dict[str, str | None] = dict.fromkeys(_CLEARED_ENV)
+    deploy_hashes = [cf.deploy_hash for cf in context.cloudfront.values()]
+    if any(deploy_hashes):
+        expect_env["DEPLOY_HASH"] = next(h for h in deploy_hashes if h)
+    return {
+        "key": snapshot_key(toml_text, stage),
+        "expect_env": expect_env,
+        "absent_env": _env_backed_names(
+            [name for name in _ENV_BACKED_SECTIONS if getattr(context, name)]
+        ),
+        "project_name": project_name,
+        "context": pickle.dumps(context, protocol=pickle.HIGHEST_PROTOCOL),
+    }
+
+
+def write_context_snapshot(toml_path: Path) -> Path:
+    """toml_path (pocket.runtime.toml) の全 stage 分の Context snapshot を書き出す。
+
+    組み立てに失敗した stage は snapshot に含めない (runtime は通常の構築に
+    fallback し、同じエラーをそこで出す)。古い snapshot を残さないよう、
+    含める stage が無くてもファイルは常に書き直す。
+    """
+    toml_text = toml_path.read_text()
+    data = tomllib.loads(toml_text)
+    general = data.get("general", {})
+    # 一時ディレクトリへ移る前に、CWD に依存する値を解決しておく
+    project_name = None if "project_name" in general else get_project_name()
+    deploy_hash = _get_deploy_hash()
+    entries: dict[str, dict[str, Any]] = {}
+    names = [*_CLEARED_ENV, *_env_backed_names(list(_ENV_BACKED_SECTIONS))]
+    with _isolated_env([n.lower() for n in names], deploy_hash):
+        for stage in general.get("stages", []):
+            try:
+                entries[stage] = _build_entry(data, stage, toml_text, project_name)
+            except Exception as e:  # snapshot は最適化なので生成は止めない
+                echo.warning(
+                    "stage '%s' の context snapshot を生成できませんでした: %s"
+                    % (stage, e)
+                )
+    path = snapshot_path(toml_path)
+    path.write_bytes(
+        pickle.dumps(
+            {"format": SNAPSHOT_FORMAT, "entries": entries},
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+    )
+    # pocket.runtime.toml と同様、非 root の Lambda 実行ユーザーが読めるようにする
+    path.chmod(0o644)
+    return path
+
+
+def _mismatch_reason(entry: dict[str, Any], toml_text: str, stage: str) -> str | None:
+    if entry.get("key") != snapshot_key(toml_text, stage):
+        return "toml / 版が snapshot 生成時と異なります"
+    for name, value in entry["expect_env"].items():
+        if os.environ.get(name) != value:
+            return "環境変数 %s が snapshot 生成時と異なります" % name
+    absent = set(entry["absent_env"])
+    if absent:
+        for name in os.environ:
+            if name.lower() in absent:
+                return "環境変数 %s が設定されています" % name
+        if Path(".env").exists():
+            return ".env があります"
+    if entry["project_name"] is not None:
+        if entry["project_name"] != get_project_name():
+            return "project 名が snapshot 生成時と異なります"
+    return None
+
+
+def load_context_snapshot(toml_path: Path, stage: str) -> Context | None:
+    """snapshot から stage の Context を読む。使えなければ None (通常の構築へ)。"""
+    path = snapshot_path(toml_path)
+    if not path.exists():
+        return None
+    try:
+        snapshot = pickle.loads(path.read_bytes())  # noqa: S301 image 同梱ファイルのみ
+        if snapshot.get("format") != SNAPSHOT_FORMAT:
+            return None
+        entry = snapshot["entries"].get(stage)
+        if entry is None:
+            return None
+        reason = _mismatch_reason(entry, toml_path.read_text(), stage)
+        if reason is not None:
+            echo.warning(
+                "context snapshot を使いません (%s)。通常の構築に fallback します"
+                % reason
+            )
+            return None
+        return pickle.loads(entry["context"])  # noqa: S301
+    except Exception as e:  # 壊れた snapshot で INIT を落とさない
+        echo.warning("context snapshot を読めません (%s)。無視します" % e)
+        return None
@@ -0,0 +1,41 @@
+"""Django の ASGI application 用の Lambda handler (API Gateway payload v2)。
+
+``command = "pocket.django.asgi_handlers.asgi_handler"`` で使う。async view は
+warm な invocation の間で共有される 1 つの event loop で動くため、view の中で
+``asyncio.gather`` して上流の API を並行に呼べる。管理コマンド等の handler は
+引き続き `pocket.django.lambda_handlers` のものを使う。
+"""
+
+from pocket.apigw_asgi import AsgiLambdaHandler
+from pocket.django.compression import compression_options_from_context
+from pocket.django.prewarm import prewarm_from_context
+from pocket.django.response_offload import response_offloader_from_context
+from pocket.django.runtime import close_db_connections
+from pocket.init_profile import emit_init_metrics, phase
+from pocket.keepwarm import keepwarm
+from pocket.runtime import register_snapstart_hooks
+
+from ..utils import get_asgi_application
+
+with phase("django.get_asgi_application"):
+    _application = get_asgi_application()
+
+# URLconf / template / DB 接続など、最初の request が負担していた準備を INIT で行う
+prewarm_from_context()
+
+# Django の ASGIHandler は lifespan に対応しないので "auto" で無効になる。
+# keep-warm の ping は event loop に渡す前に返す
+asgi_handler = keepwarm(
+    AsgiLambdaHandler(
+        _application,
+        offload=response_offloader_from_context(),
+        **compression_options_from_context(),
+    )
+)
+
+
+# SnapStart の snapshot に DB の socket を残さない (restore 後は使えないため)
+register_snapstart_hooks(before=[close_db_connections])
+
+# INIT の最後 (handler module の import 完了時) にフェーズ別計測を 1 回出力する
+emit_init_metrics()
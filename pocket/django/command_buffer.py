@@ -0,0 +1,155 @@
+"""request の間に積んだ management command をまとめて SQS に送る buffer。
+
+view の中で ``pocket_call_command`` を行ごとに呼ぶと、その回数だけ SQS への
+同期の往復が request の中で起きる。`buffer_call_command` は command を request
+単位の buffer に積むだけで、`CommandBufferMiddleware` が応答を返す前に
+`pocket_call_command_many` (send_message_batch で 10 件ずつ) で送る::
+
+    MIDDLEWARE = [
+        ...,
+        "pocket.django.command_buffer.CommandBufferMiddleware",
+    ]
+
+``on_commit=True`` (既定) なら command は DB の transaction が commit された時に
+buffer に入る (rollback されたら送らない)。buffer が無い場所 (middleware の外や
+management command の中) では `pocket_call_command` で即座に送る。
+
+middleware が送る時点で view の処理 (DB の commit) は終わっているため、送信の
+失敗 (`SqsBatchSendError`) は応答を 500 に変えず、log に残して
+`CommandBufferMiddleware.handle_send_error` に渡す。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from botocore.exceptions import BotoCoreError, ClientError
+from django.db import transaction
+from django.http import HttpRequest, HttpResponse
+
+from .utils import SqsBatchSendError, pocket_call_command, pocket_call_command_many
+
+logger = logging.getLogger(__name__)
+
+
+class CommandBuffer:
+    """queue_key ごとに積んだ command を `flush` で送る。"""
+
+    def __init__(self, *, max_workers: int = 1) -> None:
+        self.max_workers = max_workers
+        self.calls: dict[str, list[dict]] = {}
+
+    def add(self, command, args=None, kwargs=None, queue_key="sqsmanagement"):
+        call = {"command": command, "args": args or [], "kwargs": kwargs or {}}
+        self.calls.setdefault(queue_key, []).append(call)
+
+    def discard(self) -> None:
+        self.calls = {}
+
+    def flush(self) -> None:
+        """積んだ command を送る。
+
+        ある queue で送れない entry が残っても残りの queue は送り、最後に
+        送れなかった分をまとめた `SqsBatchSendError` を送出する。AWS の呼び出し
+        自体の失敗 (ClientError / 接続エラー、claim check の S3 put 等) も、その
+        queue の全 command の失敗として含める。
+        """
+        calls, self.calls = self.calls, {}
+        failed: list[tuple[str, dict]] = []
+        for queue_key, queued in calls.items():
+            try:
+                pocket_call_command_many(
+                    queued, queue_key=queue_key, max_workers=self.max_workers
+                )
+            except SqsBatchSendError as exc:
+                failed += exc.failed
+            except (BotoCoreError, ClientError) as exc:
+                reason = {"Code": type(exc).__name__, "Message": str(exc)}
+                failed += [(json.dumps(call), reason) for call in queued]
+        if failed:
+            raise SqsBatchSendError(failed)
+
+
+_current: ContextVar[CommandBuffer | None] = ContextVar(
+    "pocket_command_buffer", default=None
+)
+
+
+@contextmanager
+def command_buffer(*, max_workers: int = 1) -> Iterator[CommandBuffer]:
+    """with の間の `buffer_call_command` を溜め、正常に抜けた時にまとめて送る。
+
+    例外で抜けた場合は送らない (view が失敗した request の command は捨てる)。
+    """
+    buffer = CommandBuffer(max_workers=max_workers)
+    token = _current.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _current.reset(token)
+    buffer.flush()
+
+
+def buffer_call_command(
+    command, args=None, kwargs=None, *, queue_key="sqsmanagement", on_commit=True
+):
+    """command を現在の buffer に積む (buffer が無ければ即座に送る)。"""
+
+    def add():
+        # commit 時点の buffer を見る (buffer を抜けた後の commit なら即座に送る)
+        buffer = _current.get()
+        if buffer is None:
+            pocket_call_command(command, args, kwargs, queue_key=queue_key)
+        else:
+            buffer.add(command, args, kwargs, queue_key=queue_key)
+
+    if on_commit:
+        # atomic block の外なら即座に add が呼ばれる
+        transaction.on_commit(add)
+    else:
+        add()
+
+
+class CommandBufferMiddleware:
+    """request ごとに `command_buffer` を張り、応答を返す前に送る middleware。
+
+    ``ATOMIC_REQUESTS`` の transaction は view の中で commit されるため、
+    ``on_commit`` で積んだ command もこの middleware が送る。view の例外は
+    Django が 500 の応答に変えるので、5xx の応答では積んだ command を捨てる。
+
+    送信の失敗は view の失敗と区別し、応答はそのまま返す。送れなかった command を
+    別の経路で補う場合は :meth:`handle_send_error` を override する。
+    """
+
+    max_workers = 1
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        buffer = CommandBuffer(max_workers=self.max_workers)
+        token = _current.set(buffer)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        if response.status_code >= 500:
+            return response
+        try:
+            buffer.flush()
+        except SqsBatchSendError as exc:
+            self.handle_send_error(request, exc)
+        return response
+
+    def handle_send_error(self, request: HttpRequest, exc: SqsBatchSendError) -> None:
+        """view の成功後に command を送れなかった時に呼ばれる (既定は log のみ)。"""
+        logger.error(
+            "CommandBufferMiddleware: %s (path=%s)",
+            exc,
+            request.path,
+            exc_info=exc,
+        )
@@ -0,0 +1,31 @@
+"""[container.<name>.django.compression] の設定から adapter の圧縮の引数を作る。"""
+
+from __future__ import annotations
+
+import os
+from typing import Any
+
+from .context import DjangoCompressionContext
+
+
+def get_compression_context() -> DjangoCompressionContext | None:
+    """自 container の compression 設定 (Lambda 以外や未設定なら None)。"""
+    stage = os.environ.get("POCKET_STAGE")
+    if not stage:
+        return None
+    from pocket.runtime import get_context
+
+    from .utils import resolve_django_container
+
+    container = resolve_django_container(get_context(stage))
+    if container is None or container.django is None:
+        return None
+    return container.django.compression
+
+
+def compression_options_from_context() -> dict[str, Any]:
+    """adapter に渡す圧縮の引数 (未設定なら圧縮しない)。"""
+    config = get_compression_context()
+    if config is None:
+        return {"compress_min_size": None}
+    return {"compress_min_size": config.min_size, "compress_html": config.html}
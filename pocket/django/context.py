@@ -142,11 +142,64 @@ class DjangoCacheContext(BaseModel):
         )
 
 
+class DjangoPrewarmContext(BaseModel):
+    urlconf: bool
+    database: bool
+    templates: list[str]
+    modules: list[str]
+
+    @classmethod
+    def from_settings(cls, prewarm: settings.DjangoPrewarm) -> DjangoPrewarmContext:
+        return cls(
+            urlconf=prewarm.urlconf,
+            database=prewarm.database,
+            templates=prewarm.templates,
+            modules=prewarm.modules,
+        )
+
+
+class DjangoResponseOffloadContext(BaseModel):
+    bucket_name: str
+    region: str
+    prefix: str
+    threshold: int
+    expires_in: int
+    expiration_days: int
+
+    @classmethod
+    def from_settings(
+        cls, offload: settings.DjangoResponseOffload, *, root
+    ) -> DjangoResponseOffloadContext:
+        # s3 が無い設定は Settings.check_response_offload_requires_s3 で弾いている
+        return cls(
+            bucket_name=root.s3.bucket_name(root.format_vars),
+            region=root.region,
+            prefix=offload.prefix,
+            threshold=offload.threshold,
+            expires_in=offload.expires_in,
+            expiration_days=offload.expiration_days,
+        )
+
+
+class DjangoCompressionContext(BaseModel):
+    min_size: int
+    html: bool
+
+    @classmethod
+    def from_settings(
+        cls, compression: settings.DjangoCompression
+    ) -> DjangoCompressionContext:
+        return cls(min_size=compression.min_size, html=compression.html)
+
+
 class DjangoContext(BaseModel):
     storages: dict[str, DjangoStorageContext] = {}
     caches: dict[str, DjangoCacheContext] = {}
     settings: dict[str, Any] = {}
     project_dir: str | None = None
+    prewarm: DjangoPrewarmContext | None = None
+    response_offload: DjangoResponseOffloadContext | None = None
+    compression: DjangoCompressionContext | None = None
 
     @classmethod
     def from_settings(
@@ -173,4 +226,21 @@ class DjangoContext(BaseModel):
             caches=caches,
             settings=django.settings,
             project_dir=django.project_dir,
+            prewarm=(
+                DjangoPrewarmContext.from_settings(django.prewarm)
+                if django.prewarm
+                else None
+            ),
+            response_offload=(
+                DjangoResponseOffloadContext.from_settings(
+                    django.response_offload, root=root
+                )
+                if django.response_offload and root
+                else None
+            ),
+            compression=(
+                DjangoCompressionContext.from_settings(django.compression)
+                if django.compression
+                else None
+            ),
         )
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from django.db.backends.postgresql.base import (
+    DatabaseWrapper as PostgresqlDatabaseWrapper,
+)
+
+from pocket.runtime import get_dsql_token
+
+
+class DatabaseWrapper(PostgresqlDatabaseWrapper):
+    """Aurora DSQL 用 PostgreSQL backend。
+
+    DSQL は IAM 認証トークン (約 15 分で失効) をパスワードに使う。settings の
+    PASSWORD は cold start 時のトークンのままなので、接続確立のたびに
+    `pocket.runtime.get_dsql_token` の値で差し替える。トークンは失効が近いときだけ
+    再生成されるため、有効な間の接続にトークン生成の処理は加わらない。
+    確立済みの接続はトークン失効後も使い続けられる。
+    """
+
+    def get_new_connection(self, conn_params):
+        token = get_dsql_token()
+        if token:
+            conn_params = {**conn_params, "password": token}
+        return super().get_new_connection(conn_params)
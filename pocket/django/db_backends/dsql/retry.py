@@ -0,0 +1,225 @@
+"""Aurora DSQL の楽観的並行性制御 (OCC) の競合を再試行する。
+
+DSQL はロックを取らず、コミット時に競合を検出してトランザクションを失敗させる
+(SQLSTATE 40001。メッセージに OC000 / OC001 等の DSQL 固有コードが入る)。競合した
+トランザクションは DB 側で巻き戻っているので、最初からやり直せば成功しうる。
+ここでは、競合だけを判定し、jitter 付きの backoff を挟んで上限回数まで
+トランザクションを再実行する decorator と middleware を提供する。
+
+- `retry_on_conflict`: 関数を ``transaction.atomic`` で包み、競合なら再実行する
+- `DsqlRetryMiddleware`: ``ATOMIC_REQUESTS = True`` の request を競合時に再実行する
+
+再実行の回数は `retry_stats()` で取得できる (プロセス内の累計)。
+"""
+
+from __future__ import annotations
+
+import functools
+import random
+import re
+import threading
+import time
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+from typing import TYPE_CHECKING, Any, TypeVar, cast
+
+if TYPE_CHECKING:
+    from django.http import HttpRequest, HttpResponse
+
+# SQLSTATE 40001 = serialization_failure。DSQL の OCC 競合はこれで返る
+_CONFLICT_SQLSTATE = "40001"
+# DSQL の競合のエラーコード (OC000: データ競合、OC001: スキーマ競合)。識別子や値の
+# 一部に含まれる文字列と取り違えないよう、独立した token としてだけ照合する
+_CONFLICT_CODE_RE = re.compile(r"\bOC00[01]\b")
+
+DEFAULT_ATTEMPTS = 3
+DEFAULT_BASE_DELAY = 0.02
+DEFAULT_MAX_DELAY = 1.0
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_stats = {"conflicts": 0, "retries": 0, "exhausted": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def retry_stats() -> dict[str, int]:
+    """プロセス内の累計 (conflicts: 検出した競合、retries: 再実行、exhausted: 断念)"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_retry_stats() -> None:
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+def is_conflict_error(exc: BaseException | None) -> bool:
+    """例外チェーンを辿り DSQL の OCC 競合 (再実行で成功しうる失敗) かを判定する。
+
+    rds backend の `is_auth_error` と同じく psycopg を import せず、SQLSTATE
+    (psycopg は ``sqlstate``、psycopg2 は ``pgcode``) と、SQLSTATE を持たない例外
+    では primary message (DETAIL 等の値を含む行を除く) の DSQL の競合コードを見る。
+    """
+    seen: set[int] = set()
+    stack: list[BaseException | None] = [exc]
+    while stack:
+        e = stack.pop()
+        if e is None or id(e) in seen:
+            continue
+        seen.add(id(e))
+        code = getattr(e, "sqlstate", None) or getattr(e, "pgcode", None)
+        if code == _CONFLICT_SQLSTATE:
+            return True
+        if code is None and _CONFLICT_CODE_RE.search(_primary_message(e)):
+            return True
+        stack.append(e.__cause__)
+        stack.append(e.__context__)
+    return False
+
+
+def _primary_message(exc: BaseException) -> str:
+    diag = getattr(exc, "diag", None)
+    primary = getattr(diag, "message_primary", None)
+    if primary:
+        return primary
+    return str(exc).partition("\n")[0]
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """attempt 回目 (1 始まり) の失敗後に待つ秒数 (full jitter)。
+
+    競合した相手と同じ間隔で再実行すると再び衝突するため、上限の中で乱数にする。
+    """
+    return random.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1))))  # noqa: S311
+
+
+def run_with_retry(
+    func: Callable[[], Any],
+    *,
+    attempts: int = DEFAULT_ATTEMPTS,
+    base_delay: float = DEFAULT_BASE_DELAY,
+    max_delay: float = DEFAULT_MAX_DELAY,
+) -> Any:
+    """func() を実行し、OCC 競合で失敗したら backoff を挟んで最大 attempts 回まで試す。
+
+    func は 1 回ごとに完結したトランザクションであること (途中まで書いた状態を
+    残さない)。競合以外の例外と、最後の試行の競合はそのまま送出する。
+    """
+    if attempts < 1:
+        raise ValueError("attempts must be >= 1: %s" % attempts)
+    for attempt in range(1, attempts + 1):
+        try:
+            return func()
+        # psycopg を import しないため型で絞れない。競合以外は即 re-raise する
+        except Exception as exc:
+            if not is_conflict_error(exc):
+                raise
+            _count("conflicts")
+            if attempt == attempts:
+                _count("exhausted")
+                raise
+        _count("retries")
+        time.sleep(backoff_delay(attempt, base_delay, max_delay))
+    raise AssertionError("unreachable")
+
+
+def retry_on_conflict(
+    func: Callable[..., Any] | None = None,
+    *,
+    using: str | None = None,
+    attempts: int = DEFAULT_ATTEMPTS,
+    base_delay: float = DEFAULT_BASE_DELAY,
+    max_delay: float = DEFAULT_MAX_DELAY,
+) -> Any:
+    """関数を ``transaction.atomic(using)`` で包み、OCC 競合なら再実行する decorator。
+
+    ``@retry_on_conflict`` / ``@retry_on_conflict(attempts=5)`` のどちらでも使える。
+    既に atomic block の中で呼ばれた場合は再実行しない (外側のトランザクションは
+    競合で中断されており、やり直せるのは外側だけのため)。
+    """
+
+    def decorator(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            from django.db import transaction
+
+            def run():
+                # atomic は decorator 兼用で返り値の型が定まらないので、context
+                # manager として使う形に絞る
+                atomic = cast(AbstractContextManager, transaction.atomic(using=using))
+                with atomic:
+                    return fn(*args, **kwargs)
+
+            if transaction.get_connection(using).in_atomic_block:
+                return run()
+            return run_with_retry(
+                run, attempts=attempts, base_delay=base_delay, max_delay=max_delay
+            )
+
+        return wrapper  # type: ignore[return-value]
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+class DsqlRetryMiddleware:
+    """``ATOMIC_REQUESTS = True`` の request を、OCC 競合で失敗したら再実行する。
+
+    ATOMIC_REQUESTS では view 全体が 1 トランザクションになり、競合で失敗すると
+    書き込みは全て巻き戻る。この middleware はその失敗を検出し、自分より後ろの
+    middleware と view を最初から呼び直す。view の例外は ``process_exception`` で
+    受ける。再実行する競合には仮の 500 response を返して例外を握るため、Django は
+    その試行を 500 として log せず ``got_request_exception`` も送らない (error の
+    報告は、再実行を使い切った最後の競合の 1 回だけになる)。仮の response は後ろの
+    middleware の response 処理を通ってから捨てられる。request body は最初の
+    読み出しで cache されるので、再実行でも同じ値を読める。
+
+    ``MIDDLEWARE`` では DB に触る middleware より前に置く。回数や待ち時間は
+    subclass で attempts / base_delay / max_delay を上書きして変える。
+    """
+
+    attempts = DEFAULT_ATTEMPTS
+    base_delay = DEFAULT_BASE_DELAY
+    max_delay = DEFAULT_MAX_DELAY
+
+    _CONFLICT_ATTR = "_pocket_dsql_conflict"
+    _RETRYABLE_ATTR = "_pocket_dsql_retryable"
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        for attempt in range(1, self.attempts + 1):
+            setattr(request, self._CONFLICT_ATTR, False)
+            setattr(request, self._RETRYABLE_ATTR, attempt < self.attempts)
+            response = self.get_response(request)
+            if not getattr(request, self._CONFLICT_ATTR):
+                return response
+            _count("conflicts")
+            if attempt == self.attempts:
+                _count("exhausted")
+                return response
+            _count("retries")
+            time.sleep(backoff_delay(attempt, self.base_delay, self.max_delay))
+        raise AssertionError("unreachable")
+
+    def process_exception(
+        self, request: HttpRequest, exception: Exception
+    ) -> HttpResponse | None:
+        if not is_conflict_error(exception):
+            return None
+        setattr(request, self._CONFLICT_ATTR, True)
+        if not getattr(request, self._RETRYABLE_ATTR, False):
+            # 最後の試行は Django の通常の例外処理 (500 の log と signal) に任せる
+            return None
+        from django.http import HttpResponseServerError
+
+        # __call__ が捨てて再実行する。500 なので後ろの SessionMiddleware 等は保存しない
+        return HttpResponseServerError()
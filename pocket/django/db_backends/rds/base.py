@@ -4,7 +4,10 @@ from django.db.backends.postgresql.base import (
     DatabaseWrapper as PostgresqlDatabaseWrapper,
 )
 
-from pocket.django.db_backends.rds.credentials import connect_with_credential_refresh
+from pocket.django.db_backends.rds.credentials import (
+    apply_cached_rds_settings,
+    connect_with_credential_refresh,
+)
 
 
 class DatabaseWrapper(PostgresqlDatabaseWrapper):
@@ -13,10 +16,14 @@ class DatabaseWrapper(PostgresqlDatabaseWrapper):
     master password の自動ローテーション (``ManageMasterUserPassword=True``) 直後に
     warm Lambda が古いパスワードで再接続して認証失敗する問題に対処する。接続確立時に
     認証エラーを捕捉したら RDS シークレットを再取得して 1 度だけ再接続し、cold start を
-    待たずに自己修復する。
+    待たずに自己修復する。接続前には secret cache (`pocket.runtime.get_secret`) の
+    DATABASE_URL を反映するため、cache が先にローテーションを拾っていれば認証失敗を
+    経ずに新しい値で接続する。
     """
 
     def get_new_connection(self, conn_params):
+        if apply_cached_rds_settings(self.settings_dict):
+            conn_params = self.get_connection_params()
         return connect_with_credential_refresh(
             super().get_new_connection,
             conn_params,
@@ -41,28 +41,56 @@ def is_auth_error(exc: BaseException | None) -> bool:
     return False
 
 
+def _uses_rds_secret() -> bool:
+    return bool(
+        os.environ.get("POCKET_RDS_SECRET_ARN")
+        or os.environ.get("POCKET_RDS_SSM_PARAM")
+    )
+
+
 def refresh_rds_settings(settings_dict: dict[str, Any]) -> bool:
     """RDS シークレットを再取得し、settings_dict の認証情報を最新値で更新する。
 
     RDS 認証情報 (Secrets Manager の ``POCKET_RDS_SECRET_ARN`` または SSM の
     ``POCKET_RDS_SSM_PARAM``) から ``DATABASE_URL`` を再構築し、その値を parse して
     settings_dict を上書きする。これにより以降の再接続は新パスワードで直接成功する。
+    secret cache も読み直すため、他の接続も新しい値を使う。
     更新できれば True、RDS 認証情報が無い (= RDS 以外) 場合は False。
     """
-    if not os.environ.get("POCKET_RDS_SECRET_ARN") and not os.environ.get(
-        "POCKET_RDS_SSM_PARAM"
-    ):
+    if not _uses_rds_secret():
         return False
-    from pocket.runtime import _set_rds_database_url
+    from pocket.runtime import refresh_secret
 
-    _set_rds_database_url()
-    database_url = os.environ.get("DATABASE_URL")
+    database_url = refresh_secret("DATABASE_URL")
     if not database_url:
         return False
     settings_dict.update(parse_database_url_credentials(database_url))
     return True
 
 
+def apply_cached_rds_settings(settings_dict: dict[str, Any]) -> bool:
+    """secret cache 上の DATABASE_URL が settings_dict と食い違えば上書きする。
+
+    接続確立の直前に呼ぶ。cache が TTL / background 更新でローテーション後の
+    パスワードを得ていれば、旧パスワードでの接続失敗を経ずに新しい値で接続できる。
+    更新したら True (呼び出し側は接続パラメータを作り直す)。
+    """
+    if not _uses_rds_secret():
+        return False
+    from pocket.runtime import get_secret
+
+    database_url = get_secret("DATABASE_URL")
+    if not database_url:
+        return False
+    credentials = parse_database_url_credentials(database_url)
+    if all(
+        str(settings_dict.get(key) or "") == value for key, value in credentials.items()
+    ):
+        return False
+    settings_dict.update(credentials)
+    return True
+
+
 def connect_with_credential_refresh(
     connect: Callable[[dict[str, Any]], Any],
     conn_params: dict[str, Any],
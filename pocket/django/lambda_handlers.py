@@ -2,10 +2,21 @@ import json
 import os
 from subprocess import run
 
-from apig_wsgi import make_lambda_handler
+from apig_wsgi import make_lambda_handler as make_apig_wsgi_handler
 from django.core.management import call_command
 
+from pocket.apigw_wsgi import make_lambda_handler
+from pocket.django.compression import compression_options_from_context
+from pocket.django.prewarm import prewarm_from_context
+from pocket.django.response_offload import response_offloader_from_context
+from pocket.django.runtime import close_db_connections
 from pocket.django.utils import pocket_delete_sqs_task
+from pocket.init_profile import emit_init_metrics, phase
+from pocket.keepwarm import keepwarm
+from pocket.lambda_streaming import make_wsgi_streaming_handler
+from pocket.runtime import register_snapstart_hooks
+from pocket.sqs_batch import get_concurrency, process_records
+from pocket.sqs_claim_check import resolved_body
 
 from ..utils import MANAGE_HANDLER_SUCCESS_SENTINEL, get_wsgi_application
 
@@ -42,15 +53,43 @@ def _wsgi_app_with_path_fix(app):
     return wrapped
 
 
-wsgi_handler = make_lambda_handler(
-    _wsgi_app_with_path_fix(get_wsgi_application()),
-    binary_support=True,
-    non_binary_content_type_prefixes=(
-        "application/json",
-        "application/vnd.api+json",
-    ),
+with phase("django.get_wsgi_application"):
+    _application = get_wsgi_application()
+
+# URLconf / template / DB 接続など、最初の request が負担していた準備を INIT で行う
+prewarm_from_context()
+
+# API Gateway (payload v2) は pocket の adapter で直接 environ を作る。v1 / ALB の
+# event だけ apig_wsgi に渡す (v1 の path はデコード済みなので transcode が要る)。
+# pocket.keepwarm_scheduler の ping はどちらにも渡さずに返す
+wsgi_handler = keepwarm(
+    make_lambda_handler(
+        _application,
+        # Lambda の応答上限を超える body を S3 に置いて 303 を返す (opt-in)
+        offload=response_offloader_from_context(),
+        # [django.compression] があれば text 系の応答を圧縮する (opt-in)
+        **compression_options_from_context(),
+        fallback=make_apig_wsgi_handler(
+            _wsgi_app_with_path_fix(_application),
+            binary_support=True,
+            non_binary_content_type_prefixes=(
+                "application/json",
+                "application/vnd.api+json",
+            ),
+        ),
+    )
 )
 
+# [handlers.<key>] streaming = true 用 (Function URL。pocket.lambda_streaming で起動)
+wsgi_streaming_handler = keepwarm(make_wsgi_streaming_handler(_application))
+
+
+# SnapStart の snapshot に DB の socket を残さない (restore 後は使えないため)
+register_snapstart_hooks(before=[close_db_connections])
+
+# INIT の最後 (handler module の import 完了時) にフェーズ別計測を 1 回出力する
+emit_init_metrics()
+
 
 def _handle_resetdb():
     """public スキーマを DROP して再作成する"""
@@ -62,6 +101,7 @@ def _handle_resetdb():
     print("resetdb: public スキーマをリセットしました")
 
 
+@keepwarm
 def management_command_handler(event, context):
     print(event)
     # EventBridge Scheduler 経由 (pocket.django.management_lambda_scheduler) からは
@@ -96,28 +136,47 @@ def management_command_handler(event, context):
 def _run_sqs_management_command_record(record):
     """SQS record 1 件の management command を実行し、成功した message を削除する。"""
     print(record["body"])
-    data = json.loads(record["body"])
-    call_command(data["command"], *data["args"], **data["kwargs"])
-    pocket_delete_sqs_task(record["receiptHandle"])
+    # claim check の body は S3 から読み、message を消した後に object も消す
+    with resolved_body(record["body"]) as body:
+        data = json.loads(body)
+        call_command(data["command"], *data["args"], **data["kwargs"])
+        pocket_delete_sqs_task(record["receiptHandle"])
+
+
+def _run_sqs_management_command_records(records):
+    """record を [handlers.<key>.sqs] concurrency 本の thread で並行に処理する。
+
+    worker thread が張った DB 接続は thread の終了時に閉じる。失敗した
+    (record, 例外) を records の順に返す。
+    """
+    return process_records(
+        records,
+        _run_sqs_management_command_record,
+        concurrency=get_concurrency(),
+        on_worker_exit=close_db_connections,
+    )
 
 
 def sqs_management_command_handler(event, context):
     print(event)
-    for record in event["Records"]:
-        _run_sqs_management_command_record(record)
+    if get_concurrency() <= 1:
+        for record in event["Records"]:
+            _run_sqs_management_command_record(record)
+        return
+    # 並行時は全 record を処理してから最初の失敗を投げる (成功分は削除済み)
+    failures = _run_sqs_management_command_records(event["Records"])
+    if failures:
+        raise failures[0][1]
 
 
 def sqs_management_command_report_failures_handler(event, context):
     print(event)
     batch_item_failures = []
-    for record in event["Records"]:
-        try:
-            _run_sqs_management_command_record(record)
-        # batchItemFailures で失敗 record を SQS に報告するには、management
-        # command が投げる任意の例外を捕捉する必要がある (仕組み上の要請)
-        except Exception as e:
-            print(e)
-            batch_item_failures.append({"itemIdentifier": record["messageId"]})
+    # batchItemFailures で失敗 record を SQS に報告するには、management
+    # command が投げる任意の例外を record ごとに捕捉する必要がある (仕組み上の要請)
+    for record, e in _run_sqs_management_command_records(event["Records"]):
+        print(e)
+        batch_item_failures.append({"itemIdentifier": record["messageId"]})
     return {"batchItemFailures": batch_item_failures}
 
 
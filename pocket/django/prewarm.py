@@ -0,0 +1,107 @@
+"""Lambda INIT 中の Django の pre-warm ([container.<name>.django.prewarm])。
+
+Lambda は INIT フェーズに CPU を全量割り当てるが、handler module の import で
+行うのは `get_wsgi_application()` までで、URLconf の解決 (全 view の import)、
+template のコンパイル、DB への初回接続 (TLS handshake) は新しい実行環境の最初の
+request が負担していた。`prewarm()` はこれらを INIT 中に済ませる。
+
+各 step の所要時間は 1 行ずつ stdout に出し、`POCKET_INIT_PROFILE=1` なら
+`django.prewarm.<step>` のフェーズとしても記録する。pre-warm は最適化なので、
+失敗した step は警告して先へ進む (同じ処理は最初の request で改めて走る)。
+"""
+
+from __future__ import annotations
+
+import importlib
+import os
+import time
+from collections.abc import Callable
+
+from pocket.init_profile import phase
+
+from .context import DjangoPrewarmContext
+
+
+def _import_modules(modules: list[str]) -> None:
+    for name in modules:
+        importlib.import_module(name)
+
+
+def _resolve_urlconf() -> None:
+    from django.urls import get_resolver
+
+    # reverse_dict の参照で resolver が全 pattern を populate する
+    get_resolver().reverse_dict  # noqa: B018
+
+
+def _load_templates(names: list[str]) -> None:
+    from django.template.loader import get_template
+
+    for name in names:
+        get_template(name)
+
+
+def _connect_database() -> None:
+    from django.db import connections
+
+    # CONN_MAX_AGE が 0 だと最初の request の開始時に閉じられるため、接続を
+    # 持ち越せるのは CONN_MAX_AGE > 0 / None の場合 (0 でも DNS / TLS の初期化は済む)
+    with connections["default"].cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+
+def _run_step(name: str, func: Callable[[], None]) -> float | None:
+    """step を実行して所要時間 (ms) を出力する。失敗したら警告して None。"""
+    start = time.perf_counter()
+    try:
+        with phase("django.prewarm.%s" % name):
+            func()
+    # pre-warm の失敗で INIT を落とさない (DB の一時的な不調等)
+    except Exception as e:
+        print("pocket prewarm: %s failed: %r" % (name, e))
+        return None
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print("pocket prewarm: %s %.1fms" % (name, elapsed_ms))
+    return elapsed_ms
+
+
+def prewarm(config: DjangoPrewarmContext) -> dict[str, float | None]:
+    """config に従って pre-warm し、step ごとの所要時間 (ms。失敗は None) を返す。
+
+    順序は module → URLconf → template → DB。module の import が URLconf の解決で
+    触る view の import を兼ねることがあるため先に行う。
+    """
+    steps: list[tuple[str, Callable[[], None]]] = []
+    if config.modules:
+        steps.append(("modules", lambda: _import_modules(config.modules)))
+    if config.urlconf:
+        steps.append(("urlconf", _resolve_urlconf))
+    if config.templates:
+        steps.append(("templates", lambda: _load_templates(config.templates)))
+    if config.database:
+        steps.append(("database", _connect_database))
+    return {name: _run_step(name, func) for name, func in steps}
+
+
+def get_prewarm_context() -> DjangoPrewarmContext | None:
+    """自 container の prewarm 設定 (Lambda 以外や未設定なら None)。"""
+    stage = os.environ.get("POCKET_STAGE")
+    if not stage:
+        return None
+    from pocket.runtime import get_context
+
+    from .utils import resolve_django_container
+
+    container = resolve_django_container(get_context(stage))
+    if container is None or container.django is None:
+        return None
+    return container.django.prewarm
+
+
+def prewarm_from_context() -> dict[str, float | None] | None:
+    """pocket.toml に prewarm 設定があれば pre-warm する (handler の import 時用)。"""
+    config = get_prewarm_context()
+    if config is None:
+        return None
+    with phase("django.prewarm"):
+        return prewarm(config)
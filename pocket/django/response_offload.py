@@ -0,0 +1,38 @@
+"""[container.<name>.django.response_offload] の設定から offloader を作る。"""
+
+from __future__ import annotations
+
+import os
+
+from pocket.response_offload import ResponseOffloader
+
+from .context import DjangoResponseOffloadContext
+
+
+def get_response_offload_context() -> DjangoResponseOffloadContext | None:
+    """自 container の response_offload 設定 (Lambda 以外や未設定なら None)。"""
+    stage = os.environ.get("POCKET_STAGE")
+    if not stage:
+        return None
+    from pocket.runtime import get_context
+
+    from .utils import resolve_django_container
+
+    container = resolve_django_container(get_context(stage))
+    if container is None or container.django is None:
+        return None
+    return container.django.response_offload
+
+
+def response_offloader_from_context() -> ResponseOffloader | None:
+    """pocket.toml に response_offload 設定があれば offloader を返す。"""
+    config = get_response_offload_context()
+    if config is None:
+        return None
+    return ResponseOffloader(
+        config.bucket_name,
+        prefix=config.prefix,
+        threshold=config.threshold,
+        expires_in=config.expires_in,
+        region=config.region,
+    )
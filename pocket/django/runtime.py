@@ -4,6 +4,7 @@ import os
 from typing import Any
 
 from ..general_context import GeneralContext
+from ..init_profile import phase
 from ..runtime import (
     get_context,
     set_envs_from_aws_resources,
@@ -13,8 +14,17 @@ from .utils import resolve_django_context
 
 
 def set_envs():
-    set_envs_from_resources()
-    set_envs_from_secrets()
+    with phase("django.set_envs_from_resources"):
+        set_envs_from_resources()
+    with phase("django.set_envs_from_secrets"):
+        set_envs_from_secrets()
+
+
+def close_db_connections():
+    """全 DB 接続を閉じる (SnapStart の snapshot に DB の socket を残さないため)。"""
+    from django.db import connections
+
+    connections.close_all()
 
 
 def add_or_append_env(key: str, value: str):
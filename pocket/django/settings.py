@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from typing import Any, Literal
+from typing import Annotated, Any, Literal
 
-from pydantic import BaseModel, ConfigDict, model_validator
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 # staticfiles の publish 方式 (DB/KVS の ProvisioningMode と同じ思想の静的版)。
 #   "deploy"  : deploy / promote が collectstatic + upload を実行する (zero-config)。
@@ -74,6 +74,68 @@ class DjangoCache(BaseModel):
     location_subdir: str = "{stage}"
 
 
+class DjangoPrewarm(BaseModel):
+    """[container.<name>.django.prewarm] — INIT 中に初回 request の準備をする。"""
+
+    model_config = ConfigDict(extra="forbid")
+
+    urlconf: bool = True
+    """URLconf を解決する (全 view module の import を含む)。"""
+
+    database: bool = True
+    """connections["default"] に接続して SELECT 1 で確認する。"""
+
+    templates: list[str] = []
+    """読み込んで template loader の cache に載せる template 名。"""
+
+    modules: list[str] = []
+    """import しておく module。"""
+
+
+class DjangoResponseOffload(BaseModel):
+    """[container.<name>.django.response_offload] — 大きな応答を S3 経由で返す。
+
+    Lambda の同期応答 (6 MB) を超える body を stage の bucket に置き、client には
+    presigned URL への 303 を返す。
+    """
+
+    model_config = ConfigDict(extra="forbid")
+
+    threshold: Annotated[int, Field(ge=1)] = 5 * 1024 * 1024
+    """この bytes を超える body (base64 化後) を S3 に置く。"""
+
+    prefix: str = "pocket/response-offload/"
+    """body を置く bucket 内の prefix。lifecycle rule もこの prefix に付く。"""
+
+    expires_in: Annotated[int, Field(ge=1, le=43200)] = 300
+    """presigned URL の有効期間 (秒)。Lambda の一時認証情報より長くは有効にならない。"""
+
+    expiration_days: Annotated[int, Field(ge=1)] = 1
+    """置いた body を lifecycle rule で消すまでの日数。"""
+
+    @model_validator(mode="after")
+    def check_prefix(self):
+        if not self.prefix or self.prefix.startswith("/"):
+            raise ValueError("prefix must be non-empty and must not start with '/'")
+        return self
+
+
+class DjangoCompression(BaseModel):
+    """[container.<name>.django.compression] — text 系の応答を gzip / br で圧縮する。
+
+    HTTP API は応答を圧縮しないため、wsgi_handler / asgi_handler の adapter で
+    ``Accept-Encoding`` に応じて圧縮する。
+    """
+
+    model_config = ConfigDict(extra="forbid")
+
+    min_size: Annotated[int, Field(ge=1)] = 1024
+    """この bytes 以上の body を圧縮する。"""
+
+    html: bool = False
+    """text/html も圧縮する。CSRF token 等を載せた HTML は BREACH の対象になる。"""
+
+
 class Django(BaseModel):
     model_config = ConfigDict(extra="forbid")
 
@@ -81,6 +143,9 @@ class Django(BaseModel):
     caches: dict[str, DjangoCache] | None = None
     settings: dict[str, Any] = {}
     project_dir: str | None = None
+    prewarm: DjangoPrewarm | None = None
+    response_offload: DjangoResponseOffload | None = None
+    compression: DjangoCompression | None = None
 
     @model_validator(mode="after")
     def set_defaults(self):
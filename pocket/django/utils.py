@@ -1,14 +1,17 @@
 import json
 import os
+import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
-import boto3
 from django.core.management import call_command
 
-from ..context import Context
+from .. import aws_clients
+from ..context import Context, SqsClaimCheckContext
 from ..general_context import GeneralContext
 from ..runtime import get_context
+from ..sqs_claim_check import offload_body
 from .db_url import parse_database_url_credentials
 
 
@@ -261,6 +264,13 @@ def get_databases(*, stage: str | None = None) -> dict:
     stage = stage or os.environ.get("POCKET_STAGE")
 
     database_url = os.environ.get("DATABASE_URL")
+    # DSQL は DATABASE_URL を持たず、Lambda env の endpoint と IAM トークンで接続する。
+    # [rds] / [neon] 等と併用した stage では DATABASE_URL の DB を default にする
+    # (DSQL は直接 SQL を実行する副 DB として使える)
+    dsql_endpoint = os.environ.get("POCKET_DSQL_ENDPOINT")
+    if not database_url and dsql_endpoint and stage and get_context(stage=stage).dsql:
+        return {"default": _dsql_database(dsql_endpoint)}
+
     if not database_url:
         from ..utils import get_toml_path
 
@@ -293,6 +303,25 @@ def get_databases(*, stage: str | None = None) -> dict:
     return {"default": db}
 
 
+# DSQL の cluster が持つ database は postgres だけ。runtime が発行するのは
+# generate_db_connect_admin_auth_token の admin 用トークンなので、user も admin に固定
+DSQL_DATABASE_NAME = "postgres"
+DSQL_USER = "admin"
+
+
+def _dsql_database(endpoint: str) -> dict:
+    # PASSWORD は cold start 時のトークン。backend が接続のたびに有効なものへ差し替える
+    return {
+        "ENGINE": "pocket.django.db_backends.dsql",
+        "NAME": DSQL_DATABASE_NAME,
+        "USER": DSQL_USER,
+        "PASSWORD": os.environ.get("POCKET_DSQL_TOKEN", ""),
+        "HOST": endpoint,
+        "PORT": "5432",
+        "OPTIONS": {"sslmode": "require"},
+    }
+
+
 # システム CA バンドルの候補パス。distro ごとに配置が異なるため順に探索する。
 # Lambda の base image (Amazon Linux 2023 / RHEL 系) は ca-bundle.crt、
 # Debian/Ubuntu 系 (ローカル開発環境を含む) は ca-certificates.crt に置く。
@@ -328,14 +357,80 @@ def _detect_engine(stage: str | None, scheme: str) -> str:
     return "django.db.backends.sqlite3"
 
 
-_sqs_client = None
+def _get_sqs_client():
+    return aws_clients.client("sqs")
 
 
-def _get_sqs_client():
-    global _sqs_client
-    if _sqs_client is None:
-        _sqs_client = boto3.client("sqs")
-    return _sqs_client
+# send_message_batch の上限 (1 回あたりの entry 数 / payload 合計 bytes)
+SQS_BATCH_MAX_ENTRIES = 10
+SQS_BATCH_MAX_BYTES = 256 * 1024
+# 失敗した entry (SenderFault でないもの) を送り直す回数
+SQS_BATCH_RETRIES = 3
+
+
+class SqsBatchSendError(Exception):
+    """send_message_batch で送れなかった entry が残った。
+
+    failed は送れなかった message body とその理由 (Code / Message) の list。
+    """
+
+    def __init__(self, failed: list[tuple[str, dict]]):
+        self.failed = failed
+        super().__init__(
+            "%d message(s) could not be sent: %s"
+            % (len(failed), ", ".join(sorted({f["Code"] for _, f in failed})))
+        )
+
+
+def _get_claim_check(queue_key: str) -> SqsClaimCheckContext | None:
+    """queue_key の handler の claim check 設定 (無ければ None)。
+
+    queue_key は POCKET_<queue_key>_QUEUEURL と同じく、自 container の handler 名か
+    ``<container>_<handler>`` の修飾名。
+    """
+    stage = os.environ.get("POCKET_STAGE")
+    if not stage:
+        return None
+    context = get_context(stage=stage)
+    key = queue_key.lower()
+    candidates = []
+    own = context.container.get(os.environ.get("POCKET_CONTAINER", ""))
+    if own:
+        candidates.append(own.handlers.get(key))
+    for name, c in context.container.items():
+        if key.startswith(name + "_"):
+            candidates.append(c.handlers.get(key[len(name) + 1 :]))
+    for handler in candidates:
+        if handler and handler.sqs:
+            return handler.sqs.claim_check
+    return None
+
+
+def _command_message_body(
+    command, args=None, kwargs=None, claim_check: SqsClaimCheckContext | None = None
+) -> str:
+    body = json.dumps({"command": command, "args": args or [], "kwargs": kwargs or {}})
+    if claim_check is None:
+        return body
+    return offload_body(
+        body,
+        bucket_name=claim_check.bucket_name,
+        prefix=claim_check.prefix,
+        threshold=claim_check.threshold,
+        region=claim_check.region,
+    )
+
+
+def _use_sqs(queue_key: str, force_direct: bool, force_sqs: bool) -> str | None:
+    """SQS 経由で送るなら queue URL を、直接実行するなら None を返す。"""
+    if force_direct and force_sqs:
+        raise Exception("force_direct and force_sqs cannot be True at the same time")
+    queue_url = os.environ.get("POCKET_%s_QUEUEURL" % queue_key.upper())
+    if force_direct or not (force_sqs or queue_url):
+        return None
+    if queue_url is None:
+        raise Exception("POCKET_%s_QUEUEURL is not set." % queue_key.upper())
+    return queue_url
 
 
 def pocket_call_command(
@@ -351,27 +446,114 @@ def pocket_call_command(
     Basically, if POCKET_SQSMANAGEMENT_QUEUEURL is set, send command to SQS.
     Else, call command directly.
     """
-    if force_direct and force_sqs:
-        raise Exception("force_direct and force_sqs cannot be True at the same time")
     args = args or []
     kwargs = kwargs or {}
-    queue_url = os.environ.get("POCKET_%s_QUEUEURL" % queue_key.upper())
-    use_sqs = force_sqs or queue_url
-    if force_direct:
-        use_sqs = False
-    if use_sqs:
-        if queue_url is None:
-            raise Exception("POCKET_%s_QUEUEURL is not set." % queue_key.upper())
+    queue_url = _use_sqs(queue_key, force_direct, force_sqs)
+    if queue_url:
         _get_sqs_client().send_message(
             QueueUrl=queue_url,
-            MessageBody=json.dumps(
-                {"command": command, "args": args, "kwargs": kwargs}
+            MessageBody=_command_message_body(
+                command, args, kwargs, _get_claim_check(queue_key)
             ),
         )
     else:
         call_command(command, *args, **kwargs)
 
 
+def _split_batches(bodies: list[str]) -> list[list[str]]:
+    """body を send_message_batch 1 回分 (10 件 / 256 KB) ずつに分ける。"""
+    batches: list[list[str]] = []
+    size = 0
+    for body in bodies:
+        body_size = len(body.encode())
+        if (
+            not batches
+            or len(batches[-1]) >= SQS_BATCH_MAX_ENTRIES
+            or size + body_size > SQS_BATCH_MAX_BYTES
+        ):
+            batches.append([])
+            size = 0
+        batches[-1].append(body)
+        size += body_size
+    return batches
+
+
+def _send_batch(queue_url: str, bodies: list[str]) -> list[tuple[str, dict]]:
+    """1 batch を送り、retry しても送れなかった (body, 失敗理由) を返す。"""
+    pending = dict(enumerate(bodies))
+    failed: list[tuple[str, dict]] = []
+    for attempt in range(SQS_BATCH_RETRIES + 1):
+        if attempt:
+            time.sleep(0.1 * 2 ** (attempt - 1))
+        response = _get_sqs_client().send_message_batch(
+            QueueUrl=queue_url,
+            Entries=[
+                {"Id": str(i), "MessageBody": body} for i, body in pending.items()
+            ],
+        )
+        retry = {}
+        for f in response.get("Failed", []):
+            body = pending[int(f["Id"])]
+            # SenderFault は message 自体の問題なので送り直しても成功しない
+            if f.get("SenderFault") or attempt == SQS_BATCH_RETRIES:
+                failed.append((body, f))
+            else:
+                retry[int(f["Id"])] = body
+        if not retry:
+            break
+        pending = retry
+    return failed
+
+
+def pocket_send_sqs_messages(
+    queue_url: str, bodies: list[str], *, max_workers: int = 1
+) -> None:
+    """body を send_message_batch でまとめて送る (max_workers > 1 で batch を並行送信)。
+
+    送れなかった entry が残ったら `SqsBatchSendError` を投げる (他の entry は送信済み)。
+    """
+    batches = _split_batches(bodies)
+    if max_workers > 1 and len(batches) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as pool:
+            results = list(pool.map(lambda b: _send_batch(queue_url, b), batches))
+    else:
+        results = [_send_batch(queue_url, b) for b in batches]
+    failed = [f for result in results for f in result]
+    if failed:
+        raise SqsBatchSendError(failed)
+
+
+def pocket_call_command_many(
+    calls,
+    force_direct=False,
+    force_sqs=False,
+    queue_key="sqsmanagement",
+    max_workers=1,
+):
+    """複数の management command をまとめて呼ぶ (`pocket_call_command` の一括版)。
+
+    calls は ``{"command": ..., "args": [...], "kwargs": {...}}`` (SQS の message と
+    同じ形。args / kwargs は省略可) の iterable。SQS 経由なら 1 件ずつの
+    send_message の代わりに send_message_batch で 10 件ずつ送る。
+    """
+    calls = list(calls)
+    queue_url = _use_sqs(queue_key, force_direct, force_sqs)
+    if queue_url:
+        claim_check = _get_claim_check(queue_key)
+        bodies = [
+            _command_message_body(
+                c["command"], c.get("args"), c.get("kwargs"), claim_check
+            )
+            for c in calls
+        ]
+        pocket_send_sqs_messages(queue_url, bodies, max_workers=max_workers)
+    else:
+        for c in calls:
+            call_command(
+                c["command"], *(c.get("args") or []), **(c.get("kwargs") or {})
+            )
+
+
 def pocket_delete_sqs_task(receipt_handle: str, queue_key="sqsmanagement"):
     queue_url = os.environ.get("POCKET_%s_QUEUEURL" % queue_key.upper())
     if queue_url is None:
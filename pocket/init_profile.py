@@ -0,0 +1,114 @@
+"""コールドスタート (Lambda INIT) のフェーズ別計測。
+
+`POCKET_INIT_PROFILE=1` のときだけ有効 (opt-in)。無効時の `phase()` は環境変数を
+1 回見るだけで何も記録しない。
+
+計測値は `get_init_phases()` で取得でき、`emit_init_metrics()` が cold start ごとに
+1 回だけ CloudWatch Embedded Metric Format (EMF) の JSON 1 行として stdout に出す。
+Lambda の stdout は CloudWatch Logs に送られ、EMF 行は自動でメトリクス化される。
+
+フェーズは入れ子になりうる (例: `django.get_wsgi_application` の中で
+`django.set_envs` が走る)。値はそれぞれの区間の経過時間 (ms) で、同名のフェーズが
+複数回走った場合は合算する。並列に解決される呼び出し (secret の個別読み出し等) は
+各スレッドでの所要時間がそのまま記録されるため、合計は wall time を超えうる。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+INIT_PROFILE_ENV = "POCKET_INIT_PROFILE"
+# EMF の namespace (CloudWatch メトリクスの名前空間)
+INIT_PROFILE_NAMESPACE_ENV = "POCKET_INIT_PROFILE_NAMESPACE"
+_DEFAULT_NAMESPACE = "MagicPocket/ColdStart"
+
+_phases: dict[str, float] = {}
+_lock = threading.Lock()
+_emitted = False
+
+
+def is_enabled() -> bool:
+    return os.environ.get(INIT_PROFILE_ENV, "").lower() in ("1", "true")
+
+
+def record_phase(name: str, elapsed_ms: float) -> None:
+    with _lock:
+        _phases[name] = _phases.get(name, 0.0) + elapsed_ms
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """`with phase("name"):` の区間の経過時間を記録する (無効時は何もしない)。
+
+    例外で抜けた場合も記録する (どこで時間を使って落ちたかも知りたいため)。
+    """
+    if not is_enabled():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, (time.perf_counter() - start) * 1000)
+
+
+def get_init_phases() -> dict[str, float]:
+    """記録済みのフェーズ別経過時間 (ms) を記録順で返す (コピー)。"""
+    with _lock:
+        return dict(_phases)
+
+
+def build_emf(phases: dict[str, float]) -> dict:
+    """フェーズ別経過時間から EMF のログイベント (dict) を組み立てる。"""
+    function_name = os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local")
+    namespace = os.environ.get(INIT_PROFILE_NAMESPACE_ENV) or _DEFAULT_NAMESPACE
+    event: dict = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": namespace,
+                    "Dimensions": [["FunctionName"]],
+                    "Metrics": [
+                        {"Name": name, "Unit": "Milliseconds"} for name in phases
+                    ],
+                }
+            ],
+        },
+        "FunctionName": function_name,
+    }
+    for name, elapsed_ms in phases.items():
+        event[name] = round(elapsed_ms, 3)
+    return event
+
+
+def emit_init_metrics() -> dict | None:
+    """記録済みフェーズを EMF の JSON 1 行として stdout に出す (プロセスで 1 回だけ)。
+
+    無効時・記録が無い時・出力済みの時は何もせず None を返す。出力した場合は
+    出力した EMF の dict を返す。
+    """
+    global _emitted
+    if not is_enabled():
+        return None
+    phases = get_init_phases()
+    with _lock:
+        if _emitted or not phases:
+            return None
+        _emitted = True
+    event = build_emf(phases)
+    print(json.dumps(event, separators=(",", ":")), flush=True)
+    return event
+
+
+def reset_init_phases() -> None:
+    """記録と出力済みフラグを消す (テスト用)。"""
+    global _emitted
+    with _lock:
+        _phases.clear()
+        _emitted = False
@@ -0,0 +1,75 @@
+"""keep-warm ping (`pocket.keepwarm_scheduler`) の fast path。
+
+scheduler は ``{"pocket_keepwarm": {"concurrency": N}}`` で handler を 1 回 invoke
+する。受けた Lambda は自分自身を N - 1 回並行に invoke し、子の ping はそれぞれ
+少し待ってから返る。N 個の invocation が同時に走るので、N 個の実行環境が
+warm に保たれる。
+
+ping は API Gateway の event でも management command でもないので、`keepwarm`
+で包んだ handler は apig_wsgi / Django / ログ出力に触れる前に返す。
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from pocket import aws_clients
+
+logger = logging.getLogger(__name__)
+
+KEEPWARM_EVENT_KEY = "pocket_keepwarm"
+
+# 子の ping が返るまでの待ち時間。全ての子が並行に走っている間は同じ実行環境が
+# 次の ping を受けられないので、Lambda は ping ごとに別の実行環境を割り当てる
+HOLD_SECONDS = 0.1
+
+
+def is_keepwarm_event(event: Any) -> bool:
+    return isinstance(event, dict) and KEEPWARM_EVENT_KEY in event
+
+
+def _ping(function_arn: str) -> bool:
+    client = aws_clients.client("lambda")
+    payload = {KEEPWARM_EVENT_KEY: {"concurrency": 1, "hold": True}}
+    try:
+        response = client.invoke(
+            FunctionName=function_arn, Payload=json.dumps(payload).encode()
+        )
+    # 1 つの ping の失敗 (throttle 等) で他の ping や schedule を失敗させない
+    except Exception:
+        logger.warning("keepwarm: failed to invoke %s", function_arn, exc_info=True)
+        return False
+    return "FunctionError" not in response
+
+
+def handle_keepwarm(event: dict[str, Any], context: Any) -> dict[str, Any]:
+    """ping を処理し、warm にした実行環境の数を返す。"""
+    options = event[KEEPWARM_EVENT_KEY] or {}
+    concurrency = int(options.get("concurrency", 1))
+    if concurrency <= 1:
+        if options.get("hold"):
+            time.sleep(HOLD_SECONDS)
+        return {"keepwarm": True, "warmed": 1}
+    # 自分も 1 つに数える。invoked_function_arn は alias / version 付きの ARN なので
+    # 子の ping も同じ version の実行環境に届く
+    function_arn = context.invoked_function_arn
+    with ThreadPoolExecutor(max_workers=concurrency - 1) as executor:
+        results = list(executor.map(_ping, [function_arn] * (concurrency - 1)))
+    return {"keepwarm": True, "warmed": 1 + sum(results)}
+
+
+def keepwarm(handler):
+    """handler を keep-warm ping に即答するよう包む。"""
+
+    @functools.wraps(handler)
+    def wrapped(event, context):
+        if is_keepwarm_event(event):
+            return handle_keepwarm(event, context)
+        return handler(event, context)
+
+    return wrapped
@@ -0,0 +1,264 @@
+"""Lambda response streaming 用の最小 runtime (Runtime API client)。
+
+Python の Lambda runtime (awslambdaric) は handler の戻り値を丸ごと buffer して
+返すため、response streaming (Function URL の ``InvokeMode: RESPONSE_STREAM``) を
+使えない。この module は Runtime API を直接話す小さな runtime loop で、handler が
+`StreamingResponse` を返すと body の iterable を chunk ごとに
+``Lambda-Runtime-Function-Response-Mode: streaming`` で送る。
+
+`[container.<name>.handlers.<key>] streaming = true` の handler は、CFn が
+ImageConfig の EntryPoint をこの runtime (``python -m pocket.lambda_streaming``) に
+差し替え、Command の handler (``module.function``) を引数に渡して起動する。
+
+HTTP (Function URL) の応答は、JSON の prelude (statusCode / headers / cookies) と
+8 byte の NUL 区切りを body の前に置く形式で送る (`http_response_chunks`)。body は
+base64 化せずそのまま送るため、6 MB の上限と 2 重のメモリ確保が無くなる。
+"""
+
+from __future__ import annotations
+
+import base64
+import http.client
+import importlib
+import json
+import os
+import sys
+import time
+import traceback
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from typing import Any
+
+from pocket.apigw_wsgi import get_environ, split_headers
+
+RUNTIME_API_ENV = "AWS_LAMBDA_RUNTIME_API"
+_API_PREFIX = "/2018-06-01/runtime"
+
+# Function URL の streaming 応答 (HTTP integration) の content type と区切り
+HTTP_INTEGRATION_CONTENT_TYPE = "application/vnd.awslambda.http-integration-response"
+_PRELUDE_DELIMITER = b"\x00" * 8
+
+_ERROR_TYPE_TRAILER = "Lambda-Runtime-Function-Error-Type"
+_ERROR_BODY_TRAILER = "Lambda-Runtime-Function-Error-Body"
+
+
+@dataclass
+class StreamingResponse:
+    """handler の戻り値。body は chunk (bytes) の iterable で、送りながら消費される。"""
+
+    body: Iterable[bytes]
+    content_type: str = "application/octet-stream"
+
+
+def http_response_chunks(
+    status_code: int,
+    headers: dict[str, str],
+    cookies: list[str],
+    body: Iterable[bytes],
+) -> Iterator[bytes]:
+    """Function URL 向けに prelude と body を並べる。"""
+    prelude = {"statusCode": status_code, "headers": headers, "cookies": cookies}
+    yield json.dumps(prelude).encode() + _PRELUDE_DELIMITER
+    yield from body
+
+
+def _wsgi_chunks(result: Iterable[bytes], state: dict[str, Any]) -> Iterator[bytes]:
+    """WSGI の戻り値を prelude + body の chunk として逐次 yield する。
+
+    WSGI では最初の空でない chunk まで start_response を遅らせてよいため、prelude は
+    その chunk を得てから作る。write() callable に書かれた分も順に流す。
+    """
+    written: list[bytes] = state["written"]
+    try:
+        iterator = iter(result)
+        head = b""
+        for chunk in iterator:
+            if chunk:
+                head = chunk
+                break
+        if "status" not in state:
+            raise RuntimeError("WSGI application did not call start_response")
+        headers, cookies = split_headers(state["headers"])
+        # 以降は status を送った後なので、start_response の再呼び出しは例外にする
+        state["sent"] = True
+        yield from http_response_chunks(state["status"], headers, cookies, ())
+        yield from written
+        written.clear()
+        yield head
+        for chunk in iterator:
+            if written:
+                yield from written
+                written.clear()
+            yield chunk
+        yield from written
+    finally:
+        close = getattr(result, "close", None)
+        if close is not None:
+            close()
+
+
+def make_wsgi_streaming_handler(app) -> Callable[[Any, Any], StreamingResponse]:
+    """Function URL の event (payload v2) で WSGI app を呼び、応答を stream する。
+
+    body を 1 つの bytes に結合せず、app の iterable を送信しながら消費する
+    (Django の StreamingHttpResponse / FileResponse がそのまま chunk になる)。
+    """
+
+    def handler(event, context) -> StreamingResponse:
+        environ = get_environ(event, context)
+        state: dict[str, Any] = {"written": []}
+
+        def start_response(status, response_headers, exc_info=None):
+            if exc_info is not None and state.get("sent"):
+                raise exc_info[1].with_traceback(exc_info[2])
+            state["status"] = int(status.split(" ", 1)[0])
+            state["headers"] = list(response_headers)
+            return state["written"].append
+
+        result = app(environ, start_response)
+        return StreamingResponse(
+            _wsgi_chunks(result, state), content_type=HTTP_INTEGRATION_CONTENT_TYPE
+        )
+
+    return handler
+
+
+class LambdaContext:
+    """awslambdaric の context と同じ属性を持つ invocation の context。"""
+
+    def __init__(self, request_id: str, headers: http.client.HTTPMessage) -> None:
+        self.aws_request_id = request_id
+        self.invoked_function_arn = headers.get("Lambda-Runtime-Invoked-Function-Arn")
+        self.function_name = os.environ.get("AWS_LAMBDA_FUNCTION_NAME")
+        self.function_version = os.environ.get("AWS_LAMBDA_FUNCTION_VERSION")
+        self.memory_limit_in_mb = os.environ.get("AWS_LAMBDA_FUNCTION_MEMORY_SIZE")
+        self.log_group_name = os.environ.get("AWS_LAMBDA_LOG_GROUP_NAME")
+        self.log_stream_name = os.environ.get("AWS_LAMBDA_LOG_STREAM_NAME")
+        self.identity = None
+        self.client_context = None
+        self._deadline_ms = int(headers.get("Lambda-Runtime-Deadline-Ms") or 0)
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(self._deadline_ms - int(time.time() * 1000), 0)
+
+
+def _error_payload(e: BaseException) -> dict[str, Any]:
+    return {
+        "errorMessage": str(e),
+        "errorType": type(e).__name__,
+        "stackTrace": traceback.format_exception(type(e), e, e.__traceback__),
+    }
+
+
+class RuntimeClient:
+    """Lambda Runtime API (AWS_LAMBDA_RUNTIME_API) の client。"""
+
+    def __init__(self, address: str) -> None:
+        self._address = address
+        self._conn = http.client.HTTPConnection(address)
+
+    def _request(
+        self, method: str, path: str, body: bytes | None = None, headers=None
+    ) -> tuple[http.client.HTTPResponse, bytes]:
+        self._conn.request(method, _API_PREFIX + path, body=body, headers=headers or {})
+        res = self._conn.getresponse()
+        return res, res.read()
+
+    def next_invocation(self) -> tuple[str, Any, http.client.HTTPMessage]:
+        res, body = self._request("GET", "/invocation/next")
+        request_id = res.headers["Lambda-Runtime-Aws-Request-Id"]
+        trace_id = res.headers.get("Lambda-Runtime-Trace-Id")
+        if trace_id:
+            os.environ["_X_AMZN_TRACE_ID"] = trace_id
+        return request_id, json.loads(body), res.headers
+
+    def stream_response(
+        self, request_id: str, content_type: str, chunks: Iterable[bytes]
+    ) -> None:
+        """chunks を chunked transfer で送る。途中の例外は trailer で報告する。"""
+        conn = self._conn
+        conn.putrequest("POST", "%s/invocation/%s/response" % (_API_PREFIX, request_id))
+        conn.putheader("Lambda-Runtime-Function-Response-Mode", "streaming")
+        conn.putheader("Transfer-Encoding", "chunked")
+        conn.putheader("Content-Type", content_type)
+        conn.putheader("Trailer", "%s, %s" % (_ERROR_TYPE_TRAILER, _ERROR_BODY_TRAILER))
+        conn.endheaders()
+        trailers = b""
+        try:
+            for chunk in chunks:
+                if chunk:
+                    conn.send(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        # body の生成中の例外は、送信済みの応答に trailer で付けて報告する
+        except Exception as e:
+            traceback.print_exc()
+            error_body = base64.b64encode(json.dumps(_error_payload(e)).encode())
+            trailers = b"%s: %s\r\n%s: %s\r\n" % (
+                _ERROR_TYPE_TRAILER.encode(),
+                type(e).__name__.encode(),
+                _ERROR_BODY_TRAILER.encode(),
+                error_body,
+            )
+        conn.send(b"0\r\n%s\r\n" % trailers)
+        conn.getresponse().read()
+
+    def post_error(self, request_id: str, e: BaseException) -> None:
+        self._post_error("/invocation/%s/error" % request_id, e)
+
+    def post_init_error(self, e: BaseException) -> None:
+        self._post_error("/init/error", e)
+
+    def _post_error(self, path: str, e: BaseException) -> None:
+        self._request(
+            "POST",
+            path,
+            body=json.dumps(_error_payload(e)).encode(),
+            headers={
+                "Content-Type": "application/json",
+                "Lambda-Runtime-Function-Error-Type": "Unhandled",
+            },
+        )
+
+
+def load_handler(spec: str) -> Callable[[Any, Any], Any]:
+    """``module.function`` 形式の handler を import する。"""
+    module_name, _, attr = spec.rpartition(".")
+    if not module_name:
+        raise ValueError("handler must be 'module.function': %s" % spec)
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def handle_invocation(client: RuntimeClient, handler: Callable[[Any, Any], Any]):
+    """invocation を 1 件受け取り、handler の結果を送る。"""
+    request_id, event, headers = client.next_invocation()
+    try:
+        result = handler(event, LambdaContext(request_id, headers))
+    # handler の任意の例外を Runtime API に invocation error として報告する
+    except Exception as e:
+        traceback.print_exc()
+        client.post_error(request_id, e)
+        return
+    if isinstance(result, StreamingResponse):
+        client.stream_response(request_id, result.content_type, result.body)
+    else:
+        body = json.dumps(result).encode()
+        client.stream_response(request_id, "application/json", [body])
+
+
+def main(argv: list[str] | None = None) -> None:
+    """``python -m pocket.lambda_streaming <module.function>``: runtime loop。"""
+    argv = sys.argv[1:] if argv is None else argv
+    client = RuntimeClient(os.environ[RUNTIME_API_ENV])
+    try:
+        if len(argv) != 1:
+            raise ValueError("usage: python -m pocket.lambda_streaming <handler>")
+        handler = load_handler(argv[0])
+    except Exception as e:
+        traceback.print_exc()
+        client.post_init_error(e)
+        sys.exit(1)
+    while True:
+        handle_invocation(client, handler)
+
+
+if __name__ == "__main__":
+    main()
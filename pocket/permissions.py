@@ -49,9 +49,11 @@ _SM_ACTIONS: list[str] = ["secretsmanager:*"]
 
 # secrets.store == "ssm" 時
 # DeleteParameter (単数) は単一パラメータ削除経路 (secret_store.delete_stored_value:
-# dsql endpoint の unpublish / migrate-secret-paths の旧パス削除) 用
+# dsql endpoint の unpublish / migrate-secret-paths の旧パス削除) 用。
+# GetParameters は user secret の一括読み出し (secret_store.read_stored_values) 用
 _SSM_ACTIONS: list[str] = [
     "ssm:GetParameter",
+    "ssm:GetParameters",
     "ssm:PutParameter",
     "ssm:DeleteParameter",
     "ssm:DeleteParameters",
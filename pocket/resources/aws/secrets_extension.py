@@ -0,0 +1,147 @@
+"""AWS Parameters and Secrets Lambda Extension の localhost HTTP cache 経由の読み出し。
+
+`[container.<name>.secrets_extension]` を設定すると、CFn テンプレートが Lambda env に
+SECRETS_EXTENSION_PORT_ENV と extension の設定 (port / TTL) を入れる。この環境変数が
+ある Lambda では、runtime の secret 読み出し (SM の pocket store、user secret、RDS
+認証情報) を SM / SSM API ではなく extension の HTTP cache から行う。cache は
+実行環境内の invocation 間で共有されるため、INIT の待ち時間と API 呼び出し数が減る。
+
+extension 自体は image の /opt/extensions に同梱する (container image の Lambda は
+Layer を使えない)。環境変数が無い CLI 等では何もしない。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from functools import cached_property
+from typing import Any
+
+from .secretsmanager import SecretsManager
+
+SECRETS_EXTENSION_PORT_ENV = "POCKET_SECRETS_EXTENSION_PORT"
+DEFAULT_PORT = 2773
+# extension は INIT 中に起動するため、最初の数回は接続を拒否されたり、listen した
+# 後もまだ準備中のエラー (HTTP 400) を返したりすることがある
+_CONNECT_ATTEMPTS = 20
+_CONNECT_RETRY_INTERVAL = 0.05
+_TIMEOUT = 5
+
+# 対象未存在時に extension が返すエラー本文に含まれる AWS のエラーコード
+_NOT_FOUND_CODES = ("ParameterNotFound", "ResourceNotFoundException")
+
+
+class SecretsExtensionError(Exception):
+    pass
+
+
+def extension_port() -> int | None:
+    """extension 経由で読む設定なら port を返す (未設定なら None)。"""
+    value = os.environ.get(SECRETS_EXTENSION_PORT_ENV)
+    return int(value) if value else None
+
+
+def serves_region(region: str) -> bool:
+    """region の secret を extension で読めるか (extension は自 region 専用)。"""
+    if extension_port() is None:
+        return False
+    own = os.environ.get("AWS_REGION") or os.environ.get("AWS_DEFAULT_REGION")
+    return own is None or own == region
+
+
+def _get(path: str, params: dict[str, str]) -> dict[str, Any] | None:
+    """extension に GET する。対象未存在なら None。
+
+    接続の拒否と、対象未存在以外のエラー応答 (起動直後の準備中等) は
+    _CONNECT_ATTEMPTS 回まで待って再試行する。
+    """
+    url = "http://localhost:%d%s?%s" % (
+        extension_port() or DEFAULT_PORT,
+        path,
+        urllib.parse.urlencode(params),
+    )
+    request = urllib.request.Request(  # noqa: S310 localhost の extension 固定
+        url,
+        headers={
+            "X-Aws-Parameters-Secrets-Token": os.environ.get("AWS_SESSION_TOKEN", "")
+        },
+    )
+    for attempt in range(_CONNECT_ATTEMPTS):
+        try:
+            with urllib.request.urlopen(request, timeout=_TIMEOUT) as res:  # noqa: S310
+                return json.loads(res.read())
+        except urllib.error.HTTPError as e:
+            body = e.read().decode(errors="replace")
+            if any(code in body for code in _NOT_FOUND_CODES):
+                return None
+            if attempt == _CONNECT_ATTEMPTS - 1:
+                raise SecretsExtensionError(
+                    "Parameters and Secrets Lambda Extension returned %d for %s: %s"
+                    % (e.code, path, body)
+                ) from e
+            time.sleep(_CONNECT_RETRY_INTERVAL)
+        # HTTPError は URLError の subclass なので、先に捕捉している
+        except urllib.error.URLError:
+            if attempt == _CONNECT_ATTEMPTS - 1:
+                raise
+            time.sleep(_CONNECT_RETRY_INTERVAL)
+    raise AssertionError("unreachable")
+
+
+def get_secret_value(secret_id: str) -> dict[str, Any] | None:
+    """GetSecretValue 相当のレスポンス dict (未存在なら None)。"""
+    return _get("/secretsmanager/get", {"secretId": secret_id})
+
+
+def get_parameter_value(name: str) -> str | None:
+    """SecureString を復号した parameter の値 (未存在なら None)。"""
+    res = _get(
+        "/systemsmanager/parameters/get", {"name": name, "withDecryption": "true"}
+    )
+    if res is None:
+        return None
+    return res["Parameter"]["Value"]
+
+
+def get_stored_value(name: str, store: str) -> str | None:
+    """secret_store の正準名 ``name`` を store に応じて読む (未存在なら None)。"""
+    if store == "ssm":
+        return get_parameter_value(name)
+    res = get_secret_value(name)
+    return None if res is None else res["SecretString"]
+
+
+class ExtensionSecretsManager(SecretsManager):
+    """pocket store (SM) を extension 経由で読む SecretsManager。
+
+    書き込み系 (update / delete) は継承した SM API をそのまま使う。書き込みは読んだ
+    内容への差分なので、extension の cache (最大 TTL 秒古い) ではなく
+    GetSecretValue で読み直した値を元にする (古い内容を書き戻して、他の更新を
+    消さないため)。SSM の pocket store は GetParametersByPath 1 回で読めて
+    extension が by-path 読み出しに対応していないため、extension 経由にしない。
+    """
+
+    @cached_property
+    def _pocket_secrets_response(self):
+        return get_secret_value(self.context.pocket_key)
+
+    def _read_directly(self) -> None:
+        direct = SecretsManager._pocket_secrets_response.func(self)
+        self.__dict__["_pocket_secrets_response"] = direct
+
+    def update_secrets(self, secrets: dict[str, str | dict[str, str]]):
+        self._read_directly()
+        super().update_secrets(secrets)
+
+    def delete_secrets(self):
+        self._read_directly()
+        super().delete_secrets()
+
+    def delete_secret_keys(self, keys: set[str]):
+        # 残すキーも API の値から作る (update_secrets はもう一度読み直す)
+        self._read_directly()
+        super().delete_secret_keys(keys)
@@ -4,8 +4,7 @@ import json
 from functools import cached_property
 from typing import TYPE_CHECKING
 
-import boto3
-
+from pocket import aws_clients
 from pocket.utils import echo
 
 if TYPE_CHECKING:
@@ -21,7 +20,7 @@ class SecretsManager:
 
     def __init__(self, context: SecretsContext) -> None:
         self.context = context
-        self.client = boto3.client("secretsmanager", region_name=context.region)
+        self.client = aws_clients.client("secretsmanager", region_name=context.region)
 
     def delete_secrets(self):
         echo.log("Deleting pocket secrets %s ..." % self.context.pocket_key)
@@ -3,8 +3,7 @@ from __future__ import annotations
 from functools import cached_property
 from typing import TYPE_CHECKING
 
-import boto3
-
+from pocket import aws_clients
 from pocket.utils import echo
 
 if TYPE_CHECKING:
@@ -16,7 +15,7 @@ class SsmStore:
 
     def __init__(self, context: SecretsContext) -> None:
         self.context = context
-        self.client = boto3.client("ssm", region_name=context.region)
+        self.client = aws_clients.client("ssm", region_name=context.region)
 
     def _param_path(self, name: str) -> str:
         return f"/{self.context.pocket_key}/{name}"
@@ -0,0 +1,124 @@
+"""Lambda の応答上限を超える body を S3 に置き、303 で presigned URL へ誘導する。
+
+Lambda の同期応答 (API Gateway / Function URL の BUFFERED) は 6 MB が上限で、
+超えると invocation が失敗し client には中身の無い 502 が返る。`ResponseOffloader`
+は handler が組み立てた応答 dict の body が閾値を超えたら S3 に put し、
+``303 See Other`` + ``Location: <presigned URL>`` に置き換える。view 側は普通に
+大きな応答を返すだけでよい。
+
+置いた object は bucket の lifecycle rule で消す (`django.response_offload`)。
+offload した件数と bytes は CloudWatch EMF の JSON 1 行として stdout に出す。
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import os
+import time
+import uuid
+from typing import Any
+
+from pocket import aws_clients
+
+# EMF の namespace (init_profile の MagicPocket/ColdStart と並べる)
+METRICS_NAMESPACE = "MagicPocket/ResponseOffload"
+
+# put_object に引き継ぐ応答 header (小文字) と put_object の引数名
+_OBJECT_HEADERS = {
+    "content-type": "ContentType",
+    "content-encoding": "ContentEncoding",
+    "content-disposition": "ContentDisposition",
+    "content-language": "ContentLanguage",
+    "cache-control": "CacheControl",
+}
+
+
+def build_emf(size: int, elapsed_ms: float) -> dict[str, Any]:
+    """offload 1 件分の EMF のログイベント (dict) を組み立てる。"""
+    function_name = os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local")
+    return {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": METRICS_NAMESPACE,
+                    "Dimensions": [["FunctionName"]],
+                    "Metrics": [
+                        {"Name": "OffloadedResponses", "Unit": "Count"},
+                        {"Name": "OffloadedBytes", "Unit": "Bytes"},
+                        {"Name": "OffloadMilliseconds", "Unit": "Milliseconds"},
+                    ],
+                }
+            ],
+        },
+        "FunctionName": function_name,
+        "OffloadedResponses": 1,
+        "OffloadedBytes": size,
+        "OffloadMilliseconds": round(elapsed_ms, 3),
+    }
+
+
+class ResponseOffloader:
+    """payload v2 形式の応答 dict を受け取り、大きければ S3 + 303 に置き換える。
+
+    offload するのは status 200 の応答だけ (303 の先で GET し直して同じ内容が
+    得られるのは 200 のときだけなので)。cookie は 303 の応答にそのまま付ける。
+    """
+
+    def __init__(
+        self,
+        bucket_name: str,
+        *,
+        prefix: str,
+        threshold: int,
+        expires_in: int = 300,
+        region: str | None = None,
+    ) -> None:
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.threshold = threshold
+        self.expires_in = expires_in
+        self.region = region
+
+    def __call__(self, response: dict[str, Any]) -> dict[str, Any]:
+        body = response.get("body") or ""
+        if response.get("statusCode") != 200 or len(body) <= self.threshold:
+            return response
+        start = time.perf_counter()
+        if response.get("isBase64Encoded"):
+            data = base64.b64decode(body)
+        else:
+            data = body.encode("utf-8")
+        headers = response.get("headers") or {}
+        url = self._upload(data, headers)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(json.dumps(build_emf(len(data), elapsed_ms), separators=(",", ":")))
+        redirect: dict[str, Any] = {
+            "statusCode": 303,
+            "headers": {"location": url, "cache-control": "no-store"},
+            "isBase64Encoded": False,
+            "body": "",
+        }
+        if response.get("cookies"):
+            redirect["cookies"] = response["cookies"]
+        return redirect
+
+    def _upload(self, data: bytes, headers: dict[str, str]) -> str:
+        # presigned URL を SigV4 で作るため、s3v4 の client で put も presign も行う
+        # (最初の offload で作られ、INIT では作らない)
+        client = aws_clients.client(
+            "s3", region_name=self.region, signature_version="s3v4"
+        )
+        key = f"{self.prefix}{uuid.uuid4().hex}"
+        extra = {
+            param: headers[name]
+            for name, param in _OBJECT_HEADERS.items()
+            if name in headers
+        }
+        client.put_object(Bucket=self.bucket_name, Key=key, Body=data, **extra)
+        return client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket_name, "Key": key},
+            ExpiresIn=self.expires_in,
+        )
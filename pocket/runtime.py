@@ -1,26 +1,80 @@
 from __future__ import annotations
 
 import os
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from functools import cache
-from typing import TYPE_CHECKING
-
-import boto3
+from typing import TYPE_CHECKING, Any
 
 from pocket.general_context import GeneralContext
 
+from . import aws_clients, settings
 from .context import Context
+from .context_snapshot import load_context_snapshot
+from .init_profile import (  # noqa: F401 (emit / get は INIT 計測の公開 API)
+    emit_init_metrics,
+    get_init_phases,
+    phase,
+)
+from .resources.aws import secrets_extension
+from .secret_cache import SecretCache
 from .settings import ManagedSecretSpec
 from .utils import echo, get_stage
 
 if TYPE_CHECKING:
-    from .context import ContainerContext
+    from .context import ContainerContext, SecretsContext
 
 
 @cache
 def get_context(stage: str) -> Context:
+    # CLI が pocket.runtime.toml の隣に置いた検証済み snapshot があれば使う
+    with phase("context_snapshot"):
+        context = load_context_snapshot(settings.get_toml_path(), stage)
+    if context is not None:
+        return context
     return Context.from_toml(stage=stage)
 
 
+# INIT の AWS 呼び出し (secret 読み出し / describe_stacks / get_queue_url) を
+# 並列に解決する際の最大 worker 数。"1" なら従来どおり呼び出し元スレッドで直列に
+# 実行する (切り分け用)。
+INIT_CONCURRENCY_ENV = "POCKET_INIT_CONCURRENCY"
+_DEFAULT_INIT_CONCURRENCY = 8
+
+
+def _init_concurrency() -> int:
+    value = os.environ.get(INIT_CONCURRENCY_ENV)
+    if not value:
+        return _DEFAULT_INIT_CONCURRENCY
+    concurrency = int(value)
+    if concurrency < 1:
+        raise ValueError("%s must be >= 1: %s" % (INIT_CONCURRENCY_ENV, value))
+    return concurrency
+
+
+def _resolve_concurrently(calls: Sequence[Callable[[], Any]]) -> list[Any]:
+    """互いに独立した呼び出し群を thread pool で並列に実行し、結果を順序どおり返す。
+
+    INIT のレイテンシを「各 AWS 呼び出しの合計」から「最も遅い呼び出し」へ縮める
+    ためのもの。結果の反映 (os.environ への書き込み等) は呼び出し元が返り値を
+    使って **元の順序で** 行うこと (後勝ちの上書き順を直列実行と一致させる)。
+    例外は submit 順で最初に失敗したものをそのまま伝播させる (fail-fast の意味は
+    直列実行と同じ。残りの呼び出しは完了を待ってから抜ける)。
+    """
+    workers = min(_init_concurrency(), len(calls))
+    if workers <= 1:
+        return [call() for call in calls]
+    # client は aws_clients が lock の下で生成するため、各スレッドで初回生成が
+    # 重なっても boto3 default session の遅延初期化は競合しない
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="pocket-init"
+    ) as executor:
+        futures = [executor.submit(call) for call in calls]
+        return [future.result() for future in futures]
+
+
 def resolve_container_name(context: Context, container: str | None = None) -> str:
     """操作対象の container 名を解決する。
 
@@ -89,27 +143,102 @@ def _tolerated_shared_keys(context: Context) -> set[str]:
     return keys
 
 
-def get_secrets(stage: str | None = None, *, container: str | None = None) -> dict:
+def _secrets_view_calls(views: list[SecretsContext]) -> list[Callable[[], Any]]:
+    """view ごとの読み出し (managed store 1 回 + user secret の一括読み出し)。
+
+    managed が空の view は pocket_store を読まない。読んでも全キーが
+    「自 view の managed に無い」で捨てられるだけな上、IAM 側の
+    allowed_ssm_resources / allowed_sm_resources は `self.managed` が
+    空だと store パスを許可しないため、読みに行くと AccessDenied で
+    INIT が落ちる (user secret だけを持つ shared view で発生する)。
+    """
+    calls: list[Callable[[], Any]] = []
+    for sc in views:
+        if sc.managed:
+            calls.append(lambda sc=sc: _read_pocket_store(sc))
+        # user: stored user secret store 経由で store ごとに一括で読む (CLI の
+        # store-url / verify と同一実装)。欠落 (NotFound) は required=True で
+        # ClientError のまま即失敗
+        if sc.user:
+            calls.append(lambda sc=sc: _read_user_secrets(sc))
+    return calls
+
+
+def _collect_secrets_views(
+    views: list[SecretsContext], results: Iterator[Any]
+) -> list[tuple[dict[str, Any], dict[str, str | None]]]:
+    """`_secrets_view_calls` の結果を view ごとの (managed の値, user の値) に戻す"""
+    return [
+        (
+            next(results) if sc.managed else {},
+            next(results) if sc.user else {},
+        )
+        for sc in views
+    ]
+
+
+def _read_secrets_views(
+    views: list[SecretsContext],
+) -> list[tuple[dict[str, Any], dict[str, str | None]]]:
+    """view ごとに (managed store の値, user secret の値) を読み出して返す。
+
+    読み出しは互いに独立なので並列に解決する。反映順 (後勝ち) は呼び出し側が
+    views の順で決める。
+    """
+    results = _resolve_concurrently(_secrets_view_calls(views))
+    return _collect_secrets_views(views, iter(results))
+
+
+# phase 名はメトリクス名になるため pocket_key を含めない (store の数だけメトリクスが
+# 増えないよう、全 view の読み出しを store の種類ごとに合算する)
+def _read_pocket_store(sc: SecretsContext) -> dict[str, Any]:
+    with phase("secrets.managed"):
+        return sc.pocket_store.secrets
+
+
+def _read_user_secrets(sc: SecretsContext) -> dict[str, str | None]:
+    # required=True なので値が None になることはない
+    with phase("secrets.user"):
+        return sc.user_store.read_many(sc.user, required=True)
+
+
+def _own_secrets_views(
+    stage: str | None, container: str | None
+) -> tuple[Context, ContainerContext, list[SecretsContext]] | None:
+    """自 container の secret の view (stage が無い・container が無ければ None)"""
     stage = stage or get_stage()
     if stage == "__none__":
-        return {}
+        return None
     context = get_context(stage=stage)
     if not context.container:
-        return {}
+        return None
     own = get_own_container(context, container)
+    return context, own, own.secrets_views()
+
+
+def get_secrets(stage: str | None = None, *, container: str | None = None) -> dict:
+    found = _own_secrets_views(stage, container)
+    if found is None:
+        return {}
+    context, own, views = found
+    return _merge_secrets(context, own, views, _read_secrets_views(views))
+
+
+def _merge_secrets(
+    context: Context,
+    own: ContainerContext,
+    views: list[SecretsContext],
+    values: list[tuple[dict[str, Any], dict[str, str | None]]],
+) -> dict:
+    """view ごとに読んだ値を env 名 → 値にまとめる (views の順で後勝ち)"""
     secrets = {}
     # managed: container store → shared store の順に pocket_store 経由で読む
     # (SM/SSM は store 実装が自動ディスパッチ)。shared store には他 container の
     # キーも載るため、自 view の managed に無いキーは黙ってスキップする
     tolerated = _tolerated_shared_keys(context)
-    for sc in own.secrets_views():
+    for sc, (managed_values, user_values) in zip(views, values, strict=True):
         is_shared_store = sc is own.shared_secrets
-        # managed が空の view は pocket_store を読まない。読んでも全キーが
-        # 「自 view の managed に無い」で捨てられるだけな上、IAM 側の
-        # allowed_ssm_resources / allowed_sm_resources は `self.managed` が
-        # 空だと store パスを許可しないため、読みに行くと AccessDenied で
-        # INIT が落ちる (user secret だけを持つ shared view で発生する)。
-        for key, value in (sc.pocket_store.secrets if sc.managed else {}).items():
+        for key, value in managed_values.items():
             if key not in sc.managed:
                 if is_shared_store and key in tolerated:
                     continue
@@ -121,25 +250,57 @@ def get_secrets(stage: str | None = None, *, container: str | None = None) -> di
                 continue
             envs = _pocket_secret_to_envs(key, value, sc.managed[key])
             secrets.update(envs)
-        # user: stored user secret store 経由で読む (CLI の store-url / verify と
-        # 同一実装)。欠落 (NotFound) は required=True で ClientError のまま即失敗
-        for key, spec in sc.user.items():
-            secrets[key] = sc.user_store.read(spec, required=True)
+        secrets.update(user_values)
     return secrets
 
 
+# set_envs_from_secrets が os.environ に入れた secret のキー (SnapStart の snapshot
+# 前に取り除く対象)
+_loaded_secret_keys: set[str] = set()
+
+
 def set_envs_from_secrets(stage: str | None = None):
     if os.environ.get("POCKET_ENVS_SECRETS_LOADED") == "true":
         return
-    data = get_secrets(stage)
+    # user secret 群と RDS 認証情報の読み出しを並列に行う。反映順は従来どおり
+    # secrets → RDS (rds_database_url の marker を実 URL で上書きするため)
+    with phase("secrets"):
+        data, rds_secret_string = _read_secrets_and_rds_secret(stage)
     for key, value in data.items():
         os.environ[key] = value
-    _set_rds_database_url()
-    _set_dsql_token()
+    _apply_rds_secret_string(rds_secret_string)
+    _loaded_secret_keys.update(data)
+    _loaded_secret_keys.update(_rds_database_url_envs(rds_secret_string))
+    # 読んだ値を secret cache に載せ、get_secret() が INIT 直後から
+    # ネットワーク無しで返せるようにする
+    cache = _secret_cache(stage)
+    cache.prime("secrets", data)
+    cache.prime("rds", _rds_database_url_envs(rds_secret_string))
+    with phase("dsql_token"):
+        _set_dsql_token()
     # 途中で例外が出た場合に再呼び出しで復旧できるよう、フラグは成功後に立てる
     os.environ["POCKET_ENVS_SECRETS_LOADED"] = "true"
 
 
+def _read_secrets_and_rds_secret(stage: str | None) -> tuple[dict, str | None]:
+    """`get_secrets` と `_read_rds_secret_string` を 1 つの pool で並列に読む。
+
+    get_secrets を pool の worker で呼ぶと、その中の view の読み出しが更に pool を
+    作って入れ子になるため、view ごとの呼び出しと RDS の呼び出しを平らに並べる。
+    """
+    found = _own_secrets_views(stage, None)
+    views = found[2] if found is not None else []
+    results = iter(
+        _resolve_concurrently([*_secrets_view_calls(views), _read_rds_secret_string])
+    )
+    values = _collect_secrets_views(views, results)
+    rds_secret_string = next(results)
+    if found is None:
+        return {}, rds_secret_string
+    context, own, _ = found
+    return _merge_secrets(context, own, views, values), rds_secret_string
+
+
 def _read_rds_secret_string() -> str | None:
     """RDS 認証情報の JSON 文字列を store (sm / ssm) から取得する。
 
@@ -147,41 +308,78 @@ def _read_rds_secret_string() -> str | None:
     それ以外は POCKET_RDS_SECRET_ARN の Secrets Manager secret を読む。どちらも未設定
     なら None (= RDS 以外)。
     """
+    with phase("rds_secret"):
+        return _read_rds_secret_string_from_store()
+
+
+def _read_rds_secret_string_from_store() -> str | None:
+    use_extension = secrets_extension.extension_port() is not None
     if os.environ.get("POCKET_RDS_SECRET_STORE") == "ssm":
         param_name = os.environ.get("POCKET_RDS_SSM_PARAM")
         if not param_name:
             return None
-        ssm = boto3.client("ssm")
+        if use_extension:
+            return _required(secrets_extension.get_parameter_value(param_name))
+        ssm = aws_clients.client("ssm")
         res = ssm.get_parameter(Name=param_name, WithDecryption=True)
         return res["Parameter"]["Value"]
     rds_secret_arn = os.environ.get("POCKET_RDS_SECRET_ARN")
     if not rds_secret_arn:
         return None
-    sm = boto3.client("secretsmanager")
+    if use_extension:
+        res = _required(secrets_extension.get_secret_value(rds_secret_arn))
+        return res["SecretString"]
+    sm = aws_clients.client("secretsmanager")
     return sm.get_secret_value(SecretId=rds_secret_arn)["SecretString"]
 
 
+def _required(value: Any) -> Any:
+    # API 直接呼び出し (NotFound は ClientError) と同じく、欠落は即失敗させる
+    if value is None:
+        raise RuntimeError("RDS の認証情報が見つかりません")
+    return value
+
+
 def _set_rds_database_url():
     """RDS 認証情報 (sm / ssm) から DATABASE_URL を構築する。
 
     ManageMasterUserPassword のシークレットには host/port/dbname が
     含まれない場合があるため、Lambda 環境変数で補完する。
     """
+    _apply_rds_secret_string(_read_rds_secret_string())
+
+
+def _apply_rds_secret_string(secret_string: str | None) -> None:
+    """読み出し済みの RDS 認証情報 JSON から DATABASE_URL を設定する。
+
+    secret_string が None (= RDS 以外) なら何もしない。
+    """
+    os.environ.update(_rds_database_url_envs(secret_string))
+
+
+def _rds_database_url_envs(secret_string: str | None) -> dict[str, str]:
+    """RDS 認証情報 JSON から {"DATABASE_URL": ...} を組み立てる (None なら空)。"""
     import json
     import urllib.parse
 
-    secret_string = _read_rds_secret_string()
     if secret_string is None:
-        return
+        return {}
     data = json.loads(secret_string)
     password = urllib.parse.quote(data["password"], safe="")
     username = data.get("username", "postgres")
     host = data.get("host") or os.environ.get("POCKET_RDS_ENDPOINT", "")
     port = data.get("port") or os.environ.get("POCKET_RDS_PORT", "5432")
     dbname = data.get("dbname") or os.environ.get("POCKET_RDS_DBNAME", "")
-    os.environ["DATABASE_URL"] = (
-        f"postgres://{username}:{password}@{host}:{port}/{dbname}"
-    )
+    return {"DATABASE_URL": f"postgres://{username}:{password}@{host}:{port}/{dbname}"}
+
+
+# generate_db_connect_admin_auth_token の既定の有効期間 (ExpiresIn) 秒
+DSQL_TOKEN_LIFETIME = 900
+# 失効のこの秒数前から再生成する (接続確立の所要時間と時計のずれの分)
+DSQL_TOKEN_REFRESH_MARGIN = 120
+
+_dsql_token_issued_at: float | None = None
+_dsql_token_lock = threading.Lock()
 
 
 def _set_dsql_token() -> str | None:
@@ -189,13 +387,16 @@ def _set_dsql_token() -> str | None:
 
     DSQL 未設定 (endpoint/region が無い) 場合は None を返す。
     """
+    global _dsql_token_issued_at
     dsql_endpoint = os.environ.get("POCKET_DSQL_ENDPOINT")
     dsql_region = os.environ.get("POCKET_DSQL_REGION")
     if not dsql_endpoint or not dsql_region:
         return None
-    client = boto3.client("dsql", region_name=dsql_region)
-    token = client.generate_db_connect_admin_auth_token(dsql_endpoint, dsql_region)
-    os.environ["POCKET_DSQL_TOKEN"] = token
+    client = aws_clients.client("dsql", region_name=dsql_region)
+    with _dsql_token_lock:
+        token = client.generate_db_connect_admin_auth_token(dsql_endpoint, dsql_region)
+        os.environ["POCKET_DSQL_TOKEN"] = token
+        _dsql_token_issued_at = time.monotonic()
     return token
 
 
@@ -205,92 +406,300 @@ def refresh_dsql_token() -> str | None:
     POCKET_DSQL_TOKEN は cold start で 1 回しか生成されず約 15 分で失効する。長時間
     稼働した warm Lambda が新しい接続を張る直前に本関数を呼ぶと、最新トークンで
     再接続でき、期限切れトークンによる認証失敗を避けられる。DSQL 未設定の場合は
-    None を返す。
+    None を返す。有効期間が残っていれば再生成しない `get_dsql_token()` も参照。
+    """
+    return _set_dsql_token()
+
+
+def get_dsql_token() -> str | None:
+    """有効な DSQL の IAM 認証トークンを返す (失効が近いときだけ再生成する)。
+
+    トークンの生成はローカルの署名計算でネットワークを使わないが、接続のたびに
+    行う必要はない。生成から DSQL_TOKEN_LIFETIME - DSQL_TOKEN_REFRESH_MARGIN 秒
+    以内なら POCKET_DSQL_TOKEN をそのまま返す。DSQL 未設定の場合は None を返す。
     """
+    with _dsql_token_lock:
+        issued_at = _dsql_token_issued_at
+        token = os.environ.get("POCKET_DSQL_TOKEN")
+    if token and issued_at is not None:
+        if time.monotonic() - issued_at < (
+            DSQL_TOKEN_LIFETIME - DSQL_TOKEN_REFRESH_MARGIN
+        ):
+            return token
     return _set_dsql_token()
 
 
+def reset_dsql_token() -> None:
+    """トークンの生成時刻を忘れる (次の get_dsql_token() で再生成。テスト用)。"""
+    global _dsql_token_issued_at
+    with _dsql_token_lock:
+        _dsql_token_issued_at = None
+
+
+_secret_caches: dict[str, SecretCache] = {}
+_secret_caches_lock = threading.Lock()
+
+
+def _secret_cache(stage: str | None = None) -> SecretCache:
+    """stage の secret cache を返す (source は set_envs_from_secrets と同じ順)。"""
+    stage = stage or get_stage()
+    with _secret_caches_lock:
+        cache = _secret_caches.get(stage)
+        if cache is None:
+            cache = SecretCache(
+                {
+                    "secrets": lambda: get_secrets(stage),
+                    "rds": lambda: _rds_database_url_envs(_read_rds_secret_string()),
+                },
+                on_refresh=os.environ.update,
+            )
+            _secret_caches[stage] = cache
+        return cache
+
+
+def get_secret(
+    key: str, *, ttl: float | None = None, stage: str | None = None
+) -> str | None:
+    """secret (set_envs_from_secrets が環境変数に展開する値) を cache から返す。
+
+    ttl 秒 (省略時は POCKET_SECRET_CACHE_TTL、既定 300) を過ぎた値はその場で、
+    ttl の 8 割を過ぎた値は background で読み直す。読み直した値は os.environ にも
+    反映する。ローテーションされる secret を hot path で読む用途に使う。
+    """
+    return _secret_cache(stage).get(key, ttl=ttl)
+
+
+def refresh_secret(key: str, *, stage: str | None = None) -> str | None:
+    """key の secret を TTL によらず読み直して返す (認証失敗後の再取得用)。"""
+    return _secret_cache(stage).refresh_key(key)
+
+
+def reset_secret_cache() -> None:
+    """secret cache を全て捨てる (テスト用)。"""
+    with _secret_caches_lock:
+        _secret_caches.clear()
+
+
+# SnapStart の snapshot に secret を残すか。"reload" (既定) は snapshot 前に
+# os.environ から取り除き restore 後に読み直す。"keep" は残し、短命の認証情報
+# (DSQL トークン) だけ restore 後に作り直す
+SNAPSTART_SECRETS_ENV = "POCKET_SNAPSTART_SECRETS"
+
+_snapstart_hooks: dict[str, list[Callable[[], None]]] = {"before": [], "after": []}
+
+
+def _snapstart_reloads_secrets() -> bool:
+    value = os.environ.get(SNAPSTART_SECRETS_ENV) or "reload"
+    if value not in ("reload", "keep"):
+        raise ValueError(
+            "%s must be 'reload' or 'keep': %s" % (SNAPSTART_SECRETS_ENV, value)
+        )
+    return value == "reload"
+
+
+def before_snapshot() -> None:
+    """SnapStart の snapshot 直前の処理。
+
+    登録された hook (Django の DB 接続を閉じる等) を呼び、共有 boto3 client を捨てる
+    (restore 後の実行環境では keep-alive 済みの socket が使えないため)。reload
+    設定なら secret と DSQL トークンを os.environ と secret cache (RDS の
+    DATABASE_URL を含む) から取り除き、POCKET_ENVS_SECRETS_LOADED を外して
+    after_restore() で読み直させる。
+
+    framework が INIT で settings に写した値 (Django の SECRET_KEY 等) は取り除けず、
+    snapshot に残る。
+    """
+    for hook in _snapstart_hooks["before"]:
+        hook()
+    aws_clients.reset_clients()
+    if _snapstart_reloads_secrets():
+        reset_secret_cache()
+        for key in _loaded_secret_keys:
+            os.environ.pop(key, None)
+        _loaded_secret_keys.clear()
+        os.environ.pop("POCKET_DSQL_TOKEN", None)
+        os.environ.pop("POCKET_ENVS_SECRETS_LOADED", None)
+
+
+def after_restore() -> None:
+    """SnapStart の restore 直後の処理。
+
+    snapshot 時点の cache と DSQL トークンは信用せず捨てる。secret を取り除いて
+    いれば set_envs_from_secrets() で読み直し (RDS 認証情報と DSQL トークンを含む)、
+    残していれば DSQL トークンだけ作り直す。最後に登録された hook を呼ぶ。
+    """
+    reset_secret_cache()
+    reset_dsql_token()
+    if os.environ.get("POCKET_ENVS_SECRETS_LOADED") == "true":
+        _set_dsql_token()
+    elif os.environ.get("POCKET_STAGE"):
+        set_envs_from_secrets()
+    for hook in _snapstart_hooks["after"]:
+        hook()
+
+
+def register_snapstart_hooks(
+    *,
+    before: Sequence[Callable[[], None]] = (),
+    after: Sequence[Callable[[], None]] = (),
+) -> bool:
+    """SnapStart の実行環境なら before_snapshot / after_restore を登録する。
+
+    before / after は pocket の処理に追加する framework 側の hook。SnapStart
+    (AWS_LAMBDA_INITIALIZATION_TYPE=snap-start) でなければ何もせず False を返す。
+    登録には Lambda の Python runtime が持つ snapshot-restore-py を使う。
+    """
+    _snapstart_hooks["before"].extend(before)
+    _snapstart_hooks["after"].extend(after)
+    if os.environ.get("AWS_LAMBDA_INITIALIZATION_TYPE") != "snap-start":
+        return False
+    from snapshot_restore_py import register_after_restore, register_before_snapshot
+
+    register_before_snapshot(before_snapshot)
+    register_after_restore(after_restore)
+    return True
+
+
+def reset_snapstart_hooks() -> None:
+    """登録済みの追加 hook を捨てる (テスト用)。"""
+    for hooks in _snapstart_hooks.values():
+        hooks.clear()
+
+
 # 後方互換エイリアス
 get_secrets_from_secretsmanager = get_secrets
 set_envs_from_secretsmanager = set_envs_from_secrets
 
 
-def _get_host(c_context: ContainerContext, key: str) -> str | None:
+def _get_stack_outputs(stack_name: str, region: str) -> dict[str, str] | None:
+    """CFN stack の Outputs を {OutputKey: OutputValue} で返す (未作成なら None)"""
+    cfn = aws_clients.client("cloudformation", region_name=region)
+    try:
+        res = cfn.describe_stacks(StackName=stack_name)
+    except cfn.exceptions.ClientError:
+        return None
+    outputs = res["Stacks"][0].get("Outputs", [])
+    return {output["OutputKey"]: output["OutputValue"] for output in outputs}
+
+
+def _get_host(
+    c_context: ContainerContext, key: str, outputs: dict[str, str] | None
+) -> str | None:
     """CFN stack output と context data から host を取得"""
     handler = c_context.handlers[key]
+    if handler.function_url is not None:
+        function_url_key = key.capitalize() + "FunctionUrl"
+        if outputs and function_url_key in outputs:
+            return outputs[function_url_key][len("https://") :].rstrip("/")
+        return None
     if handler.apigateway is None:
         return None
     if handler.apigateway.domain:
         return handler.apigateway.domain
     apiendpoint_key = key.capitalize() + "ApiEndpoint"
-    stack_name = f"{c_context.slug}-container-{c_context.name}"
-    cfn = boto3.client("cloudformation", region_name=c_context.region)
-    try:
-        res = cfn.describe_stacks(StackName=stack_name)
-        outputs = res["Stacks"][0].get("Outputs", [])
-        for output in outputs:
-            if output["OutputKey"] == apiendpoint_key:
-                return output["OutputValue"][len("https://") :]
-    except cfn.exceptions.ClientError:
-        pass
+    if outputs and apiendpoint_key in outputs:
+        return outputs[apiendpoint_key][len("https://") :]
     return None
 
 
 def _get_hosts(c_context: ContainerContext) -> dict[str, str | None]:
     """全 handler の hosts を取得"""
+    # 全 handler の ApiEndpoint / FunctionUrl は同じ container stack の Outputs に
+    # 載るため、describe_stacks は container あたり 1 回で済ませる
+    # (API Gateway の custom domain のみなら不要)
+    outputs = None
+    if any(
+        h.function_url is not None
+        or (h.apigateway is not None and not h.apigateway.domain)
+        for h in c_context.handlers.values()
+    ):
+        outputs = _get_stack_outputs(
+            f"{c_context.slug}-container-{c_context.name}", c_context.region
+        )
     data: dict[str, str | None] = {}
     for key, handler in c_context.handlers.items():
-        if handler.apigateway is not None:
-            data[key] = _get_host(c_context, key)
+        if handler.has_http_endpoint:
+            data[key] = _get_host(c_context, key, outputs)
     return data
 
 
+def _get_queue_url(name: str) -> str | None:
+    # client は 1 度取得して使い回す (except 節での再取得はたまたま同一クラスに
+    # 解決されているだけで壊れやすい)
+    sqs = aws_clients.client("sqs")
+    try:
+        return sqs.get_queue_url(QueueName=name)["QueueUrl"]
+    except sqs.exceptions.QueueDoesNotExist:
+        return None
+
+
+def _queueurl_calls(
+    c_context: ContainerContext,
+) -> dict[str, Callable[[], str | None]]:
+    """sqs を持つ handler ごとの get_queue_url 呼び出し (handler key → call)"""
+    return {
+        key: lambda name=handler.sqs.name: _get_queue_url(name)
+        for key, handler in c_context.handlers.items()
+        if handler.sqs is not None
+    }
+
+
+def _collect_queueurls(
+    c_context: ContainerContext, found: dict[str, str | None]
+) -> dict[str, str | None]:
+    return {key: found.get(key) for key in c_context.handlers}
+
+
 def _get_queueurls(c_context: ContainerContext) -> dict[str, str | None]:
     """SQS get_queue_url で queue URL を取得"""
-    data: dict[str, str | None] = {}
-    # client は 1 つ作って使い回す (except 節での再生成はたまたま同一クラスに
-    # 解決されているだけで壊れやすい)
-    sqs = boto3.client("sqs")
-    for key, handler in c_context.handlers.items():
-        if handler.sqs:
-            try:
-                res = sqs.get_queue_url(QueueName=handler.sqs.name)
-                data[key] = res["QueueUrl"]
-            except sqs.exceptions.QueueDoesNotExist:
-                data[key] = None
-        else:
-            data[key] = None
-    return data
+    calls = _queueurl_calls(c_context)
+    queueurls = _resolve_concurrently(list(calls.values()))
+    return _collect_queueurls(c_context, dict(zip(calls, queueurls, strict=True)))
+
+
+def _cloudfront_output_calls(
+    context: Context,
+) -> dict[str, Callable[[], dict[str, str] | None]]:
+    """CloudFront ごとの describe_stacks 呼び出し (CloudFront 名 → call)"""
+    return {
+        name: lambda cf_ctx=cf_ctx: _get_stack_outputs(
+            f"{cf_ctx.slug}-cloudfront", cf_ctx.region
+        )
+        for name, cf_ctx in context.cloudfront.items()
+    }
 
 
-def _get_cloudfront_domains(context: Context) -> dict[str, str]:
-    """CloudFront スタックの Output から distribution ドメインを取得"""
+def _cloudfront_domains(
+    all_outputs: dict[str, dict[str, str] | None],
+) -> dict[str, str]:
+    """CloudFront スタックの Output から distribution ドメインを取り出す"""
     domains: dict[str, str] = {}
-    for name, cf_ctx in context.cloudfront.items():
-        stack_name = f"{cf_ctx.slug}-cloudfront"
-        cfn = boto3.client("cloudformation", region_name=cf_ctx.region)
-        try:
-            res = cfn.describe_stacks(StackName=stack_name)
-            outputs = res["Stacks"][0].get("Outputs", [])
-            for output in outputs:
-                if output["OutputKey"] == "DistributionDomainName":
-                    domains[name] = output["OutputValue"]
-                    break
-        except cfn.exceptions.ClientError:
-            pass
+    for name, outputs in all_outputs.items():
+        if outputs and "DistributionDomainName" in outputs:
+            domains[name] = outputs["DistributionDomainName"]
     return domains
 
 
 def _set_container_resource_envs(
-    c_name: str, c_ctx: ContainerContext, *, is_own: bool
+    c_name: str,
+    c_ctx: ContainerContext,
+    *,
+    is_own: bool,
+    hosts_data: dict[str, str | None] | None = None,
+    queueurls_data: dict[str, str | None] | None = None,
 ) -> list[str]:
     """container 1 つ分の host / queue URL env を設定し、host 一覧を返す。
 
     自 container の handler は従来どおり非修飾名 (POCKET_<HANDLER>_HOST 等) でも
     参照できる。他 container は POCKET_<CONTAINER>_<HANDLER>_HOST の修飾名のみ。
+    hosts_data / queueurls_data を渡すと (並列に解決済みの値)、AWS には問い合わせない。
     """
+    if hosts_data is None:
+        hosts_data = _get_hosts(c_ctx)
+    if queueurls_data is None:
+        queueurls_data = _get_queueurls(c_ctx)
     hosts = []
-    for lambda_key, host in _get_hosts(c_ctx).items():
+    for lambda_key, host in hosts_data.items():
         if not host:
             continue
         hosts.append(host)
@@ -300,7 +709,7 @@ def _set_container_resource_envs(
         if is_own:
             os.environ["POCKET_%s_HOST" % lambda_key.upper()] = host
             os.environ["POCKET_%s_ENDPOINT" % lambda_key.upper()] = "https://%s" % host
-    for lambda_key, queueurl in _get_queueurls(c_ctx).items():
+    for lambda_key, queueurl in queueurls_data.items():
         if not queueurl:
             continue
         qualified = "%s_%s" % (c_name.upper(), lambda_key.upper())
@@ -310,6 +719,183 @@ def _set_container_resource_envs(
     return hosts
 
 
+# deploy 時に解決済みの discovery 結果 (host / queue URL / CloudFront ドメイン)。
+# `pocket deploy` の post-deploy で各 Lambda の env に書き込まれ、runtime は
+# これがあれば describe_stacks / get_queue_url を呼ばずに済ませる
+RESOURCE_MANIFEST_ENV = "POCKET_RESOURCE_MANIFEST"
+RESOURCE_MANIFEST_VERSION = 2
+
+
+def _discover_resources(
+    context: Context, c_names: list[str], *, cloudfront: bool
+) -> tuple[dict[str, dict[str, dict[str, str | None]]], dict[str, str] | None]:
+    """container ごとの host / queue URL と CloudFront ドメインを AWS から解決する。
+
+    互いに独立なので、container ごとの describe_stacks、queue ごとの get_queue_url、
+    CloudFront ごとの describe_stacks を 1 つの thread pool で並列に解決する (pool の
+    worker から更に pool を作らない)。cloudfront=False なら CloudFront は None。
+    """
+    calls: list[Callable[[], Any]] = []
+    queue_keys: dict[str, list[str]] = {}
+    for c_name in c_names:
+        c_ctx = context.container[c_name]
+        calls.append(lambda c_ctx=c_ctx: _get_hosts(c_ctx))
+        queueurl_calls = _queueurl_calls(c_ctx)
+        queue_keys[c_name] = list(queueurl_calls)
+        calls += queueurl_calls.values()
+    cf_calls = _cloudfront_output_calls(context) if cloudfront else {}
+    calls += cf_calls.values()
+    results = iter(_resolve_concurrently(calls))
+    containers = {}
+    for c_name in c_names:
+        hosts = next(results)
+        found = {key: next(results) for key in queue_keys[c_name]}
+        containers[c_name] = {
+            "hosts": hosts,
+            "queueurls": _collect_queueurls(context.container[c_name], found),
+        }
+    cf_outputs = {name: next(results) for name in cf_calls}
+    return containers, (_cloudfront_domains(cf_outputs) if cloudfront else None)
+
+
+def _fingerprint(data: Any) -> str:
+    import hashlib
+    import json
+
+    raw = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    # Lambda の env は合計 4 KB までなので、照合に足りる長さに切り詰める
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def _container_fingerprint(c_ctx: ContainerContext) -> str:
+    """container の discovery 結果を決める設定 (stack 名・queue 名等) の hash"""
+    return _fingerprint(
+        {
+            "slug": c_ctx.slug,
+            "name": c_ctx.name,
+            "region": c_ctx.region,
+            "handlers": {
+                key: {
+                    "http": h.has_http_endpoint,
+                    "apigateway": h.apigateway.domain if h.apigateway else None,
+                    "function_url": h.function_url is not None,
+                    "sqs": h.sqs.name if h.sqs else None,
+                }
+                for key, h in c_ctx.handlers.items()
+            },
+        }
+    )
+
+
+def _cloudfront_fingerprint(context: Context) -> str:
+    return _fingerprint(
+        {name: [cf.slug, cf.region] for name, cf in context.cloudfront.items()}
+    )
+
+
+def build_resource_manifest(context: Context) -> dict[str, Any]:
+    """stage 全体の discovery 結果を manifest (JSON 化可能な dict) として返す。
+
+    `pocket deploy` が stack 作成/更新後に呼び、RESOURCE_MANIFEST_ENV に載せる。
+    container / CloudFront ごとに、解決に使った設定の fingerprint を添える。
+    """
+    containers, cf_domains = _discover_resources(
+        context, sorted(context.container), cloudfront=True
+    )
+    stamped: dict[str, dict[str, Any]] = {
+        c_name: {
+            **entry,
+            "fingerprint": _container_fingerprint(context.container[c_name]),
+        }
+        for c_name, entry in containers.items()
+    }
+    return {
+        "version": RESOURCE_MANIFEST_VERSION,
+        "stage": context.stage,
+        "container": stamped,
+        "cloudfront": cf_domains,
+        "cloudfront_fingerprint": _cloudfront_fingerprint(context),
+    }
+
+
+def _load_resource_manifest(stage: str) -> dict[str, Any] | None:
+    """env の manifest を読む。未設定・壊れている・別 stage / version なら None"""
+    import json
+
+    raw = os.environ.get(RESOURCE_MANIFEST_ENV)
+    if not raw:
+        return None
+    try:
+        manifest = json.loads(raw)
+    except ValueError:
+        echo.warning(
+            "%s が JSON として読めません。無視します。" % RESOURCE_MANIFEST_ENV
+        )
+        return None
+    if not isinstance(manifest, dict):
+        return None
+    if manifest.get("version") != RESOURCE_MANIFEST_VERSION:
+        return None
+    if manifest.get("stage") != stage:
+        return None
+    return manifest
+
+
+def _is_fresh_container_entry(c_ctx: ContainerContext, entry: Any) -> bool:
+    """manifest の container エントリが現在の context と整合しているか。
+
+    handler の追加・削除や apigateway / function_url / sqs の付け外し、queue 名・
+    domain の変更は image の pocket.toml に先に反映され、manifest は次の deploy
+    完了まで古いままになる。deploy 時の設定の fingerprint が現在の context と違う、
+    deploy 時点で未作成だった値 (None) を含む、のいずれかならその container は
+    AWS から解決し直す。
+    """
+    if not isinstance(entry, dict):
+        return False
+    if entry.get("fingerprint") != _container_fingerprint(c_ctx):
+        return False
+    hosts = entry.get("hosts")
+    queueurls = entry.get("queueurls")
+    if not isinstance(hosts, dict) or not isinstance(queueurls, dict):
+        return False
+    api_keys = {k for k, h in c_ctx.handlers.items() if h.has_http_endpoint}
+    if set(hosts) != api_keys or set(queueurls) != set(c_ctx.handlers):
+        return False
+    if any(not hosts[k] for k in api_keys):
+        return False
+    return all(queueurls[k] for k, h in c_ctx.handlers.items() if h.sqs)
+
+
+def _resolve_resources(
+    context: Context,
+) -> tuple[dict[str, dict[str, dict[str, str | None]]], dict[str, str] | None]:
+    """manifest で賄える分は manifest から、残りだけを AWS から解決する"""
+    c_names = sorted(context.container)
+    manifest = _load_resource_manifest(context.stage) or {}
+    baked = manifest.get("container") or {}
+    containers = {
+        c_name: baked[c_name]
+        for c_name in c_names
+        if _is_fresh_container_entry(context.container[c_name], baked.get(c_name))
+    }
+    cf_domains = manifest.get("cloudfront")
+    need_cloudfront = bool(context.cloudfront) and (
+        not isinstance(cf_domains, dict)
+        or set(cf_domains) != set(context.cloudfront)
+        or manifest.get("cloudfront_fingerprint") != _cloudfront_fingerprint(context)
+    )
+    stale = [c_name for c_name in c_names if c_name not in containers]
+    if stale or need_cloudfront:
+        with phase("discovery"):
+            live, live_cf = _discover_resources(
+                context, stale, cloudfront=need_cloudfront
+            )
+        containers.update(live)
+        if need_cloudfront:
+            cf_domains = live_cf
+    return containers, (cf_domains if context.cloudfront else None)
+
+
 def set_envs_from_aws_resources(
     stage: str | None = None,
 ):
@@ -323,20 +909,26 @@ def set_envs_from_aws_resources(
         os.environ["POCKET_ENVS_AWS_RESOURCES_LOADED"] = "true"
         return {}
     context = get_context(stage=stage)
+    # deploy 時の manifest があればそれを使い、無い・古い分だけ AWS に問い合わせる。
+    # env への反映は従来どおり container 名の昇順で行う
+    containers, cf_domains = _resolve_resources(context)
     if context.container:
         own_name = resolve_container_name(context)
         hosts = []
         for c_name in sorted(context.container):
             hosts += _set_container_resource_envs(
-                c_name, context.container[c_name], is_own=c_name == own_name
+                c_name,
+                context.container[c_name],
+                is_own=c_name == own_name,
+                hosts_data=containers[c_name]["hosts"],
+                queueurls_data=containers[c_name]["queueurls"],
             )
         # カンマ区切り。django/runtime.py が ALLOWED_HOSTS へカンマ結合で append する
         os.environ["POCKET_HOSTS"] = ",".join(hosts)
     else:
         os.environ["POCKET_HOSTS"] = ""
     # CloudFront distribution ドメインを環境変数に設定
-    if context.cloudfront:
-        cf_domains = _get_cloudfront_domains(context)
+    if cf_domains:
         for name, domain in cf_domains.items():
             os.environ["POCKET_CLOUDFRONT_%s_DOMAIN" % name.upper()] = domain
     # 途中で例外が出た場合に再呼び出しで復旧できるよう、フラグは成功後に立てる
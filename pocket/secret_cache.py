@@ -0,0 +1,170 @@
+"""warm Lambda 用の in-process secret cache (key ごとの TTL と先回り更新)。
+
+`set_envs_from_secrets()` は cold start で 1 回だけ secret を os.environ へ展開する
+ため、ローテーションされた値は次の cold start まで反映されない。この cache は
+secret を「まとめて読む単位」(source。pocket store + user secret / RDS 認証情報)
+ごとに取得時刻付きで保持し、`get(key, ttl=...)` の呼び出し時に鮮度を判定する:
+
+- 経過時間 < TTL * REFRESH_AHEAD_RATIO: cache の値を返す (ネットワーク無し)
+- それ以上 TTL 未満: cache の値を返しつつ、background thread で source を読み直す
+- TTL 以上: その場で読み直して返す (失敗したら古い値を返し警告する)
+
+TTL は呼び出し側が key ごとに渡せる (省略時は POCKET_SECRET_CACHE_TTL 秒)。
+Lambda は invocation の合間に実行環境を凍結するため、background の読み直しは
+次の invocation で再開・完了することがある (その間も古い値を返し続ける)。
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections.abc import Callable
+
+from .utils import echo
+
+CACHE_TTL_ENV = "POCKET_SECRET_CACHE_TTL"
+_DEFAULT_TTL = 300.0
+# TTL のこの割合を過ぎたら background で先回りして読み直す
+REFRESH_AHEAD_RATIO = 0.8
+
+Loader = Callable[[], dict[str, str]]
+
+
+def default_ttl() -> float:
+    value = os.environ.get(CACHE_TTL_ENV)
+    if not value:
+        return _DEFAULT_TTL
+    ttl = float(value)
+    if ttl <= 0:
+        raise ValueError("%s must be > 0: %s" % (CACHE_TTL_ENV, value))
+    return ttl
+
+
+class SecretCache:
+    """source ごとに値と取得時刻を持つ secret cache。
+
+    同じ key が複数の source にある場合は、後に登録した source の値が勝つ
+    (`set_envs_from_secrets` の上書き順と同じ。RDS の DATABASE_URL が
+    secret 上の marker を上書きする)。on_refresh には読み直した source の key
+    について、この優先順で解決した値が渡される。
+    """
+
+    def __init__(
+        self,
+        sources: dict[str, Loader],
+        *,
+        on_refresh: Callable[[dict[str, str]], None] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._sources = dict(sources)
+        self._on_refresh = on_refresh
+        self._clock = clock
+        self._values: dict[str, dict[str, str]] = {}
+        self._fetched_at: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._source_locks = {name: threading.Lock() for name in self._sources}
+        self._background: dict[str, threading.Thread] = {}
+
+    def prime(self, source: str, values: dict[str, str]) -> None:
+        """読み出し済みの値を取得時刻 = 現在として登録する (INIT の結果の再利用)。"""
+        with self._lock:
+            self._values[source] = dict(values)
+            self._fetched_at[source] = self._clock()
+
+    def _owner(self, key: str) -> str | None:
+        for name in reversed(self._sources):
+            if key in self._values.get(name, {}):
+                return name
+        return None
+
+    def _lookup(self, key: str) -> tuple[str | None, str | None, float]:
+        """(owner, value, 経過秒) を返す。key がどの source にも無ければ owner=None"""
+        with self._lock:
+            owner = self._owner(key)
+            if owner is None:
+                return None, None, 0.0
+            age = self._clock() - self._fetched_at[owner]
+            return owner, self._values[owner][key], age
+
+    def _load_missing(self) -> set[str]:
+        """1 度も読んでいない source を読む。読んだ source 名を返す。"""
+        loaded: set[str] = set()
+        for name in self._sources:
+            if name not in self._fetched_at:
+                self.refresh(name, min_age=float("inf"))
+                loaded.add(name)
+        return loaded
+
+    def refresh(self, source: str, *, min_age: float = 0.0) -> None:
+        """source を読み直す。
+
+        同じ source の読み直しは直列化し、待っている間に他のスレッドが読み直して
+        経過時間が min_age 未満になっていれば読まない (同時に期限切れを見た
+        呼び出しが揃って API を叩かないようにする)。
+        """
+        with self._source_locks[source]:
+            with self._lock:
+                fetched_at = self._fetched_at.get(source)
+            if fetched_at is not None and self._clock() - fetched_at < min_age:
+                return
+            values = self._sources[source]()
+            with self._lock:
+                self._values[source] = dict(values)
+                self._fetched_at[source] = self._clock()
+                resolved = {
+                    key: self._values[owner][key]
+                    for key in values
+                    if (owner := self._owner(key)) is not None
+                }
+        if self._on_refresh is not None:
+            self._on_refresh(resolved)
+
+    def _refresh_in_background(self, source: str) -> None:
+        with self._lock:
+            running = self._background.get(source)
+            if running is not None and running.is_alive():
+                return
+            thread = threading.Thread(
+                target=self._background_refresh,
+                args=(source,),
+                name="pocket-secret-refresh",
+                daemon=True,
+            )
+            self._background[source] = thread
+        thread.start()
+
+    def _background_refresh(self, source: str) -> None:
+        try:
+            self.refresh(source)
+        except Exception as e:  # 失敗しても古い値で動き続け、次の get で再試行する
+            echo.warning("secret の再取得に失敗しました (%s): %s" % (source, e))
+
+    def get(self, key: str, *, ttl: float | None = None) -> str | None:
+        """key の値を返す。どの source にも無ければ None。"""
+        ttl = default_ttl() if ttl is None else ttl
+        self._load_missing()
+        owner, value, age = self._lookup(key)
+        if owner is None:
+            return None
+        if age >= ttl:
+            try:
+                self.refresh(owner, min_age=ttl)
+            except Exception as e:
+                echo.warning(
+                    "secret の再取得に失敗したため古い値を使います (%s): %s"
+                    % (owner, e)
+                )
+                return value
+            return self._lookup(key)[1]
+        if age >= ttl * REFRESH_AHEAD_RATIO:
+            self._refresh_in_background(owner)
+        return value
+
+    def refresh_key(self, key: str) -> str | None:
+        """key を持つ source を TTL によらず読み直し、最新の値を返す。"""
+        loaded = self._load_missing()
+        owner = self._lookup(key)[0]
+        if owner is not None and owner not in loaded:
+            self.refresh(owner)
+        return self._lookup(key)[1]
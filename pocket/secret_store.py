@@ -5,9 +5,11 @@
 「create or put / get / delete (+NotFound 握り)」を集約する。
 CLI (pocket_cli) と runtime (pocket) の両方から使うため pocket 側に置く。
 
-クライアントは各関数内で ``boto3.client("ssm" / "secretsmanager", region_name=region)``
-を都度生成する。store 分岐ごとに **リテラルの service 名** と **service 専用の変数名**
-(ssm / sm) を使うのは、`tests/test_permissions_sync.py` の boto3 AST 解析器が
+クライアントは各関数内で
+``aws_clients.client("ssm" / "secretsmanager", region_name=region)`` から取得する
+(プロセス内で共有され、生成は初回のみ)。store 分岐ごとに **リテラルの service 名**
+と **service 専用の変数名** (ssm / sm) を使うのは、
+`tests/test_permissions_sync.py` の boto3 AST 解析器が
 「どの service のどの method を呼んでいるか」を静的に追跡できる形を保つため
 (client を引数で受け取ると追跡が切れ、IAM 権限の網羅チェックが盲目になる)。
 """
@@ -15,11 +17,14 @@ CLI (pocket_cli) と runtime (pocket) の両方から使うため pocket 側に
 from __future__ import annotations
 
 import enum
+from collections.abc import Mapping, Sequence
 from typing import TYPE_CHECKING
 
-import boto3
 from botocore.exceptions import ClientError
 
+from . import aws_clients
+from .resources.aws import secrets_extension
+
 if TYPE_CHECKING:
     from pocket.context import SecretsContext
     from pocket.settings import UserSecretSpec
@@ -27,6 +32,10 @@ if TYPE_CHECKING:
 # get_parameter / get_secret_value / delete_* が対象未存在時に返すエラーコード
 _NOT_FOUND_CODES = ("ParameterNotFound", "ResourceNotFoundException")
 
+# 1 回の一括読み出しで指定できる名前の上限 (GetParameters / BatchGetSecretValue)
+SSM_GET_PARAMETERS_LIMIT = 10
+SM_BATCH_GET_LIMIT = 20
+
 
 class PutResult(enum.Enum):
     """put_stored_value がどの経路で書いたか。呼び出し側のメッセージ分岐用。"""
@@ -38,10 +47,10 @@ class PutResult(enum.Enum):
 def put_stored_value(name: str, store: str, value: str, region: str) -> PutResult:
     """正準名 ``name`` に単一値を書き込む (ssm=SecureString 上書き / sm=create|put)。"""
     if store == "ssm":
-        ssm = boto3.client("ssm", region_name=region)
+        ssm = aws_clients.client("ssm", region_name=region)
         ssm.put_parameter(Name=name, Value=value, Type="SecureString", Overwrite=True)
         return PutResult.CREATED
-    sm = boto3.client("secretsmanager", region_name=region)
+    sm = aws_clients.client("secretsmanager", region_name=region)
     try:
         sm.create_secret(
             Name=name,
@@ -64,13 +73,15 @@ def read_stored_value(
     required=True なら NotFound を握らず ClientError をそのまま伝播させる
     (runtime の user secret 読み出しで欠落を即失敗させる用)。
     """
+    if secrets_extension.serves_region(region):
+        return read_stored_values([name], store, region, required=required)[name]
     try:
         if store == "ssm":
-            ssm = boto3.client("ssm", region_name=region)
+            ssm = aws_clients.client("ssm", region_name=region)
             return ssm.get_parameter(Name=name, WithDecryption=True)["Parameter"][
                 "Value"
             ]
-        sm = boto3.client("secretsmanager", region_name=region)
+        sm = aws_clients.client("secretsmanager", region_name=region)
         return sm.get_secret_value(SecretId=name)["SecretString"]
     except ClientError as e:
         if not required and (
@@ -80,6 +91,135 @@ def read_stored_value(
         raise
 
 
+def _chunked(names: Sequence[str], size: int) -> list[list[str]]:
+    return [list(names[i : i + size]) for i in range(0, len(names), size)]
+
+
+def _ssm_identifiers(param: dict) -> set[str]:
+    """GetParameters の結果 1 件を指せる ID (名前 / ARN / 名前:version|label)。
+
+    version / label 付きで取った結果は最新とは限らないので、名前や ARN には
+    対応付けない (同じ chunk に最新の指定があると上書きしてしまう)。
+    """
+    name = param["Name"]
+    if param.get("Selector"):
+        return {name + param["Selector"]}
+    ids = {name, param.get("ARN", "")}
+    if param.get("Version") is not None:
+        ids.add("%s:%s" % (name, param["Version"]))
+    return ids - {""}
+
+
+def _read_ssm_values(names: list[str], region: str) -> tuple[dict[str, str], list[str]]:
+    ssm = aws_clients.client("ssm", region_name=region)
+    values: dict[str, str] = {}
+    missing: list[str] = []
+    for chunk in _chunked(names, SSM_GET_PARAMETERS_LIMIT):
+        res = ssm.get_parameters(Names=chunk, WithDecryption=True)
+        by_id: dict[str, str] = {}
+        # 同じ名前の結果が複数あれば (Selector を返さない実装もある)、名前 / ARN は
+        # 最新の version を指すよう version の昇順に上書きする
+        params = sorted(res["Parameters"], key=lambda p: p.get("Version") or 0)
+        for param in params:
+            for identifier in _ssm_identifiers(param):
+                by_id[identifier] = param["Value"]
+        # 結果は渡した ID (version / label 付き・ARN も) に引き戻す。引けなかった ID は
+        # InvalidParameters に無くても未存在として扱う (値を黙って落とさない)
+        for name in chunk:
+            if name in by_id:
+                values[name] = by_id[name]
+            else:
+                missing.append(name)
+    return values, missing
+
+
+def _sm_requested_ids(secret: dict, chunk: list[str]) -> list[str]:
+    """BatchGetSecretValue の結果を指す、渡した SecretId (名前 / ARN / 部分 ARN)。"""
+    arn = secret["ARN"]
+    return [
+        requested
+        for requested in chunk
+        if requested in (secret["Name"], arn)
+        # 部分 ARN は末尾のランダムな 6 文字 (-xxxxxx) を除いた ARN
+        or (
+            requested.startswith("arn:")
+            and arn.startswith(requested + "-")
+            and len(arn) == len(requested) + 7
+        )
+    ]
+
+
+def _read_sm_values(names: list[str], region: str) -> tuple[dict[str, str], list[str]]:
+    sm = aws_clients.client("secretsmanager", region_name=region)
+    values: dict[str, str] = {}
+    for chunk in _chunked(names, SM_BATCH_GET_LIMIT):
+        kwargs: dict = {"SecretIdList": chunk}
+        while True:
+            res = sm.batch_get_secret_value(**kwargs)
+            for secret in res["SecretValues"]:
+                for requested in _sm_requested_ids(secret, chunk):
+                    values[requested] = secret["SecretString"]
+            for error in res.get("Errors", []):
+                if error["ErrorCode"] not in _NOT_FOUND_CODES:
+                    # 権限・復号エラー等は単一読み出しと同じく ClientError にする
+                    raise ClientError(
+                        {
+                            "Error": {
+                                "Code": error["ErrorCode"],
+                                "Message": error.get("Message", ""),
+                            }
+                        },
+                        "BatchGetSecretValue",
+                    )
+            if not res.get("NextToken"):
+                break
+            kwargs["NextToken"] = res["NextToken"]
+    # 結果に対応付かなかった ID (NotFound を含む) はすべて未存在として扱う
+    missing = [name for name in names if name not in values]
+    return values, missing
+
+
+def read_stored_values(
+    names: Sequence[str], store: str, region: str, *, required: bool = False
+) -> dict[str, str | None]:
+    """正準名 ``names`` の値を一括で読む ({name: value})。未存在の名前は None。
+
+    ssm は GetParameters (10 件ずつ)、sm は BatchGetSecretValue (20 件ずつ) で
+    読み、1 件ずつの get_parameter / get_secret_value の往復を減らす。Lambda で
+    secrets extension が有効なら、その localhost cache から読む。
+    required=True なら未存在が 1 件でもあれば、単一読み出しと同じエラーコード
+    (ParameterNotFound / ResourceNotFoundException) の ClientError を送出する。
+    """
+    unique = list(dict.fromkeys(names))
+    if not unique:
+        return {}
+    if secrets_extension.serves_region(region):
+        # localhost の cache を 1 件ずつ引く (一括 API は extension に無い)
+        found = {}
+        for name in unique:
+            value = secrets_extension.get_stored_value(name, store)
+            if value is not None:
+                found[name] = value
+        missing = [name for name in unique if name not in found]
+        code, operation = (
+            ("ParameterNotFound", "GetParameter")
+            if store == "ssm"
+            else ("ResourceNotFoundException", "GetSecretValue")
+        )
+    elif store == "ssm":
+        found, missing = _read_ssm_values(unique, region)
+        code, operation = "ParameterNotFound", "GetParameters"
+    else:
+        found, missing = _read_sm_values(unique, region)
+        code, operation = "ResourceNotFoundException", "BatchGetSecretValue"
+    if required and missing:
+        raise ClientError(
+            {"Error": {"Code": code, "Message": "not found: %s" % ", ".join(missing)}},
+            operation,
+        )
+    return {name: found.get(name) for name in unique}
+
+
 def exists_stored_value(name: str, store: str, region: str) -> bool:
     """正準名 ``name`` が store に存在するか。
 
@@ -87,10 +227,10 @@ def exists_stored_value(name: str, store: str, region: str) -> bool:
     """
     try:
         if store == "ssm":
-            ssm = boto3.client("ssm", region_name=region)
+            ssm = aws_clients.client("ssm", region_name=region)
             ssm.get_parameter(Name=name)
         else:
-            sm = boto3.client("secretsmanager", region_name=region)
+            sm = aws_clients.client("secretsmanager", region_name=region)
             sm.describe_secret(SecretId=name)
         return True
     except ClientError as e:
@@ -114,13 +254,13 @@ def delete_stored_value(
     """
     try:
         if store == "ssm":
-            ssm = boto3.client("ssm", region_name=region)
+            ssm = aws_clients.client("ssm", region_name=region)
             ssm.delete_parameter(Name=name)
         elif force_sm:
-            sm = boto3.client("secretsmanager", region_name=region)
+            sm = aws_clients.client("secretsmanager", region_name=region)
             sm.delete_secret(SecretId=name, ForceDeleteWithoutRecovery=True)
         else:
-            sm = boto3.client("secretsmanager", region_name=region)
+            sm = aws_clients.client("secretsmanager", region_name=region)
             sm.delete_secret(SecretId=name)
     except ClientError as e:
         if swallow_not_found and (
@@ -171,6 +311,36 @@ class StoredUserSecretStore:
             required=required,
         )
 
+    def read_many(
+        self, specs: Mapping[str, UserSecretSpec], *, required: bool = False
+    ) -> dict[str, str | None]:
+        """{key: spec} の値をまとめて読む ({key: value})。
+
+        実効 store ごとに read_stored_values で一括読み出しする (region は
+        context で 1 つ)。required / 未存在の扱いは read() と同じ。
+        """
+        by_store: dict[str, list[str]] = {}
+        for spec in specs.values():
+            if spec.name is None:
+                if required:
+                    raise RuntimeError("user secret name is not resolved")
+                continue
+            by_store.setdefault(self._effective_store(spec), []).append(spec.name)
+        values: dict[tuple[str, str], str | None] = {}
+        for store, names in by_store.items():
+            for name, value in read_stored_values(
+                names, store, self.context.region, required=required
+            ).items():
+                values[(store, name)] = value
+        return {
+            key: (
+                None
+                if spec.name is None
+                else values[(self._effective_store(spec), spec.name)]
+            )
+            for key, spec in specs.items()
+        }
+
     def put(self, spec: UserSecretSpec, value: str) -> None:
         """spec.name (正準名) に単一値を書き込む。
 
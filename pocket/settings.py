@@ -9,6 +9,7 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from .django.settings import Django
 from .general_settings import GeneralSettings, Vpc
+from .init_profile import phase
 from .utils import camel_logical_name, echo, get_toml_path, route_logical_name
 
 if sys.version_info >= (3, 11):
@@ -306,6 +307,23 @@ class ContainerIam(BaseModel):
     """
 
 
+class SecretsExtension(BaseModel):
+    """[container.<name>.secrets_extension] — secret を AWS Parameters and Secrets
+    Lambda Extension の localhost cache 経由で読む。
+
+    extension は Dockerfile で image の /opt に同梱する (image の Lambda は
+    Layer を使えない)。
+    """
+
+    model_config = ConfigDict(extra="forbid")
+
+    port: int = 2773
+    """extension の HTTP port (PARAMETERS_SECRETS_EXTENSION_HTTP_PORT)。"""
+
+    ttl: Annotated[int, Field(ge=0, le=300)] = 300
+    """extension の cache TTL 秒 (SECRETS_MANAGER_TTL / SSM_PARAMETER_STORE_TTL)。"""
+
+
 class Container(BaseModel):
     """[container.<name>] — 1 つのコンテナイメージとその Lambda handler 群。
 
@@ -331,6 +349,7 @@ class Container(BaseModel):
     permissions_boundary: str | None = None
     iam: ContainerIam = ContainerIam()
     build: BuildConfig = BuildConfig()
+    secrets_extension: SecretsExtension | None = None
     # ECR repository 名の上書き。省略時は resource_prefix + "{name}-lambda" を使う。
     # 同一 AWS アカウント内で複数 stage が同じ repo を共有したい場合に指定する
     # (build once + commit-hash 昇格で再ビルドなし deploy を成立させるため)。
@@ -358,6 +377,34 @@ class LambdaHandler(BaseModel):
     # 優先)。同一イメージを env でモード切替して複数 Lambda に並べる用途
     # (モジュールパス切替が使えない Rust 単一バイナリ等) に使う。
     envs: dict[str, str] = {}
+    # API Gateway を経由せず Lambda Function URL で HTTP を受ける
+    function_url: FunctionUrl | None = None
+    # Function URL (InvokeMode: RESPONSE_STREAM) を作り、pocket の runtime
+    # (pocket.lambda_streaming) で応答を chunk ごとに返す
+    streaming: bool = False
+
+    @model_validator(mode="after")
+    def check_streaming(self):
+        if self.streaming and (self.apigateway or self.sqs):
+            raise ValueError("streaming handler cannot use apigateway or sqs")
+        return self
+
+    @model_validator(mode="after")
+    def check_function_url(self):
+        if self.function_url and (self.apigateway or self.sqs):
+            raise ValueError("function_url handler cannot use apigateway or sqs")
+        return self
+
+    @property
+    def has_http_endpoint(self) -> bool:
+        return bool(self.apigateway or self.function_url or self.streaming)
+
+
+class FunctionUrl(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    # AWS_IAM にすると CloudFront の OAC (署名付き request) からしか呼べない
+    auth_type: Literal["NONE", "AWS_IAM"] = "NONE"
 
 
 class ApiGateway(BaseModel):
@@ -371,7 +418,13 @@ class ApiGateway(BaseModel):
 _LAMBDA_SCHEDULER = "pocket.lambda_scheduler"
 _DJANGO_MANAGEMENT_SCHEDULER = "pocket.django.management_lambda_scheduler"
 _SQS_SCHEDULER = "pocket.sqs_scheduler"
-_BUILTIN_SCHEDULERS = (_LAMBDA_SCHEDULER, _DJANGO_MANAGEMENT_SCHEDULER, _SQS_SCHEDULER)
+_KEEPWARM_SCHEDULER = "pocket.keepwarm_scheduler"
+_BUILTIN_SCHEDULERS = (
+    _LAMBDA_SCHEDULER,
+    _DJANGO_MANAGEMENT_SCHEDULER,
+    _SQS_SCHEDULER,
+    _KEEPWARM_SCHEDULER,
+)
 
 
 class _ScheduleEntryBase(BaseModel):
@@ -437,8 +490,25 @@ class SqsScheduleEntry(_ScheduleEntryBase):
     message: dict = {}
 
 
+class KeepwarmScheduleEntry(_ScheduleEntryBase):
+    """handler の実行環境を concurrency 個 warm に保つ ping を送る scheduler entry。
+
+    Lambda には ``{"pocket_keepwarm": {"concurrency": N}}`` が渡り、受けた Lambda が
+    自分自身を N - 1 回並行に invoke する (`pocket.keepwarm`)。handler は
+    `pocket.keepwarm.keepwarm` で包まれている必要がある (Django の
+    wsgi_handler / management_command_handler は包み済み)。
+    """
+
+    scheduler: Literal["pocket.keepwarm_scheduler"]
+    # 子の ping は runtime の共有 lambda client (接続プール 32) から並行に送る
+    concurrency: Annotated[int, Field(ge=1, le=32)] = 1
+
+
 ScheduleEntry = Annotated[
-    LambdaScheduleEntry | DjangoManagementScheduleEntry | SqsScheduleEntry,
+    LambdaScheduleEntry
+    | DjangoManagementScheduleEntry
+    | SqsScheduleEntry
+    | KeepwarmScheduleEntry,
     Field(discriminator="scheduler"),
 ]
 
@@ -467,6 +537,29 @@ class Scheduler(BaseModel):
         return data
 
 
+class SqsClaimCheck(BaseModel):
+    """[...handlers.<key>.sqs.claim_check] — 大きな message body を S3 経由で渡す。
+
+    threshold を超える body は stage の bucket に置き、message には参照だけを載せる
+    (`pocket.sqs_claim_check`)。
+    """
+
+    model_config = ConfigDict(extra="forbid")
+
+    # SQS の message の上限は 256 KB
+    threshold: Annotated[int, Field(ge=1, le=256 * 1024)] = 256 * 1024
+    prefix: str = "pocket/sqs-claim-check/"
+    # 処理されずに残った object を消すまでの日数。queue / DLQ に message が残って
+    # いる間は消えないよう、両方の保持期間より長くする (Sqs.check_claim_check)
+    expiration_days: Annotated[int, Field(ge=1)] = 15
+
+    @model_validator(mode="after")
+    def check_prefix(self):
+        if not self.prefix or self.prefix.startswith("/"):
+            raise ValueError("prefix must be non-empty and must not start with '/'")
+        return self
+
+
 class Sqs(BaseModel):
     model_config = ConfigDict(extra="forbid")
 
@@ -480,6 +573,24 @@ class Sqs(BaseModel):
     dead_letter_max_receive_count: int = 5
     dead_letter_message_retention_period: int = 1209600
     report_batch_item_failures: bool = True
+    # 1 invocation の中で並行に処理する record 数 (Django の sqs management
+    # handler が使う。worker thread ごとに DB 接続を張る)
+    concurrency: Annotated[int, Field(ge=1)] = 1
+    claim_check: SqsClaimCheck | None = None
+
+    @model_validator(mode="after")
+    def check_claim_check(self):
+        if self.claim_check is None:
+            return self
+        retention = max(
+            self.message_retention_period, self.dead_letter_message_retention_period
+        )
+        if self.claim_check.expiration_days * 86400 <= retention:
+            raise ValueError(
+                "claim_check.expiration_days must be longer than the message "
+                "retention period of the queue and its dead letter queue"
+            )
+        return self
 
 
 class Neon(BaseSettings):
@@ -1527,10 +1638,10 @@ class Settings(BaseModel):
                     _, _, handler = self.resolve_handler(route.handler)
                 except ValueError as e:
                     raise ValueError(f"cloudfront.{name}: {e}") from e
-                if not handler.apigateway:
+                if not handler.has_http_endpoint:
                     raise ValueError(
-                        f"cloudfront.{name}: handler '{route.handler}' "
-                        f"must have apigateway configured for lambda route"
+                        f"cloudfront.{name}: handler '{route.handler}' must have "
+                        f"apigateway or function_url configured for lambda route"
                     )
         self._check_cloudfront_token_secret(name, cf)
         self._check_cloudfront_basic_auth(name, cf)
@@ -1676,6 +1787,25 @@ class Settings(BaseModel):
                     )
         return self
 
+    @model_validator(mode="after")
+    def check_response_offload_requires_s3(self):
+        for name, c in self.container.items():
+            if c.django and c.django.response_offload and not self.s3:
+                raise ValueError(
+                    f"container.{name}.django.response_offload requires s3"
+                )
+        return self
+
+    @model_validator(mode="after")
+    def check_sqs_claim_check_requires_s3(self):
+        for name, c in self.container.items():
+            for key, handler in c.handlers.items():
+                if handler.sqs and handler.sqs.claim_check and not self.s3:
+                    raise ValueError(
+                        f"container.{name}.handlers.{key}.sqs.claim_check requires s3"
+                    )
+        return self
+
     @model_validator(mode="after")
     def check_cloudfront_requires_s3(self):
         if self.cloudfront and not self.s3:
@@ -1686,9 +1816,22 @@ class Settings(BaseModel):
 
     @classmethod
     def from_toml(cls, *, stage: str):
-        text = get_toml_path().read_text()
-        cls.check_generator_version(text)
-        data = tomllib.loads(text)
+        with phase("toml_read"):
+            text = get_toml_path().read_text()
+            cls.check_generator_version(text)
+            data = tomllib.loads(text)
+        result = cls.from_toml_data(data, stage=stage)
+        result._emit_advisories()
+        return result
+
+    @classmethod
+    def from_toml_data(cls, data: dict, *, stage: str):
+        """parse 済みの pocket.toml データから stage の Settings を構築する。
+
+        from_toml の本体。data は stage override の merge 等で書き換えられる。
+        advisory は出さない (context snapshot の生成で全 stage 分を組む際に
+        同じ助言を繰り返さないため。from_toml が 1 回だけ出す)。
+        """
         cls.check_keys(data)
         cls.check_stage(stage, data)
         cls.merge_stage_data(stage, data)
@@ -1697,9 +1840,8 @@ class Settings(BaseModel):
         cls.check_env_backed_section_keys(data)
         data["stage"] = stage
         cls.resolve_vpc(data)
-        result = cls.model_validate(data)
-        result._emit_advisories()
-        return result
+        with phase("settings_validate"):
+            return cls.model_validate(data)
 
     def _emit_advisories(self) -> None:
         """検証を通った後の advisory (raise しない助言) を 1 回だけ stderr に出す。
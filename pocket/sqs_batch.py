@@ -0,0 +1,101 @@
+"""SQS event の record を 1 invocation の中で並行に処理する。
+
+SQS の event source mapping は最大 ``batch_size`` 件の record をまとめて 1 回の
+invocation に渡す。record を順番に処理すると、I/O 待ちの長い command が 10 件で
+10 倍の時間がかかる。`process_records` は record を ``concurrency`` 本の worker
+thread に分けて処理し、失敗した record を元の順序で返す (batchItemFailures 用)。
+
+並行度は handler の ``[...handlers.<key>.sqs] concurrency`` で、Lambda には
+``POCKET_SQS_CONCURRENCY`` として渡る。
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import threading
+from collections.abc import Callable
+from typing import Any
+
+SQS_CONCURRENCY_ENV = "POCKET_SQS_CONCURRENCY"
+
+Record = dict[str, Any]
+
+
+def get_concurrency() -> int:
+    """``POCKET_SQS_CONCURRENCY`` の並行度 (未設定なら 1)。"""
+    return max(int(os.environ.get(SQS_CONCURRENCY_ENV) or 1), 1)
+
+
+def process_records(
+    records: list[Record],
+    func: Callable[[Record], None],
+    *,
+    concurrency: int = 1,
+    on_worker_exit: Callable[[], None] | None = None,
+) -> list[tuple[Record, BaseException]]:
+    """records を func で処理し、失敗した (record, 例外) を records の順に返す。
+
+    concurrency が 1 なら呼び出し元の thread で順に処理する。2 以上なら worker
+    thread を最大 concurrency 本立て、各 worker は終了時に on_worker_exit を呼ぶ
+    (Django の DB 接続は thread ごとに張られるため、ここで閉じる)。
+    """
+    if concurrency <= 1 or len(records) <= 1:
+        return _process_sequential(records, func)
+    return _process_concurrent(records, func, concurrency, on_worker_exit)
+
+
+def _process_sequential(
+    records: list[Record], func: Callable[[Record], None]
+) -> list[tuple[Record, BaseException]]:
+    failures: list[tuple[Record, BaseException]] = []
+    for record in records:
+        try:
+            func(record)
+        # record ごとの成否を返すため、func の任意の例外を捕捉する
+        except Exception as e:
+            failures.append((record, e))
+    return failures
+
+
+def _process_concurrent(
+    records: list[Record],
+    func: Callable[[Record], None],
+    concurrency: int,
+    on_worker_exit: Callable[[], None] | None,
+) -> list[tuple[Record, BaseException]]:
+    pending: queue.SimpleQueue[int] = queue.SimpleQueue()
+    for index in range(len(records)):
+        pending.put(index)
+    errors: list[BaseException | None] = [None] * len(records)
+
+    def worker() -> None:
+        try:
+            while True:
+                try:
+                    index = pending.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    func(records[index])
+                # thread の中で SystemExit 等が起きても黙って消えないよう、
+                # BaseException まで record の失敗として扱う
+                except BaseException as e:
+                    errors[index] = e
+        finally:
+            if on_worker_exit is not None:
+                on_worker_exit()
+
+    threads = [
+        threading.Thread(target=worker, name=f"pocket-sqs-{n}")
+        for n in range(min(concurrency, len(records)))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [
+        (record, error)
+        for record, error in zip(records, errors, strict=True)
+        if error is not None
+    ]
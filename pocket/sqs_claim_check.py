@@ -0,0 +1,77 @@
+"""SQS の上限を超える message body を S3 に置き、message には参照だけを載せる。
+
+SQS の message は 256 KB が上限で、大量の id を渡す bulk command などは送信時に
+失敗する。claim check を有効にした queue (``[...handlers.<key>.sqs.claim_check]``)
+では、閾値を超える body を stage の bucket に put し、message body を
+``{"pocket_claim_check": {"bucket": ..., "key": ..., "size": ...}}`` に置き換える。
+
+受信側 (Django の sqs management handler / `BaseCommandHandler`) は
+`resolved_body` で元の body を読み、処理が成功した時だけ object を消す。失敗した
+record は再配信されて同じ object を読み直す。消し損ねた object (送信だけ成功して
+message が捨てられた等) は bucket の lifecycle rule で消える。
+"""
+
+from __future__ import annotations
+
+import json
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from pocket import aws_clients
+
+CLAIM_CHECK_KEY = "pocket_claim_check"
+
+
+def offload_body(
+    body: str,
+    *,
+    bucket_name: str,
+    prefix: str,
+    threshold: int,
+    region: str | None = None,
+) -> str:
+    """body が threshold bytes を超えたら S3 に置き、参照の message body を返す。"""
+    data = body.encode()
+    if len(data) <= threshold:
+        return body
+    key = f"{prefix}{uuid.uuid4().hex}.json"
+    aws_clients.client("s3", region_name=region).put_object(
+        Bucket=bucket_name, Key=key, Body=data, ContentType="application/json"
+    )
+    pointer: dict[str, Any] = {"bucket": bucket_name, "key": key, "size": len(data)}
+    if region:
+        pointer["region"] = region
+    return json.dumps({CLAIM_CHECK_KEY: pointer})
+
+
+def parse_pointer(body: str) -> dict[str, Any] | None:
+    """claim check の参照なら中身 (bucket / key 等) を、違えば None を返す。"""
+    # 参照は小さいので、大きな普通の body を毎回 json.loads しない
+    if len(body) > 1024 or CLAIM_CHECK_KEY not in body:
+        return None
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or set(data) != {CLAIM_CHECK_KEY}:
+        return None
+    return data[CLAIM_CHECK_KEY]
+
+
+@contextmanager
+def resolved_body(body: str) -> Iterator[str]:
+    """message body を元の body に戻して渡し、with を正常に抜けたら object を消す。
+
+    claim check の参照でなければ body をそのまま渡す。with の中で例外が起きた場合は
+    object を残す (再配信された message がもう一度読む)。
+    """
+    pointer = parse_pointer(body)
+    if pointer is None:
+        yield body
+        return
+    s3 = aws_clients.client("s3", region_name=pointer.get("region"))
+    obj = s3.get_object(Bucket=pointer["bucket"], Key=pointer["key"])
+    yield obj["Body"].read().decode()
+    s3.delete_object(Bucket=pointer["bucket"], Key=pointer["key"])
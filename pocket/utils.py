@@ -235,6 +235,15 @@ def get_wsgi_application():
     return mod.application
 
 
+def get_asgi_application():
+    try:
+        mod = importlib.import_module("%s.asgi" % get_project_name())
+    except ModuleNotFoundError:
+        print("Failed to import ASGI application %s.asgi" % get_project_name())
+        raise
+    return mod.application
+
+
 def route_logical_name(path_pattern: str) -> str:
     """route の path_pattern から CFn 論理 ID / Origin Id 用の名前を導出する。
 
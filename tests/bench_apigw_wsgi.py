@@ -0,0 +1,115 @@
+"""pocket.apigw_wsgi と apig_wsgi の micro-benchmark。
+
+``uv run python tests/bench_apigw_wsgi.py`` で実行する (pytest の収集対象外)。
+代表的な event (GET の HTML、JSON の POST、画像の応答) を同じ WSGI app に通し、
+1 request あたりの adapter の overhead を比較する。
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import timeit
+
+from apig_wsgi import make_lambda_handler as make_apig_wsgi_handler
+
+from pocket.apigw_wsgi import make_lambda_handler
+
+_HEADERS = {
+    "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "accept-encoding": "gzip, deflate, br",
+    "accept-language": "ja,en-US;q=0.9,en;q=0.8",
+    "host": "example.com",
+    "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)",
+    "x-amzn-trace-id": "Root=1-67891233-abcdef012345678912345678",
+    "x-forwarded-for": "203.0.113.1",
+    "x-forwarded-port": "443",
+    "x-forwarded-proto": "https",
+}
+
+
+def _event(path, method="GET", body=None, is_base64=False, headers=None):
+    return {
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": path,
+        "rawQueryString": "page=2&sort=-created",
+        "cookies": ["sessionid=abcdef0123456789", "csrftoken=0123456789abcdef"],
+        "headers": {**_HEADERS, **(headers or {})},
+        "requestContext": {
+            "http": {
+                "method": method,
+                "path": path,
+                "protocol": "HTTP/1.1",
+                "sourceIp": "203.0.113.1",
+            }
+        },
+        "body": body,
+        "isBase64Encoded": is_base64,
+    }
+
+
+_HTML = ("<html><body>" + "<p>乃木坂</p>" * 2000 + "</body></html>").encode()
+_PNG = bytes(range(256)) * 1024
+
+EVENTS = {
+    "html GET": (_event("/articles/%E4%B9%83/"), "text/html; charset=utf-8", _HTML),
+    "json POST": (
+        _event(
+            "/api/items/",
+            method="POST",
+            body=json.dumps({"items": list(range(500))}),
+            headers={"content-type": "application/json"},
+        ),
+        "application/json",
+        b'{"ok": true}',
+    ),
+    "png upload": (
+        _event(
+            "/upload/",
+            method="POST",
+            body=base64.b64encode(_PNG).decode(),
+            is_base64=True,
+            headers={"content-type": "image/png"},
+        ),
+        "image/png",
+        _PNG,
+    ),
+}
+
+
+def _app(content_type, body):
+    def app(environ, start_response):
+        environ["wsgi.input"].read()
+        start_response(
+            "200 OK",
+            [("Content-Type", content_type), ("Set-Cookie", "a=1"), ("Vary", "Cookie")],
+        )
+        return [body]
+
+    return app
+
+
+def _per_request_us(handler, event, number: int) -> float:
+    best = min(timeit.repeat(lambda: handler(event, None), number=number))
+    return best / number * 1e6
+
+
+def main(number: int = 2000) -> None:
+    print("%-12s %12s %12s %8s" % ("event", "apig_wsgi", "pocket", "ratio"))
+    for name, (event, content_type, body) in EVENTS.items():
+        app = _app(content_type, body)
+        theirs = make_apig_wsgi_handler(
+            app, binary_support=True, non_binary_content_type_prefixes=("text/",)
+        )
+        ours = make_lambda_handler(app)
+        t_theirs = _per_request_us(theirs, event, number)
+        t_ours = _per_request_us(ours, event, number)
+        print(
+            "%-12s %10.1fus %10.1fus %7.2fx"
+            % (name, t_theirs, t_ours, t_theirs / t_ours)
+        )
+
+
+if __name__ == "__main__":
+    main()
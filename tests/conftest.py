@@ -2,8 +2,8 @@ from pathlib import Path
 
 import pytest
 
-from pocket import settings
-from pocket.runtime import get_context
+from pocket import aws_clients, settings
+from pocket.runtime import get_context, reset_dsql_token, reset_secret_cache
 from pocket.utils import get_hosted_zone_id_from_domain, get_hosted_zones
 
 
@@ -53,6 +53,10 @@ def cleaned_cache():
     get_hosted_zones.cache_clear()
     get_hosted_zone_id_from_domain.cache_clear()
     get_context.cache_clear()
+    # 共有 client は boto3.client の monkeypatch / moto の有効化より前に作られうる
+    aws_clients.reset_clients()
+    reset_secret_cache()
+    reset_dsql_token()
     return True
 
 
@@ -0,0 +1,198 @@
+"""API Gateway (payload v2) → ASGI handler (pocket.apigw_asgi) のテスト。"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+from pathlib import Path
+
+import pytest
+
+from pocket.apigw_asgi import AsgiLambdaHandler, LifespanError, get_scope
+
+
+def v2_event(path="/items/", method="GET", body=None, headers=None, cookies=None):
+    event = {
+        "version": "2.0",
+        "rawPath": path,
+        "rawQueryString": "q=1",
+        "headers": {
+            "host": "example.com",
+            "x-forwarded-proto": "https",
+            "x-forwarded-port": "443",
+            **(headers or {}),
+        },
+        "requestContext": {
+            "http": {"method": method, "protocol": "HTTP/1.1", "sourceIp": "1.2.3.4"}
+        },
+        "isBase64Encoded": False,
+    }
+    if body is not None:
+        event["body"] = body
+    if cookies is not None:
+        event["cookies"] = cookies
+    return event
+
+
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def _respond(send, body, content_type=b"application/json", status=200):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type), (b"set-cookie", b"a=1")],
+        }
+    )
+    await send({"type": "http.response.body", "body": body[:2], "more_body": True})
+    await send({"type": "http.response.body", "body": body[2:]})
+
+
+def test_scope():
+    event = v2_event(path="/%E4%B9%83/", cookies=["a=1", "b=2"])
+    scope = get_scope(event, "ctx", {"pool": 1})
+    assert scope["path"] == "/乃/"
+    assert scope["raw_path"] == b"/%E4%B9%83/"
+    assert scope["query_string"] == b"q=1"
+    assert scope["scheme"] == "https"
+    assert scope["server"] == ("example.com", 443)
+    assert scope["client"] == ("1.2.3.4", 0)
+    assert (b"cookie", b"a=1; b=2") in scope["headers"]
+    assert scope["state"] == {"pool": 1}
+    assert scope["aws.context"] == "ctx"
+
+
+def test_request_and_response():
+    async def app(scope, receive, send):
+        body = await _read_body(receive)
+        data = {"method": scope["method"], "body": body.decode()}
+        await _respond(send, json.dumps(data).encode(), status=201)
+
+    handler = AsgiLambdaHandler(app, lifespan="off")
+    response = handler(v2_event(method="POST", body='{"x": 1}'), None)
+    assert response["statusCode"] == 201
+    assert response["cookies"] == ["a=1"]
+    assert response["isBase64Encoded"] is False
+    assert json.loads(response["body"]) == {"method": "POST", "body": '{"x": 1}'}
+
+
+def test_binary_response_is_base64():
+    async def app(scope, receive, send):
+        await _respond(send, b"\x89PNG\x00\x01", content_type=b"image/png")
+
+    response = AsgiLambdaHandler(app, lifespan="off")(v2_event(), None)
+    assert response["isBase64Encoded"] is True
+    assert base64.b64decode(response["body"]) == b"\x89PNG\x00\x01"
+
+
+def test_event_loop_is_reused_and_lifespan_state():
+    loops = []
+    events = []
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            message = await receive()
+            assert message["type"] == "lifespan.startup"
+            scope["state"]["client"] = "shared-client"
+            await send({"type": "lifespan.startup.complete"})
+            message = await receive()
+            assert message["type"] == "lifespan.shutdown"
+            events.append("shutdown")
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+        loops.append(asyncio.get_running_loop())
+        await _respond(send, scope["state"]["client"].encode(), b"text/plain")
+
+    handler = AsgiLambdaHandler(app)
+    first = handler(v2_event(), None)
+    second = handler(v2_event(), None)
+    assert first["body"] == second["body"] == "shared-client"
+    assert loops[0] is loops[1] is handler.loop
+    handler.shutdown()
+    assert events == ["shutdown"]
+
+
+def test_concurrent_io_within_request():
+    async def upstream(i):
+        await asyncio.sleep(0.05)
+        return i
+
+    async def app(scope, receive, send):
+        start = asyncio.get_running_loop().time()
+        results = await asyncio.gather(*(upstream(i) for i in range(8)))
+        elapsed = asyncio.get_running_loop().time() - start
+        data = {"results": results, "elapsed": elapsed}
+        await _respond(send, json.dumps(data).encode())
+
+    data = json.loads(AsgiLambdaHandler(app, lifespan="off")(v2_event(), None)["body"])
+    assert data["results"] == list(range(8))
+    assert data["elapsed"] < 0.05 * 4
+
+
+def test_lifespan_auto_ignores_unsupported_app():
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            raise ValueError("Django can only handle ASGI/HTTP connections")
+        await _respond(send, b"ok", b"text/plain")
+
+    handler = AsgiLambdaHandler(app)
+    assert handler(v2_event(), None)["body"] == "ok"
+    with pytest.raises(LifespanError, match="does not support"):
+        AsgiLambdaHandler(app, lifespan="on")
+
+
+def test_lifespan_startup_failed():
+    async def app(scope, receive, send):
+        await receive()
+        await send({"type": "lifespan.startup.failed", "message": "no db"})
+
+    with pytest.raises(LifespanError, match="no db"):
+        AsgiLambdaHandler(app)
+
+
+def test_disconnect_after_response():
+    received = []
+
+    async def app(scope, receive, send):
+        await _read_body(receive)
+        await _respond(send, b"ok", b"text/plain")
+        received.append(await receive())
+
+    AsgiLambdaHandler(app, lifespan="off")(v2_event(), None)
+    assert received == [{"type": "http.disconnect"}]
+
+
+def test_django_asgi_handler():
+    from django.conf import settings as dj_settings
+
+    if not dj_settings.configured:
+        dj_settings.configure(DEFAULT_CHARSET="utf-8", ALLOWED_HOSTS=["*"])
+    from django.core.handlers.asgi import ASGIHandler
+
+    class App(ASGIHandler):
+        async def get_response_async(self, request):
+            from django.http import JsonResponse
+
+            return JsonResponse({"path": request.path})
+
+    handler = AsgiLambdaHandler(App())
+    response = handler(v2_event(path="/%E4%B9%83/"), None)
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == {"path": "/乃/"}
+
+
+def test_django_asgi_handler_module_wiring():
+    # handler module は import 時に Django を初期化するため、source で確認する
+    source = Path("pocket/django/asgi_handlers.py").read_text()
+    assert "asgi_handler = keepwarm(" in source
+    for module in ("asgi_handlers", "lambda_handlers"):
+        source = Path(f"pocket/django/{module}.py").read_text()
+        assert "register_snapstart_hooks(before=[close_db_connections])" in source
@@ -0,0 +1,363 @@
+"""API Gateway (payload v2) → WSGI adapter (pocket.apigw_wsgi) のテスト。
+
+apig_wsgi と同じ event を渡し、environ と応答が一致すること (意図して変えた
+PATH_INFO の非 ASCII と base64 の判定を除く) を確認する。
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+
+import pytest
+from apig_wsgi import make_lambda_handler as make_apig_wsgi_handler
+
+from pocket.apigw_wsgi import (
+    DEFAULT_COMPRESS_MIN_SIZE,
+    choose_encoding,
+    decode_path,
+    get_environ,
+    make_lambda_handler,
+)
+
+
+def v2_event(
+    path="/items/",
+    method="GET",
+    body=None,
+    is_base64=False,
+    headers=None,
+    cookies=None,
+    query="",
+):
+    event = {
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": path,
+        "rawQueryString": query,
+        "headers": {
+            "host": "example.com",
+            "x-forwarded-proto": "https",
+            "x-forwarded-port": "443",
+            **(headers or {}),
+        },
+        "requestContext": {
+            "http": {
+                "method": method,
+                "path": path,
+                "protocol": "HTTP/1.1",
+                "sourceIp": "203.0.113.1",
+            }
+        },
+        "isBase64Encoded": is_base64,
+    }
+    if body is not None:
+        event["body"] = body
+    if cookies is not None:
+        event["cookies"] = cookies
+    return event
+
+
+def echo_app(environ, start_response):
+    keys = [
+        "REQUEST_METHOD",
+        "PATH_INFO",
+        "QUERY_STRING",
+        "CONTENT_TYPE",
+        "CONTENT_LENGTH",
+        "SERVER_NAME",
+        "SERVER_PORT",
+        "REMOTE_ADDR",
+        "HTTP_COOKIE",
+        "HTTP_X_CUSTOM",
+        "wsgi.url_scheme",
+    ]
+    data = {key: environ.get(key) for key in keys}
+    data["body"] = environ["wsgi.input"].read().decode("latin-1")
+    start_response("200 OK", [("Content-Type", "application/json")])
+    return [json.dumps(data).encode()]
+
+
+@pytest.mark.parametrize(
+    ("raw", "expected"),
+    [
+        ("/plain/", "/plain/"),
+        ("/%E4%B9%83/", "/\xe4\xb9\x83/"),
+        # rawPath に生の非 ASCII が来ても UTF-8 の bytes として扱う
+        ("/乃/", "/\xe4\xb9\x83/"),
+        ("/a%2Fb", "/a/b"),
+    ],
+)
+def test_decode_path(raw, expected):
+    assert decode_path(raw) == expected
+
+
+def test_environ_matches_apig_wsgi():
+    event = v2_event(
+        method="POST",
+        body='{"a": 1}',
+        headers={"content-type": "application/json", "x-custom": "1"},
+        cookies=["a=1", "b=2"],
+        query="q=%E4%B9%83&x=1",
+    )
+    ours = json.loads(make_lambda_handler(echo_app)(event, None)["body"])
+    theirs_handler = make_apig_wsgi_handler(echo_app, binary_support=True)
+    theirs = json.loads(theirs_handler(event, None)["body"])
+    # apig_wsgi は cookie を ";" で結合する。RFC 6265 の区切りは "; "
+    assert ours.pop("HTTP_COOKIE") == "a=1; b=2"
+    theirs.pop("HTTP_COOKIE")
+    assert ours == theirs
+    assert ours["wsgi.url_scheme"] == "https"
+    assert ours["body"] == '{"a": 1}'
+
+
+def test_base64_request_body():
+    payload = bytes(range(256))
+    event = v2_event(
+        method="POST", body=base64.b64encode(payload).decode(), is_base64=True
+    )
+    environ = get_environ(event, None)
+    assert environ["wsgi.input"].read() == payload
+    assert environ["CONTENT_LENGTH"] == "256"
+
+
+def test_django_reads_non_ascii_path():
+    from django.core.handlers.wsgi import get_path_info
+
+    environ = get_environ(v2_event(path="/%E4%B9%83/"), None)
+    assert get_path_info(environ) == "/乃/"
+
+
+def _app(content_type, body, extra_headers=()):
+    def app(environ, start_response):
+        start_response("201 Created", [("Content-Type", content_type), *extra_headers])
+        return [body[:3], b"", body[3:]]
+
+    return app
+
+
+def test_text_response_is_not_base64():
+    handler = make_lambda_handler(_app("text/html; charset=utf-8", "乃木".encode()))
+    response = handler(v2_event(), None)
+    assert response["statusCode"] == 201
+    assert response["isBase64Encoded"] is False
+    assert response["body"] == "乃木"
+
+
+def test_binary_response_is_base64():
+    payload = b"\x89PNG\r\n\x1a\n\x00\x01"
+    response = make_lambda_handler(_app("image/png", payload))(v2_event(), None)
+    assert response["isBase64Encoded"] is True
+    assert base64.b64decode(response["body"]) == payload
+
+
+def test_encoded_text_response_is_base64():
+    app = _app("text/plain", b"\x1f\x8b\x08\x00", [("Content-Encoding", "gzip")])
+    response = make_lambda_handler(app)(v2_event(), None)
+    assert response["isBase64Encoded"] is True
+
+
+def test_invalid_utf8_text_falls_back_to_base64():
+    response = make_lambda_handler(_app("text/plain", b"\xff\xfe"))(v2_event(), None)
+    assert response["isBase64Encoded"] is True
+    assert base64.b64decode(response["body"]) == b"\xff\xfe"
+
+
+def test_headers_and_cookies():
+    def app(environ, start_response):
+        start_response(
+            "200 OK",
+            [
+                ("Content-Type", "text/plain"),
+                ("Vary", "Cookie"),
+                ("Vary", "Accept-Encoding"),
+                ("Set-Cookie", "a=1"),
+                ("Set-Cookie", "b=2"),
+            ],
+        )
+        return [b"ok"]
+
+    response = make_lambda_handler(app)(v2_event(), None)
+    assert response["headers"] == {
+        "content-type": "text/plain",
+        "vary": "Cookie, Accept-Encoding",
+    }
+    assert response["cookies"] == ["a=1", "b=2"]
+
+
+def test_close_is_called():
+    closed = []
+
+    class Result(list):
+        def close(self):
+            closed.append(True)
+
+    def app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return Result([b"ok"])
+
+    make_lambda_handler(app)(v2_event(), None)
+    assert closed == [True]
+
+
+def test_non_v2_event_uses_fallback():
+    calls = []
+
+    def fallback(event, context):
+        calls.append(event)
+        return {"statusCode": 200}
+
+    handler = make_lambda_handler(echo_app, fallback=fallback)
+    assert handler({"httpMethod": "GET", "path": "/"}, None) == {"statusCode": 200}
+    assert len(calls) == 1
+
+
+def test_non_v2_event_without_fallback():
+    with pytest.raises(ValueError, match="unsupported payload version"):
+        make_lambda_handler(echo_app)({"version": "1.0"}, None)
+
+
+_JSON = json.dumps([{"id": i, "name": "item %d" % i} for i in range(2000)]).encode()
+
+
+def _compressing(app, **kwargs):
+    return make_lambda_handler(
+        app, compress_min_size=DEFAULT_COMPRESS_MIN_SIZE, **kwargs
+    )
+
+
+def _gzip_event(accept="gzip, deflate, br"):
+    return v2_event(headers={"accept-encoding": accept})
+
+
+def test_gzip_json_response():
+    import gzip
+
+    app = _app("application/json", _JSON, [("Vary", "Cookie")])
+    response = _compressing(app)(_gzip_event("gzip, deflate"), None)
+    assert response["isBase64Encoded"] is True
+    assert response["headers"]["content-encoding"] == "gzip"
+    assert response["headers"]["vary"] == "Cookie, Accept-Encoding"
+    compressed = base64.b64decode(response["body"])
+    assert gzip.decompress(compressed) == _JSON
+    assert len(compressed) * 5 < len(_JSON)
+
+
+def test_compressed_response_weakens_etag():
+    app = _app("application/json", _JSON, [("ETag", '"abc"')])
+    response = _compressing(app)(_gzip_event("gzip"), None)
+    assert response["headers"]["content-encoding"] == "gzip"
+    assert response["headers"]["etag"] == 'W/"abc"'
+    # 圧縮しない応答の ETag はそのまま
+    response = _compressing(app)(v2_event(), None)
+    assert response["headers"]["etag"] == '"abc"'
+
+
+def test_brotli_is_preferred():
+    brotli = pytest.importorskip("brotli")
+    response = _compressing(_app("application/json", _JSON))(_gzip_event(), None)
+    assert response["headers"]["content-encoding"] == "br"
+    assert brotli.decompress(base64.b64decode(response["body"])) == _JSON
+
+
+@pytest.mark.parametrize(
+    ("accept", "expected"),
+    [
+        (None, None),
+        ("identity", None),
+        ("gzip;q=0", None),
+        ("GZIP", "gzip"),
+        ("*", "gzip"),
+        ("*;q=0, gzip;q=0.5", "gzip"),
+        ("deflate, gzip;q=1.0, *;q=0.5", "gzip"),
+    ],
+)
+def test_choose_encoding(monkeypatch, accept, expected):
+    monkeypatch.setattr("pocket.apigw_wsgi.brotli", None)
+    assert choose_encoding(accept) == expected
+
+
+def test_small_response_is_not_compressed():
+    response = _compressing(_app("application/json", b'{"ok": true}'))(
+        _gzip_event(), None
+    )
+    assert "content-encoding" not in response["headers"]
+    assert response["body"] == '{"ok": true}'
+
+
+def test_binary_response_is_not_compressed():
+    payload = bytes(range(256)) * 100
+    response = _compressing(_app("image/png", payload))(_gzip_event(), None)
+    assert "content-encoding" not in response["headers"]
+    assert "vary" not in response["headers"]
+    assert base64.b64decode(response["body"]) == payload
+
+
+def test_already_encoded_response_is_not_recompressed():
+    app = _app("application/json", _JSON, [("Content-Encoding", "identity")])
+    response = _compressing(app)(_gzip_event(), None)
+    assert response["headers"]["content-encoding"] == "identity"
+    assert base64.b64decode(response["body"]) == _JSON
+
+
+def test_not_accepted_still_sets_vary():
+    response = _compressing(_app("application/json", _JSON))(v2_event(), None)
+    assert "content-encoding" not in response["headers"]
+    assert response["headers"]["vary"] == "Accept-Encoding"
+    assert response["isBase64Encoded"] is False
+
+
+def test_compression_is_off_by_default():
+    response = make_lambda_handler(_app("application/json", _JSON))(_gzip_event(), None)
+    assert "content-encoding" not in response["headers"]
+    assert "vary" not in response["headers"]
+
+
+def test_html_is_compressed_only_when_enabled():
+    html = b"<html>" + b"<p>hello</p>" * 200 + b"</html>"
+    app = _app("text/html; charset=utf-8", html)
+    response = _compressing(app)(_gzip_event("gzip"), None)
+    assert "content-encoding" not in response["headers"]
+    assert response["body"] == html.decode()
+    response = _compressing(app, compress_html=True)(_gzip_event("gzip"), None)
+    assert response["headers"]["content-encoding"] == "gzip"
+
+
+def test_compression_options_from_context(monkeypatch):
+    from pocket.context import Context
+    from pocket.django import compression
+    from pocket.settings import Settings
+
+    data = {
+        "stage": "dev",
+        "general": {
+            "region": "ap-northeast-1",
+            "project_name": "testprj",
+            "stages": ["dev"],
+        },
+        "container": {
+            "main": {
+                "dockerfile_path": "Dockerfile",
+                "handlers": {
+                    "wsgi": {
+                        "command": "pocket.django.lambda_handlers.wsgi_handler",
+                        "apigateway": {},
+                    }
+                },
+                "django": {"compression": {"min_size": 2048}},
+            }
+        },
+    }
+    django = (
+        Context.from_settings(Settings.model_validate(data)).container["main"].django
+    )
+    assert django is not None
+    monkeypatch.setattr(
+        compression, "get_compression_context", lambda: django.compression
+    )
+    assert compression.compression_options_from_context() == {
+        "compress_min_size": 2048,
+        "compress_html": False,
+    }
+    monkeypatch.setattr(compression, "get_compression_context", lambda: None)
+    assert compression.compression_options_from_context() == {"compress_min_size": None}
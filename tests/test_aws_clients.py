@@ -0,0 +1,73 @@
+import threading
+
+from pocket import aws_clients
+
+
+def _recording_client(monkeypatch):
+    created = []
+
+    def _client(service_name, **kwargs):
+        created.append((service_name, kwargs))
+        return object()
+
+    monkeypatch.setattr("boto3.client", _client)
+    return created
+
+
+def test_client_is_shared_per_service_and_region(monkeypatch):
+    created = _recording_client(monkeypatch)
+    ssm = aws_clients.client("ssm", region_name="ap-northeast-1")
+    assert aws_clients.client("ssm", region_name="ap-northeast-1") is ssm
+    assert aws_clients.client("ssm", region_name="us-east-1") is not ssm
+    assert aws_clients.client("sqs", region_name="ap-northeast-1") is not ssm
+    assert [c[0] for c in created] == ["ssm", "ssm", "sqs"]
+
+
+def test_client_uses_tuned_config(monkeypatch):
+    created = _recording_client(monkeypatch)
+    aws_clients.client("secretsmanager")
+    kwargs = created[0][1]
+    assert kwargs["region_name"] is None
+    config = kwargs["config"]
+    assert config.tcp_keepalive is True
+    assert config.max_pool_connections == aws_clients.MAX_POOL_CONNECTIONS
+    assert config.retries["mode"] == "standard"
+
+
+def test_signature_version_gets_its_own_tuned_client(monkeypatch):
+    created = _recording_client(monkeypatch)
+    s3 = aws_clients.client("s3")
+    presign = aws_clients.client("s3", signature_version="s3v4")
+    assert presign is not s3
+    assert aws_clients.client("s3", signature_version="s3v4") is presign
+    config = created[1][1]["config"]
+    assert config.signature_version == "s3v4"
+    assert config.tcp_keepalive is True
+    assert config.max_pool_connections == aws_clients.MAX_POOL_CONNECTIONS
+
+
+def test_reset_clients_drops_cache(monkeypatch):
+    created = _recording_client(monkeypatch)
+    first = aws_clients.client("sqs")
+    aws_clients.reset_clients()
+    assert aws_clients.client("sqs") is not first
+    assert len(created) == 2
+
+
+def test_concurrent_first_use_creates_once(monkeypatch):
+    """並列に初回取得しても生成は 1 回 (lock の下で直列化される)"""
+    created = _recording_client(monkeypatch)
+    barrier = threading.Barrier(4, timeout=5)
+    results = []
+
+    def _get():
+        barrier.wait()
+        results.append(aws_clients.client("ssm", region_name="ap-northeast-1"))
+
+    threads = [threading.Thread(target=_get) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(created) == 1
+    assert all(r is results[0] for r in results)
@@ -0,0 +1,225 @@
+"""pocket_call_command_many / command buffer (SQS の一括送信) のテスト。"""
+
+from __future__ import annotations
+
+import json
+
+import boto3
+import pytest
+from botocore.exceptions import EndpointConnectionError
+from django.http import HttpResponse
+from moto import mock_aws
+
+from pocket.django import command_buffer
+from pocket.django import utils as django_utils
+from pocket.django.command_buffer import (
+    CommandBufferMiddleware,
+    buffer_call_command,
+)
+from pocket.django.command_buffer import (
+    command_buffer as open_buffer,
+)
+from pocket.django.utils import (
+    SqsBatchSendError,
+    pocket_call_command_many,
+    pocket_send_sqs_messages,
+)
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    with mock_aws():
+        sqs = boto3.client("sqs", region_name="us-east-1")
+        url = sqs.create_queue(QueueName="sqsmanagement")["QueueUrl"]
+        monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+        monkeypatch.setenv("POCKET_SQSMANAGEMENT_QUEUEURL", url)
+        yield sqs, url
+
+
+def _received(sqs, url):
+    bodies = []
+    while True:
+        messages = sqs.receive_message(QueueUrl=url, MaxNumberOfMessages=10).get(
+            "Messages", []
+        )
+        if not messages:
+            return bodies
+        bodies += [json.loads(m["Body"]) for m in messages]
+
+
+class CountingSqs:
+    """send_message_batch の呼び出しを数え、指定回数だけ entry を失敗させる。"""
+
+    def __init__(self, fail_times=0, sender_fault=False):
+        self.batches: list[list[dict]] = []
+        self.fail_times = fail_times
+        self.sender_fault = sender_fault
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self.batches.append(Entries)
+        if self.fail_times:
+            self.fail_times -= 1
+            failed = [
+                {"Id": Entries[0]["Id"], "Code": "InternalError", "SenderFault": False}
+            ]
+            if self.sender_fault:
+                failed[0].update(Code="InvalidMessageContents", SenderFault=True)
+            return {"Successful": [], "Failed": failed}
+        return {"Successful": [{"Id": e["Id"]} for e in Entries], "Failed": []}
+
+
+def test_call_command_many_sends_batches(queue):
+    sqs, url = queue
+    calls = [{"command": "notify", "args": [i]} for i in range(25)]
+    pocket_call_command_many(calls)
+    received = _received(sqs, url)
+    assert sorted(m["args"][0] for m in received) == list(range(25))
+    assert received[0]["kwargs"] == {}
+
+
+def test_batches_respect_entry_and_size_limits(monkeypatch):
+    fake = CountingSqs()
+    monkeypatch.setattr(django_utils, "_get_sqs_client", lambda: fake)
+    pocket_send_sqs_messages("url", ["x"] * 23)
+    assert [len(b) for b in fake.batches] == [10, 10, 3]
+    fake.batches.clear()
+    big = "y" * (100 * 1024)
+    pocket_send_sqs_messages("url", [big] * 5, max_workers=4)
+    # 256 KB に収まる 2 件ずつに分かれる
+    assert sorted(len(b) for b in fake.batches) == [1, 2, 2]
+
+
+def test_failed_entries_are_retried(monkeypatch):
+    fake = CountingSqs(fail_times=2)
+    monkeypatch.setattr(django_utils, "_get_sqs_client", lambda: fake)
+    monkeypatch.setattr(django_utils.time, "sleep", lambda s: None)
+    pocket_send_sqs_messages("url", ["a", "b", "c"])
+    assert [len(b) for b in fake.batches] == [3, 1, 1]
+
+
+def test_sender_fault_is_not_retried(monkeypatch):
+    fake = CountingSqs(fail_times=1, sender_fault=True)
+    monkeypatch.setattr(django_utils, "_get_sqs_client", lambda: fake)
+    with pytest.raises(SqsBatchSendError, match="InvalidMessageContents") as exc:
+        pocket_send_sqs_messages("url", ["a", "b"])
+    assert [body for body, _ in exc.value.failed] == ["a"]
+    assert len(fake.batches) == 1
+
+
+def test_direct_mode_calls_commands(monkeypatch):
+    monkeypatch.delenv("POCKET_SQSMANAGEMENT_QUEUEURL", raising=False)
+    called = []
+    monkeypatch.setattr(
+        django_utils, "call_command", lambda *a, **kw: called.append((a, kw))
+    )
+    pocket_call_command_many([{"command": "a"}, {"command": "b", "kwargs": {"x": 1}}])
+    assert called == [(("a",), {}), (("b",), {"x": 1})]
+
+
+def test_buffer_flushes_once_on_exit(monkeypatch):
+    sent = []
+    monkeypatch.setattr(
+        command_buffer,
+        "pocket_call_command_many",
+        lambda calls, queue_key, max_workers: sent.append((queue_key, calls)),
+    )
+    with open_buffer():
+        for i in range(3):
+            buffer_call_command("notify", [i], on_commit=False)
+        buffer_call_command("other", queue_key="mail", on_commit=False)
+        assert sent == []
+    assert sent == [
+        (
+            "sqsmanagement",
+            [{"command": "notify", "args": [i], "kwargs": {}} for i in range(3)],
+        ),
+        ("mail", [{"command": "other", "args": [], "kwargs": {}}]),
+    ]
+
+
+def test_buffer_is_dropped_on_exception(monkeypatch):
+    sent = []
+    monkeypatch.setattr(
+        command_buffer, "pocket_call_command_many", lambda *a, **kw: sent.append(a)
+    )
+    with pytest.raises(RuntimeError), open_buffer():
+        buffer_call_command("notify", on_commit=False)
+        raise RuntimeError
+    assert sent == []
+
+
+def test_on_commit_and_no_buffer(monkeypatch):
+    callbacks = []
+    direct = []
+    monkeypatch.setattr(command_buffer.transaction, "on_commit", callbacks.append)
+    monkeypatch.setattr(
+        command_buffer,
+        "pocket_call_command",
+        lambda *a, **kw: direct.append(a),
+    )
+    buffer_call_command("notify", ["x"])
+    assert direct == []
+    # buffer の外で commit された command は即座に送る
+    callbacks.pop()()
+    assert direct == [("notify", ["x"], None)]
+
+
+@pytest.fixture
+def rf():
+    from django.conf import settings as dj_settings
+
+    if not dj_settings.configured:
+        dj_settings.configure(DATABASES={}, INSTALLED_APPS=[])
+    from django.test import RequestFactory
+
+    return RequestFactory()
+
+
+@pytest.mark.parametrize(("status", "expected"), [(200, 1), (500, 0)])
+def test_middleware(monkeypatch, rf, status, expected):
+    sent = []
+    monkeypatch.setattr(
+        command_buffer, "pocket_call_command_many", lambda *a, **kw: sent.append(a)
+    )
+
+    def view(request):
+        buffer_call_command("notify", on_commit=False)
+        return HttpResponse(status=status)
+
+    response = CommandBufferMiddleware(view)(rf.get("/"))
+    assert response.status_code == status
+    assert len(sent) == expected
+
+
+@pytest.mark.parametrize(
+    ("error", "code"),
+    [
+        (SqsBatchSendError([("body", {"Code": "InternalError"})]), "InternalError"),
+        (
+            EndpointConnectionError(endpoint_url="https://sqs.example.com"),
+            "EndpointConnectionError",
+        ),
+    ],
+)
+def test_middleware_keeps_response_when_send_fails(
+    monkeypatch, rf, caplog, error, code
+):
+    sent = []
+
+    def send(calls, queue_key, max_workers):
+        if queue_key == "sqsmanagement":
+            raise error
+        sent.append(queue_key)
+
+    monkeypatch.setattr(command_buffer, "pocket_call_command_many", send)
+
+    def view(request):
+        buffer_call_command("notify", on_commit=False)
+        buffer_call_command("other", queue_key="mail", on_commit=False)
+        return HttpResponse()
+
+    response = CommandBufferMiddleware(view)(rf.get("/orders/"))
+    assert response.status_code == 200
+    # 失敗した queue の後の queue も送る
+    assert sent == ["mail"]
+    assert f"1 message(s) could not be sent: {code} (path=/orders/)" in caplog.text
@@ -7,10 +7,18 @@ crash した record だけを batchItemFailures で報告する partial batch re
 
 import json
 import sys
+import threading
+import time
+from types import SimpleNamespace
 
 import pytest
 
-from pocket.command_handler import BaseCommandHandler
+from pocket.command_handler import (
+    BaseCommandHandler,
+    cancel_requested,
+    module_callable,
+)
+from pocket.context import SqsClaimCheckContext
 
 
 class RecordingHandler(BaseCommandHandler):
@@ -124,3 +132,366 @@ def test_all_success_returns_empty_batch_item_failures():
     handler = RecordingHandler([sys.executable, "-c", "print('ok')"])
     response = handler(_sqs_event({"job_id": "j4"}), None)
     assert response == {"batchItemFailures": []}
+
+
+class InProcessHandler(RecordingHandler):
+    """build_callable で job を in-process に実行する handler."""
+
+    def __init__(self, func, timeout=None):
+        super().__init__([])
+        self._func = func
+        self.in_process_timeout = timeout
+
+    def build_argv(self, spec):
+        raise AssertionError("subprocess must not be used")
+
+    def build_callable(self, spec):
+        return self._func
+
+
+def _outputs(handler):
+    return [e[1] for e in handler.events if e[0] == "output"]
+
+
+@pytest.mark.parametrize("timeout", [None, 5.0])
+def test_in_process_captures_stdout_and_stderr(timeout):
+    def job():
+        print("hello")
+        sys.stdout.write("partial ")
+        sys.stdout.write("line\nlast")
+        print("oops", file=sys.stderr)
+
+    stdout = sys.stdout
+    handler = InProcessHandler(job, timeout=timeout)
+    handler(_sqs_event({"job_id": "j5"}), None)
+    assert _outputs(handler) == ["hello", "partial line", "lastoops"]
+    assert ("finish", 0) in handler.events
+    assert sys.stdout is stdout
+
+
+def test_in_process_on_output_print_is_not_captured(capsys):
+    """既定の on_output (print) が捕捉に戻って再帰しない."""
+
+    class PrintingHandler(InProcessHandler):
+        on_output = BaseCommandHandler.on_output
+
+    handler = PrintingHandler(lambda: print("from job"))
+    handler(_sqs_event({"job_id": "j6"}), None)
+    assert "from job\n" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    ("job", "exit_code"),
+    [
+        (lambda: 3, 3),
+        (lambda: sys.exit(2), 2),
+        (lambda: sys.exit(), 0),
+        (lambda: 1 / 0, 1),
+    ],
+)
+def test_in_process_exit_codes(job, exit_code):
+    """job の返り値 / SystemExit / 例外は subprocess と同じ exit code になる."""
+    handler = InProcessHandler(job)
+    assert handler(_sqs_event({"job_id": "j7"}), None) == {"batchItemFailures": []}
+    assert ("finish", exit_code) in handler.events
+    if exit_code == 1:
+        assert "ZeroDivisionError: division by zero" in _outputs(handler)
+
+
+def test_in_process_timeout_is_a_crash():
+    release = threading.Event()
+
+    def job():
+        print("started")
+        release.wait(5)
+
+    handler = InProcessHandler(job, timeout=0.2)
+    response = handler(_sqs_event({"job_id": "j8"}, message_id="m8"), None)
+    release.set()
+    assert response == {"batchItemFailures": [{"itemIdentifier": "m8"}]}
+    assert _outputs(handler) == ["started"]
+    assert ("crash", "TimeoutError") in handler.events
+
+
+def test_output_after_in_process_timeout_goes_to_stdout(capsys):
+    release = threading.Event()
+    finished = threading.Event()
+
+    def job():
+        release.wait(5)
+        print("late")
+        finished.set()
+
+    stdout = sys.stdout
+    handler = InProcessHandler(job, timeout=0.1)
+    handler(_sqs_event({"job_id": "j8"}), None)
+    # 見捨てた job が動いている間は差し替えたまま、終われば元に戻る
+    assert sys.stdout is not stdout
+    release.set()
+    assert finished.wait(5)
+    for _ in range(100):
+        if sys.stdout is stdout:
+            break
+        time.sleep(0.01)
+    assert sys.stdout is stdout
+    assert "late\n" in capsys.readouterr().out
+    assert _outputs(handler) == []
+
+
+def test_handler_without_job_is_rejected_at_instantiation():
+    class NoJob(BaseCommandHandler):
+        pass
+
+    with pytest.raises(TypeError, match="must implement build_argv or build_callable"):
+        NoJob()
+
+
+def test_module_callable_runs_module_as_main(tmp_path, monkeypatch):
+    (tmp_path / "pocket_test_job.py").write_text(
+        "import sys\n"
+        "if __name__ == '__main__':\n"
+        "    print('args', sys.argv[1:])\n"
+        "    sys.exit(4)\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    argv = sys.argv
+    handler = InProcessHandler(module_callable("pocket_test_job", ["a", "b"]))
+    handler(_sqs_event({"job_id": "j9"}), None)
+    assert _outputs(handler) == ["args ['a', 'b']"]
+    assert ("finish", 4) in handler.events
+    assert sys.argv is argv
+
+
+QUEUE_ARN = "arn:aws:sqs:ap-northeast-1:123456789012:dev-testprj-main-worker"
+QUEUE_URL = (
+    "https://sqs.ap-northeast-1.amazonaws.com/123456789012/dev-testprj-main-worker"
+)
+
+
+class FakeSqs:
+    def __init__(self):
+        self.calls: list[tuple[str, dict]] = []
+
+    def change_message_visibility_batch(self, **kwargs):
+        self.calls.append(("visibility", kwargs))
+
+    def send_message(self, **kwargs):
+        self.calls.append(("send", kwargs))
+
+
+@pytest.fixture
+def fake_sqs(monkeypatch):
+    fake = FakeSqs()
+    monkeypatch.setattr(
+        "pocket.command_handler.aws_clients.client", lambda *a, **kw: fake
+    )
+    return fake
+
+
+class LambdaContext:
+    def __init__(self, remaining_seconds):
+        self.end = time.monotonic() + remaining_seconds
+
+    def get_remaining_time_in_millis(self):
+        return int((self.end - time.monotonic()) * 1000)
+
+
+def _queue_event(*specs):
+    return {
+        "Records": [
+            {
+                **_record(spec, f"m{i}"),
+                "receiptHandle": f"rh{i}",
+                "eventSourceARN": QUEUE_ARN,
+            }
+            for i, spec in enumerate(specs)
+        ]
+    }
+
+
+class TimeoutHandler(RecordingHandler):
+    timeout_margin = 1.0
+    terminate_grace = 1.0
+
+    def __init__(self, argv, continuation=None):
+        super().__init__(argv)
+        self.continuation = continuation
+
+    def on_timeout(self, spec):
+        self.events.append(("timeout",))
+        return self.continuation
+
+
+def test_heartbeat_extends_visibility_of_whole_batch(fake_sqs):
+    handler = InProcessHandler(lambda: time.sleep(0.3))
+    handler.heartbeat_interval = 0.05
+    handler.heartbeat_visibility_timeout = 60
+    handler(_queue_event({"job_id": "a"}, {"job_id": "b"}), None)
+    beats = [kw for name, kw in fake_sqs.calls if name == "visibility"]
+    assert len(beats) >= 2
+    assert beats[0]["QueueUrl"] == QUEUE_URL
+    entries = beats[0]["Entries"]
+    assert [(e["ReceiptHandle"], e["VisibilityTimeout"]) for e in entries] == [
+        ("rh0", 60),
+        ("rh1", 60),
+    ]
+
+
+def test_heartbeat_releases_failed_records(fake_sqs):
+    class FailingFirst(InProcessHandler):
+        def build_callable(self, spec):
+            if spec["job_id"] == "bad":
+                time.sleep(0.15)
+                raise ValueError("bad spec")
+            return self._func
+
+    handler = FailingFirst(lambda: time.sleep(0.3))
+    handler.heartbeat_interval = 0.05
+    handler.heartbeat_visibility_timeout = 60
+    result = handler(_queue_event({"job_id": "bad"}, {"job_id": "ok"}), None)
+    assert result == {"batchItemFailures": [{"itemIdentifier": "m0"}]}
+    beats = [
+        [(e["ReceiptHandle"], e["VisibilityTimeout"]) for e in kw["Entries"]]
+        for name, kw in fake_sqs.calls
+        if name == "visibility"
+    ]
+    assert beats[0] == [("rh0", 60), ("rh1", 60)]
+    # 失敗した後は処理中の record だけを延ばし、最後に失敗した record を戻す
+    assert [("rh1", 60)] in beats
+    assert beats.index([("rh1", 60)]) > 0
+    assert beats[-1] == [("rh0", 0)]
+    assert [("rh0", 60), ("rh1", 60)] not in beats[beats.index([("rh1", 60)]) :]
+
+
+def test_heartbeat_is_off_by_default(fake_sqs):
+    InProcessHandler(lambda: time.sleep(0.1))(_queue_event({"job_id": "a"}), None)
+    assert fake_sqs.calls == []
+
+
+SLEEPER = (
+    "import signal, sys, time\n"
+    "def stop(*_):\n"
+    "    print('checkpoint'); sys.exit(0)\n"
+    "signal.signal(signal.SIGTERM, stop)\n"
+    "print('started')\n"
+    "time.sleep(30)\n"
+)
+
+
+def test_deadline_terminates_subprocess_and_enqueues_continuation(fake_sqs):
+    handler = TimeoutHandler(
+        [sys.executable, "-c", SLEEPER], continuation={"job_id": "j", "resume": 1}
+    )
+    start = time.monotonic()
+    response = handler(_queue_event({"job_id": "j"}), LambdaContext(1.5))
+    assert time.monotonic() - start < 5
+    assert response == {"batchItemFailures": []}
+    assert _outputs(handler) == ["started", "checkpoint"]
+    assert ("timeout",) in handler.events
+    assert not any(e[0] in ("finish", "crash") for e in handler.events)
+    assert fake_sqs.calls == [
+        ("send", {"QueueUrl": QUEUE_URL, "MessageBody": '{"job_id": "j", "resume": 1}'})
+    ]
+
+
+def test_deadline_without_continuation_redelivers_remaining_records(fake_sqs):
+    handler = TimeoutHandler([sys.executable, "-c", SLEEPER])
+    response = handler(
+        _queue_event({"job_id": "a"}, {"job_id": "b"}), LambdaContext(1.5)
+    )
+    # 止めた record も始めていない record も再配信させる
+    assert response == {
+        "batchItemFailures": [{"itemIdentifier": "m0"}, {"itemIdentifier": "m1"}]
+    }
+    assert handler.events.count(("start",)) == 1
+    assert fake_sqs.calls == []
+
+
+class InProcessTimeoutHandler(InProcessHandler, TimeoutHandler):
+    pass
+
+
+def test_deadline_cancels_in_process_job(fake_sqs):
+    def job():
+        print("started")
+        while not cancel_requested():
+            time.sleep(0.01)
+        print("checkpoint")
+
+    handler = InProcessTimeoutHandler(job)
+    handler.continuation = {"job_id": "j", "resume": 1}
+    response = handler(_queue_event({"job_id": "j"}), LambdaContext(1.2))
+    assert response == {"batchItemFailures": []}
+    assert _outputs(handler) == ["started", "checkpoint"]
+    assert ("timeout",) in handler.events
+    assert [name for name, _ in fake_sqs.calls] == ["send"]
+    assert not cancel_requested()
+
+
+def test_deadline_does_not_continue_in_process_job_that_keeps_running(fake_sqs):
+    release = threading.Event()
+    handler = InProcessTimeoutHandler(lambda: release.wait(5))
+    handler.terminate_grace = 0.2
+    handler.continuation = {"job_id": "j", "resume": 1}
+    response = handler(_queue_event({"job_id": "j"}), LambdaContext(1.2))
+    release.set()
+    # 止まらない job の続きは出さず、crash として再配信させる
+    assert response == {"batchItemFailures": [{"itemIdentifier": "m0"}]}
+    assert ("crash", "TimeoutError") in handler.events
+    assert ("timeout",) not in handler.events
+    assert fake_sqs.calls == []
+
+
+def test_continuation_uses_claim_check_and_fifo_group(fake_sqs, monkeypatch):
+    claim_check = SqsClaimCheckContext(
+        bucket_name="bucket",
+        region="ap-northeast-1",
+        prefix="pocket/sqs-claim-check/",
+        threshold=10,
+        expiration_days=15,
+    )
+    offloaded = []
+
+    def offload(body, **kwargs):
+        offloaded.append((body, kwargs))
+        return "pointer"
+
+    monkeypatch.setattr("pocket.command_handler.offload_body", offload)
+    handler = TimeoutHandler([], continuation={"job_id": "j", "resume": 1})
+    monkeypatch.setattr(handler, "_claim_check", lambda arn: claim_check)
+    record = {
+        **_record({"job_id": "j"}, "m1"),
+        "eventSourceARN": QUEUE_ARN + ".fifo",
+        "attributes": {"MessageGroupId": "g1"},
+    }
+    handler._enqueue_continuation(record, {"job_id": "j", "resume": 1})
+    assert offloaded[0][1]["bucket_name"] == "bucket"
+    assert fake_sqs.calls == [
+        (
+            "send",
+            {
+                "QueueUrl": QUEUE_URL + ".fifo",
+                "MessageBody": "pointer",
+                "MessageGroupId": "g1",
+                "MessageDeduplicationId": "m1",
+            },
+        )
+    ]
+
+
+def test_claim_check_is_resolved_from_queue_name(monkeypatch):
+    from pocket import runtime
+
+    sqs = SimpleNamespace(name="dev-testprj-main-worker", claim_check="cc")
+    context = SimpleNamespace(
+        container={
+            "main": SimpleNamespace(handlers={"worker": SimpleNamespace(sqs=sqs)})
+        }
+    )
+    monkeypatch.setattr(runtime, "get_context", lambda stage: context)
+    monkeypatch.setenv("POCKET_STAGE", "dev")
+    handler = RecordingHandler([])
+    assert handler._claim_check(QUEUE_ARN) == "cc"
+    assert handler._claim_check(QUEUE_ARN.replace("worker", "other")) is None
+    monkeypatch.delenv("POCKET_STAGE")
+    assert handler._claim_check(QUEUE_ARN) is None
@@ -0,0 +1,164 @@
+"""S3 に出力を逐次書き出す sink (pocket.command_output) のテスト。"""
+
+from __future__ import annotations
+
+import json
+import sys
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from pocket.command_output import CommandOutput, S3OutputCommandHandler
+
+BUCKET = "dev-testprj-pocket"
+PREFIX = "pocket/command-output/"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    with mock_aws():
+        monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+class Handler(S3OutputCommandHandler):
+    bucket_name = BUCKET
+    throttle = 3600.0  # 最初の行以外は throttle で flush されない
+
+    def __init__(self, func=None, argv: list[str] | None = None):
+        self.func = func
+        self.argv = argv
+
+    def build_argv(self, spec) -> list[str]:
+        if self.argv is None:
+            return super().build_argv(spec)
+        return self.argv
+
+    def build_callable(self, spec):
+        return self.func
+
+
+def _event(job_id="job1"):
+    return {"Records": [{"body": json.dumps({"job_id": job_id}), "messageId": "m1"}]}
+
+
+def _output(job_id="job1"):
+    return CommandOutput(BUCKET, PREFIX, job_id)
+
+
+def test_output_is_written_as_parts_and_status(s3):
+    handler = Handler(argv=[sys.executable, "-c", "print('a'); print('b')"])
+    handler(_event(), None)
+    output = _output()
+    status = output.status()
+    assert status is not None
+    assert status["status"] == "succeeded"
+    assert status["exit_code"] == 0
+    assert status["tail"] == ["a", "b"]
+    # 1 行目は throttle の初回で flush され、残りは on_finish で書かれる
+    assert status["parts"] == 2
+    text, after = output.tail()
+    assert text == "a\nb\n"
+    assert after == 2
+    assert output.tail(after) == ("", 2)
+
+
+def test_large_output_is_chunked_with_bounded_tail(s3):
+    def job():
+        for i in range(1000):
+            print(f"line {i:04d} " + "x" * 90)
+
+    handler = Handler(job)
+    handler.max_chunk_bytes = 10 * 1024
+    handler.tail_lines = 5
+    handler(_event(), None)
+    output = _output()
+    status = output.status()
+    assert status is not None
+    assert status["parts"] > 5
+    assert status["bytes"] == 1000 * 101
+    assert status["tail"][0].startswith("line 0995 ")
+    assert len(status["tail"]) == 5
+    text, _ = output.tail()
+    assert text.splitlines()[500].startswith("line 0500 ")
+    # 1 part あたりの大きさは max_chunk_bytes 程度に収まる
+    for obj in s3.list_objects_v2(Bucket=BUCKET, Prefix=PREFIX + "job1/output/")[
+        "Contents"
+    ]:
+        assert obj["Size"] <= 10 * 1024 + 101
+
+
+def test_tail_while_running(s3):
+    reads = []
+
+    def job():
+        print("first")
+        reads.append(_output().tail())
+        print("second")
+
+    handler = Handler(job)
+    handler.throttle = 0.0
+    handler(_event(), None)
+    assert reads == [("first\n", 1)]
+    assert _output().tail(1) == ("second\n", 2)
+
+
+@pytest.mark.parametrize(
+    ("func", "status"),
+    [(lambda: 3, "failed"), (None, "crashed")],
+)
+def test_failure_status(s3, func, status):
+    class Crashing(Handler):
+        def build_argv(self, spec):
+            raise ValueError("bad spec")
+
+    handler = Crashing(func)
+    handler(_event(), None)
+    document = _output().status()
+    assert document is not None
+    assert document["status"] == status
+    if status == "crashed":
+        assert document["error"] == "ValueError: bad spec"
+
+
+def test_invalid_job_id_is_rejected(s3):
+    handler = Handler(lambda: None)
+    assert handler(_event("a/b"), None) == {
+        "batchItemFailures": [{"itemIdentifier": "m1"}]
+    }
+    assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET)
+
+
+def test_status_is_none_before_start(s3):
+    assert _output("missing").status() is None
+    assert _output("missing").tail() == ("", 0)
+
+
+def test_redelivered_job_continues_after_previous_parts(s3):
+    """同じ job_id の再配信は前回の part を上書きせず、続きの番号に書く。"""
+    attempts = []
+
+    def job():
+        attempts.append(None)
+        print(f"attempt {len(attempts)}")
+        # 1 回目は失敗し、同じ spec が再配信される
+        return 3 if len(attempts) == 1 else 0
+
+    handler = Handler(job)
+    handler(_event(), None)
+    output = _output()
+    first, after = output.tail()
+    assert first == "attempt 1\n"
+
+    handler(_event(), None)
+    status = output.status()
+    assert status is not None
+    assert status["status"] == "succeeded"
+    assert status["attempt"] == 2
+    assert status["tail"] == ["attempt 1", "attempt 2"]
+    # 前回の part はそのまま残り、前回の続きから新しい出力だけを読める
+    assert output.tail() == ("attempt 1\nattempt 2\n", status["parts"])
+    assert output.tail(after) == ("attempt 2\n", status["parts"])
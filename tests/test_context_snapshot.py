@@ -0,0 +1,82 @@
+"""検証済み Context の snapshot (pocket.context_snapshot) のテスト。"""
+
+import shutil
+
+import pytest
+
+from pocket import runtime
+from pocket.context import Context
+from pocket.context_snapshot import load_context_snapshot, write_context_snapshot
+
+
+@pytest.fixture
+def runtime_toml(tmp_path, use_toml, monkeypatch):
+    """default.toml を pocket.runtime.toml として置き、snapshot を生成する"""
+    for key in ("DEPLOY_HASH", "NEON_API_KEY", "POCKET_PERMISSIONS_BOUNDARY_ARN"):
+        monkeypatch.delenv(key, raising=False)
+    path = tmp_path / "pocket.runtime.toml"
+    shutil.copy("tests/data/toml/default.toml", path)
+    use_toml(str(path))
+    write_context_snapshot(path)
+    return path
+
+
+def test_snapshot_matches_normal_context(runtime_toml):
+    snapshot = load_context_snapshot(runtime_toml, "dev")
+    assert snapshot is not None
+    assert snapshot == Context.from_toml(stage="dev")
+
+
+def test_get_context_skips_validation_with_snapshot(runtime_toml, monkeypatch):
+    def _fail(cls, *, stage):
+        raise AssertionError("pocket.toml must not be re-validated")
+
+    monkeypatch.setattr(Context, "from_toml", classmethod(_fail))
+    assert runtime.get_context("dev").stage == "dev"
+
+
+def test_snapshot_falls_back_when_toml_changes(runtime_toml):
+    runtime_toml.write_text(runtime_toml.read_text() + "\n# edited\n")
+    assert load_context_snapshot(runtime_toml, "dev") is None
+
+
+def test_snapshot_falls_back_for_unknown_stage(runtime_toml):
+    assert load_context_snapshot(runtime_toml, "prd") is None
+
+
+def test_snapshot_does_not_bake_credentials(tmp_path, use_toml, monkeypatch):
+    """.env / 環境変数の credential は snapshot に焼かず、runtime で設定されていれば
+    snapshot を使わない (通常の構築と結果が変わるため)。"""
+    monkeypatch.delenv("DEPLOY_HASH", raising=False)
+    monkeypatch.setenv("NEON_API_KEY", "secret-key")
+    path = tmp_path / "pocket.runtime.toml"
+    shutil.copy("tests/data/toml/default.toml", path)
+    use_toml(str(path))
+    write_context_snapshot(path)
+
+    assert (
+        b"secret-key" not in (tmp_path / "pocket.runtime.context.pickle").read_bytes()
+    )
+    assert load_context_snapshot(path, "dev") is None
+    monkeypatch.delenv("NEON_API_KEY")
+    snapshot = load_context_snapshot(path, "dev")
+    assert snapshot is not None
+    assert snapshot.neon is not None
+    assert snapshot.neon.api_key is None
+
+
+def test_snapshot_checks_deploy_hash(tmp_path, use_toml, monkeypatch):
+    monkeypatch.setenv("DEPLOY_HASH", "53e8c22")
+    path = tmp_path / "pocket.runtime.toml"
+    shutil.copy("tests/data/toml/cloudfront_deploy_hash.toml", path)
+    use_toml(str(path))
+    write_context_snapshot(path)
+
+    assert load_context_snapshot(path, "dev") is not None
+    monkeypatch.setenv("DEPLOY_HASH", "91bae0c")
+    assert load_context_snapshot(path, "dev") is None
+
+
+def test_broken_snapshot_is_ignored(runtime_toml):
+    (runtime_toml.parent / "pocket.runtime.context.pickle").write_bytes(b"broken")
+    assert load_context_snapshot(runtime_toml, "dev") is None
@@ -107,3 +107,47 @@ def test_post_deploy_noop_without_deploy_hash(use_toml, monkeypatch):
         ac.ensure_post_deploy_state()
 
     assert client._updates == []
+
+
+def test_post_deploy_syncs_resource_manifest(use_toml, monkeypatch):
+    """mediator 付き (deploy_resources の hook) では discovery manifest も載せる。"""
+    from pocket.runtime import RESOURCE_MANIFEST_ENV
+
+    monkeypatch.setattr("time.sleep", lambda *a, **k: None)
+    client = _fake_lambda_client({"POCKET_STAGE": "dev", "DEPLOY_HASH": "53e8c22"})
+    ac, fake_client = _build_container(use_toml, client, deploy_hash="53e8c22")
+    mediator = mock.MagicMock()
+    mediator.resource_manifest = '{"version":1}'
+
+    with mock.patch("boto3.client", fake_client):
+        ac.ensure_post_deploy_state(mediator)
+
+    assert len(client._updates) == 1
+    new_env = client._updates[0]["Environment"]["Variables"]
+    assert new_env[RESOURCE_MANIFEST_ENV] == '{"version":1}'
+    assert new_env["DEPLOY_HASH"] == "53e8c22"
+
+
+def test_post_deploy_drops_manifest_over_env_limit(use_toml, monkeypatch):
+    """manifest で Lambda env が 4KB を超える場合は載せない (古い manifest も外す)。"""
+    from pocket.runtime import RESOURCE_MANIFEST_ENV
+
+    monkeypatch.setattr("time.sleep", lambda *a, **k: None)
+    client = _fake_lambda_client(
+        {
+            "POCKET_STAGE": "dev",
+            "DEPLOY_HASH": "53e8c22",
+            RESOURCE_MANIFEST_ENV: '{"version":1}',
+        }
+    )
+    ac, fake_client = _build_container(use_toml, client, deploy_hash="53e8c22")
+    mediator = mock.MagicMock()
+    mediator.resource_manifest = "x" * 5000
+
+    with mock.patch("boto3.client", fake_client):
+        ac.ensure_post_deploy_state(mediator)
+
+    assert len(client._updates) == 1
+    new_env = client._updates[0]["Environment"]["Variables"]
+    assert RESOURCE_MANIFEST_ENV not in new_env
+    assert new_env["DEPLOY_HASH"] == "53e8c22"
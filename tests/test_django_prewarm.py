@@ -0,0 +1,129 @@
+"""Lambda INIT 中の Django pre-warm ([container.<name>.django.prewarm])。"""
+
+from __future__ import annotations
+
+import pytest
+
+from pocket.context import Context
+from pocket.django import prewarm as prewarm_module
+from pocket.django.context import DjangoPrewarmContext
+from pocket.django.prewarm import get_prewarm_context, prewarm
+
+
+def _write_toml(tmp_path, prewarm_section: str):
+    toml_path = tmp_path / "pocket.toml"
+    toml_path.write_text(
+        """
+[general]
+region = "ap-southeast-1"
+project_name = "testprj"
+stages = ["dev"]
+
+[container.main]
+dockerfile_path = "Dockerfile"
+
+[container.main.handlers.wsgi]
+command = "pocket.django.lambda_handlers.wsgi_handler"
+
+[container.main.django]
+%s
+"""
+        % prewarm_section
+    )
+    return str(toml_path)
+
+
+def test_prewarm_settings(use_toml, tmp_path):
+    use_toml(
+        _write_toml(
+            tmp_path,
+            '[container.main.django.prewarm]\ntemplates = ["base.html"]\n'
+            'modules = ["myapp.heavy"]\n',
+        )
+    )
+    container = Context.from_toml(stage="dev").container["main"]
+    assert container.django
+    assert container.django.prewarm == DjangoPrewarmContext(
+        urlconf=True, database=True, templates=["base.html"], modules=["myapp.heavy"]
+    )
+
+
+def test_get_prewarm_context(use_toml, tmp_path, monkeypatch):
+    use_toml(_write_toml(tmp_path, "[container.main.django.prewarm]\ndatabase = false"))
+    monkeypatch.setenv("POCKET_STAGE", "dev")
+    config = get_prewarm_context()
+    assert config is not None
+    assert config.database is False
+
+
+def test_get_prewarm_context_not_configured(use_toml, tmp_path, monkeypatch):
+    use_toml(_write_toml(tmp_path, ""))
+    monkeypatch.setenv("POCKET_STAGE", "dev")
+    assert get_prewarm_context() is None
+    monkeypatch.delenv("POCKET_STAGE")
+    assert get_prewarm_context() is None
+
+
+@pytest.fixture
+def recorded_steps(monkeypatch):
+    calls: list[tuple] = []
+    monkeypatch.setattr(
+        prewarm_module, "_import_modules", lambda m: calls.append(("modules", m))
+    )
+    monkeypatch.setattr(
+        prewarm_module, "_resolve_urlconf", lambda: calls.append(("urlconf",))
+    )
+    monkeypatch.setattr(
+        prewarm_module, "_load_templates", lambda t: calls.append(("templates", t))
+    )
+    monkeypatch.setattr(
+        prewarm_module, "_connect_database", lambda: calls.append(("database",))
+    )
+    return calls
+
+
+def test_prewarm_runs_steps_in_order(recorded_steps, capsys):
+    config = DjangoPrewarmContext(
+        urlconf=True, database=True, templates=["base.html"], modules=["a"]
+    )
+    timings = prewarm(config)
+    assert recorded_steps == [
+        ("modules", ["a"]),
+        ("urlconf",),
+        ("templates", ["base.html"]),
+        ("database",),
+    ]
+    assert list(timings) == ["modules", "urlconf", "templates", "database"]
+    assert all(ms is not None and ms >= 0 for ms in timings.values())
+    assert "pocket prewarm: urlconf" in capsys.readouterr().out
+
+
+def test_prewarm_skips_disabled_steps(recorded_steps):
+    config = DjangoPrewarmContext(
+        urlconf=False, database=False, templates=[], modules=[]
+    )
+    assert prewarm(config) == {}
+    assert recorded_steps == []
+
+
+def test_prewarm_failed_step_does_not_stop_others(recorded_steps, monkeypatch, capsys):
+    def broken():
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(prewarm_module, "_connect_database", broken)
+    config = DjangoPrewarmContext(
+        urlconf=True, database=True, templates=[], modules=["missing"]
+    )
+    timings = prewarm(config)
+    assert timings["database"] is None
+    assert timings["urlconf"] is not None
+    assert "database failed" in capsys.readouterr().out
+
+
+def test_import_modules():
+    config = DjangoPrewarmContext(
+        urlconf=False, database=False, templates=[], modules=["json", "no.such.mod"]
+    )
+    assert prewarm(config)["modules"] is None
+    config.modules = ["json"]
+    assert prewarm(config)["modules"] is not None
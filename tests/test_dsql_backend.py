@@ -0,0 +1,133 @@
+"""DSQL の Django backend と IAM トークンの期限管理。"""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from pocket import runtime
+from pocket.django.utils import get_databases
+from pocket.runtime import DSQL_TOKEN_LIFETIME, get_dsql_token
+
+ENDPOINT = "abc.dsql.ap-northeast-1.on.aws"
+
+
+@pytest.fixture
+def dsql_env(monkeypatch):
+    monkeypatch.setenv("POCKET_DSQL_ENDPOINT", ENDPOINT)
+    monkeypatch.setenv("POCKET_DSQL_REGION", "ap-northeast-1")
+    monkeypatch.setenv("POCKET_DSQL_TOKEN", "")
+    issued: list[str] = []
+
+    class FakeDsqlClient:
+        def generate_db_connect_admin_auth_token(self, endpoint, region):
+            issued.append("token-%d" % len(issued))
+            return issued[-1]
+
+    monkeypatch.setattr("boto3.client", lambda *a, **k: FakeDsqlClient())
+    return issued
+
+
+def test_get_dsql_token_reuses_valid_token(dsql_env):
+    assert get_dsql_token() == "token-0"
+    assert get_dsql_token() == "token-0"
+    assert dsql_env == ["token-0"]
+    assert os.environ["POCKET_DSQL_TOKEN"] == "token-0"
+
+
+def test_get_dsql_token_regenerates_near_expiry(dsql_env, monkeypatch):
+    get_dsql_token()
+    monkeypatch.setattr(
+        runtime, "_dsql_token_issued_at", runtime.time.monotonic() - DSQL_TOKEN_LIFETIME
+    )
+    assert get_dsql_token() == "token-1"
+    assert os.environ["POCKET_DSQL_TOKEN"] == "token-1"
+
+
+def test_get_dsql_token_regenerates_token_of_unknown_age(dsql_env, monkeypatch):
+    # 生成時刻が分からない (プロセス外でセットされた) トークンは信用しない
+    monkeypatch.setenv("POCKET_DSQL_TOKEN", "inherited")
+    assert get_dsql_token() == "token-0"
+
+
+def test_get_dsql_token_without_dsql(monkeypatch):
+    monkeypatch.delenv("POCKET_DSQL_ENDPOINT", raising=False)
+    monkeypatch.delenv("POCKET_DSQL_REGION", raising=False)
+    assert get_dsql_token() is None
+
+
+def _write_toml(tmp_path):
+    toml_path = tmp_path / "pocket.toml"
+    toml_path.write_text(
+        """
+[general]
+region = "ap-northeast-1"
+project_name = "testprj"
+stages = ["dev"]
+
+[dsql]
+"""
+    )
+    return str(toml_path)
+
+
+def test_get_databases_selects_dsql_backend(dsql_env, use_toml, tmp_path, monkeypatch):
+    use_toml(_write_toml(tmp_path))
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.setenv("POCKET_DSQL_TOKEN", "cold-start-token")
+    db = get_databases(stage="dev")["default"]
+    assert db["ENGINE"] == "pocket.django.db_backends.dsql"
+    assert db["HOST"] == ENDPOINT
+    assert db["USER"] == "admin"
+    assert db["NAME"] == "postgres"
+    assert db["PASSWORD"] == "cold-start-token"
+    assert db["OPTIONS"] == {"sslmode": "require"}
+
+
+def test_get_databases_prefers_database_url_over_dsql(
+    dsql_env, use_toml, tmp_path, monkeypatch
+):
+    # [dsql] と [neon] 等を併用した stage では DATABASE_URL の DB が default
+    use_toml(_write_toml(tmp_path))
+    monkeypatch.setenv("DATABASE_URL", "postgres://u:p@db.example.com:5432/app")
+    db = get_databases(stage="dev")["default"]
+    assert db["ENGINE"] == "django.db.backends.postgresql"
+    assert db["HOST"] == "db.example.com"
+    assert db["NAME"] == "app"
+
+
+def test_get_databases_without_dsql_endpoint_is_unchanged(
+    use_toml, tmp_path, monkeypatch
+):
+    use_toml(_write_toml(tmp_path))
+    monkeypatch.delenv("POCKET_DSQL_ENDPOINT", raising=False)
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    db = get_databases(stage="dev")["default"]
+    assert db["ENGINE"] == "django.db.backends.sqlite3"
+
+
+def test_dsql_backend_injects_fresh_token(dsql_env, monkeypatch):
+    pytest.importorskip("psycopg")
+    import django
+    from django.conf import settings as dj_settings
+
+    if not dj_settings.configured:
+        dj_settings.configure(DATABASES={}, INSTALLED_APPS=[])
+        django.setup()
+
+    from django.db.backends.postgresql.base import DatabaseWrapper as Pg
+    from django.db.utils import load_backend
+
+    mod = load_backend("pocket.django.db_backends.dsql")
+    assert issubclass(mod.DatabaseWrapper, Pg)
+
+    connected: list[dict] = []
+    monkeypatch.setattr(
+        Pg, "get_new_connection", lambda self, params: connected.append(params)
+    )
+    wrapper = mod.DatabaseWrapper({}, alias="default")
+    wrapper.get_new_connection({"host": ENDPOINT, "password": "stale"})
+    wrapper.get_new_connection({"host": ENDPOINT, "password": "stale"})
+    assert [p["password"] for p in connected] == ["token-0", "token-0"]
+    assert dsql_env == ["token-0"]
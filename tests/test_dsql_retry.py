@@ -0,0 +1,216 @@
+"""DSQL の OCC 競合の再試行 (decorator / middleware)。"""
+
+from __future__ import annotations
+
+import contextlib
+from types import SimpleNamespace
+
+import pytest
+
+from pocket.django.db_backends.dsql import retry
+from pocket.django.db_backends.dsql.retry import (
+    DsqlRetryMiddleware,
+    is_conflict_error,
+    retry_on_conflict,
+    retry_stats,
+    run_with_retry,
+)
+
+
+class FakeDbError(Exception):
+    def __init__(self, msg="", sqlstate=None):
+        super().__init__(msg)
+        self.sqlstate = sqlstate
+
+
+def _conflict():
+    return FakeDbError(
+        "change conflicts with another transaction, please retry: (OC000)",
+        sqlstate="40001",
+    )
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    retry.reset_retry_stats()
+    sleeps: list[float] = []
+    monkeypatch.setattr(retry.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def test_is_conflict_error():
+    assert is_conflict_error(FakeDbError("x", sqlstate="40001"))
+    assert is_conflict_error(Exception("schema has been updated (OC001)"))
+    wrapped = Exception("django wrapped")
+    wrapped.__cause__ = _conflict()
+    assert is_conflict_error(wrapped)
+    assert not is_conflict_error(FakeDbError("dup", sqlstate="23505"))
+    assert not is_conflict_error(None)
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        # 値や識別子に競合コードと同じ文字列を含むだけの失敗
+        'duplicate key value violates unique constraint "code_key"\n'
+        "DETAIL:  Key (code)=(OC000) already exists.",
+        'column "oc001_flag" does not exist',
+        "relation OC0001 does not exist",
+    ],
+)
+def test_codes_inside_values_are_not_conflicts(message):
+    assert not is_conflict_error(Exception(message))
+
+
+def test_sqlstate_wins_over_message():
+    assert not is_conflict_error(FakeDbError("bad value (OC000)", sqlstate="22P02"))
+
+
+def test_run_with_retry_succeeds_after_conflicts(no_sleep):
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) < 3:
+            raise _conflict()
+        return "ok"
+
+    assert run_with_retry(func, attempts=3, base_delay=0.1, max_delay=0.15) == "ok"
+    assert len(calls) == 3
+    assert len(no_sleep) == 2
+    assert all(0 <= d <= 0.15 for d in no_sleep)
+    assert retry_stats() == {"conflicts": 2, "retries": 2, "exhausted": 0}
+
+
+def test_run_with_retry_gives_up_after_attempts():
+    def func():
+        raise _conflict()
+
+    with pytest.raises(FakeDbError):
+        run_with_retry(func, attempts=2)
+    assert retry_stats() == {"conflicts": 2, "retries": 1, "exhausted": 1}
+
+
+def test_run_with_retry_does_not_retry_other_errors():
+    calls = []
+
+    def func():
+        calls.append(1)
+        raise FakeDbError("dup", sqlstate="23505")
+
+    with pytest.raises(FakeDbError):
+        run_with_retry(func)
+    assert len(calls) == 1
+    assert retry_stats()["conflicts"] == 0
+
+
+@pytest.fixture
+def fake_transaction(monkeypatch):
+    from django.db import transaction
+
+    state = SimpleNamespace(in_atomic_block=False, atomics=0)
+
+    @contextlib.contextmanager
+    def atomic(using=None):
+        state.atomics += 1
+        yield
+
+    monkeypatch.setattr(transaction, "atomic", atomic)
+    monkeypatch.setattr(transaction, "get_connection", lambda using=None: state)
+    return state
+
+
+def test_retry_on_conflict_reruns_in_new_atomic(fake_transaction):
+    calls = []
+
+    @retry_on_conflict(attempts=3)
+    def write(value):
+        calls.append(value)
+        if len(calls) == 1:
+            raise _conflict()
+        return value
+
+    assert write("v") == "v"
+    assert calls == ["v", "v"]
+    assert fake_transaction.atomics == 2
+
+
+def test_retry_on_conflict_inside_atomic_block_does_not_retry(fake_transaction):
+    fake_transaction.in_atomic_block = True
+
+    @retry_on_conflict
+    def write():
+        raise _conflict()
+
+    with pytest.raises(FakeDbError):
+        write()
+    assert fake_transaction.atomics == 1
+
+
+@pytest.fixture
+def rf():
+    from django.conf import settings as dj_settings
+
+    if not dj_settings.configured:
+        dj_settings.configure(DATABASES={}, INSTALLED_APPS=[])
+    from django.test import RequestFactory
+
+    return RequestFactory()
+
+
+def test_middleware_reruns_conflicted_request(rf):
+    from django.http import HttpResponse
+
+    ok = HttpResponse()
+    handled = []
+
+    def get_response(req):
+        # Django の handler は view の例外で process_exception を呼び、response が
+        # 返らなければ 500 を log して返す
+        if not handled:
+            placeholder = middleware.process_exception(req, _conflict())
+            handled.append(placeholder)
+            assert placeholder is not None
+            return placeholder
+        return ok
+
+    middleware = DsqlRetryMiddleware(get_response)
+    assert middleware(rf.get("/")) is ok
+    # 再実行する競合は仮の response で握り、Django に 500 として報告させない
+    assert handled[0].status_code == 500
+    assert retry_stats() == {"conflicts": 1, "retries": 1, "exhausted": 0}
+
+
+def test_middleware_returns_last_response_when_exhausted(rf):
+    from django.http import HttpResponseServerError
+
+    failed = HttpResponseServerError()
+    handled = []
+
+    def get_response(req):
+        handled.append(middleware.process_exception(req, _conflict()))
+        return failed
+
+    middleware = DsqlRetryMiddleware(get_response)
+    assert middleware(rf.get("/")) is failed
+    assert len(handled) == DsqlRetryMiddleware.attempts
+    # 最後の試行の競合だけは Django の例外処理 (log / signal) に任せる
+    assert all(r is not None for r in handled[:-1])
+    assert handled[-1] is None
+    assert retry_stats()["exhausted"] == 1
+
+
+def test_middleware_ignores_other_errors(rf):
+    from django.http import HttpResponseServerError
+
+    failed = HttpResponseServerError()
+    calls = []
+
+    def get_response(req):
+        calls.append(1)
+        assert middleware.process_exception(req, ValueError("boom")) is None
+        return failed
+
+    middleware = DsqlRetryMiddleware(get_response)
+    assert middleware(rf.get("/")) is failed
+    assert len(calls) == 1
@@ -0,0 +1,153 @@
+"""handler の Function URL (handlers.<key>.function_url) のテスト。
+
+API Gateway の代わりに Lambda Function URL を HTTP の入口にする。CloudFront の
+origin と runtime の host 解決が API Gateway と同じ経路で Function URL を扱うこと、
+AWS_IAM なら CloudFront の Lambda 用 OAC で署名することを確認する。
+"""
+
+from __future__ import annotations
+
+from unittest import mock
+
+import pytest
+import yaml
+from moto import mock_aws
+from pocket_cli.resources.aws.cloudformation import CloudFrontStack, ContainerStack
+from pydantic import ValidationError
+
+from pocket import runtime, settings
+from pocket.context import Context
+
+
+def _settings_dict(function_url: dict | None, *, streaming: bool = False) -> dict:
+    handler: dict = {"command": "pocket.django.lambda_handlers.wsgi_handler"}
+    if function_url is not None:
+        handler["function_url"] = function_url
+    if streaming:
+        handler["streaming"] = True
+    return {
+        "stage": "dev",
+        "general": {
+            "region": "ap-northeast-1",
+            "project_name": "testprj",
+            "stages": ["dev"],
+        },
+        "s3": {},
+        "container": {
+            "main": {"dockerfile_path": "Dockerfile", "handlers": {"wsgi": handler}}
+        },
+        "cloudfront": {
+            "web": {
+                "routes": [
+                    {"type": "lambda", "handler": "main.wsgi", "is_default": True}
+                ]
+            }
+        },
+    }
+
+
+def _context(function_url: dict | None, **kwargs) -> Context:
+    s = settings.Settings.model_validate(_settings_dict(function_url, **kwargs))
+    return Context.from_settings(s)
+
+
+def test_function_url_rejects_apigateway():
+    with pytest.raises(ValidationError, match="function_url handler"):
+        settings.LambdaHandler.model_validate(
+            {"command": "x.y", "function_url": {}, "apigateway": {}}
+        )
+
+
+def test_lambda_route_requires_http_endpoint():
+    data = _settings_dict(None)
+    with pytest.raises(ValidationError, match="apigateway or function_url"):
+        settings.Settings.model_validate(data)
+
+
+def test_streaming_implies_function_url():
+    handler = _context(None, streaming=True).container["main"].handlers["wsgi"]
+    assert handler.function_url is not None
+    assert handler.function_url.invoke_mode == "RESPONSE_STREAM"
+    assert handler.function_url.auth_type == "NONE"
+
+
+@mock_aws
+def test_container_template_public_function_url():
+    context = _context({})
+    parsed = yaml.safe_load(ContainerStack(context.container["main"]).yaml)
+    resources = parsed["Resources"]
+    url = resources["WsgiLambdaFunctionUrl"]["Properties"]
+    assert url["AuthType"] == "NONE"
+    assert url["InvokeMode"] == "BUFFERED"
+    assert resources["WsgiFunctionUrlPermission"]["Properties"]["Principal"] == "*"
+    assert "WsgiApi" not in resources
+    # CloudFront の origin 用に Function URL の host を export する
+    api_domain = parsed["Outputs"]["WsgiApiDomain"]
+    assert api_domain["Export"]["Name"] == "dev-testprj-main-wsgi-api-domain"
+    assert "Fn::Select" in api_domain["Value"]
+
+
+@mock_aws
+def test_container_template_iam_function_url():
+    context = _context({"auth_type": "AWS_IAM"})
+    resources = yaml.safe_load(ContainerStack(context.container["main"]).yaml)[
+        "Resources"
+    ]
+    assert resources["WsgiLambdaFunctionUrl"]["Properties"]["AuthType"] == "AWS_IAM"
+    for name in ("WsgiFunctionUrlPermission", "WsgiFunctionUrlInvokePermission"):
+        permission = resources[name]["Properties"]
+        assert permission["Principal"] == "cloudfront.amazonaws.com"
+        assert permission["SourceAccount"] == {"Ref": "AWS::AccountId"}
+
+
+def _cloudfront_yaml(context: Context) -> dict:
+    with mock.patch("boto3.client"):
+        text = CloudFrontStack(
+            context.cloudfront["web"], origin_verify_secret_value=""
+        ).yaml
+    return yaml.safe_load(text)
+
+
+def test_cloudfront_signs_iam_function_url_with_lambda_oac():
+    context = _context({"auth_type": "AWS_IAM"})
+    assert context.cloudfront["web"].lambda_oac_origins == ["main.wsgi"]
+    parsed = _cloudfront_yaml(context)
+    oac = parsed["Resources"]["LambdaOriginAccessControl"]["Properties"]
+    assert oac["OriginAccessControlConfig"]["OriginAccessControlOriginType"] == (
+        "lambda"
+    )
+    origins = parsed["Resources"]["CloudFrontDistribution"]["Properties"][
+        "DistributionConfig"
+    ]["Origins"]
+    (api_origin,) = [o for o in origins if "CustomOriginConfig" in o]
+    assert api_origin["DomainName"] == {
+        "Fn::ImportValue": "dev-testprj-main-wsgi-api-domain"
+    }
+    assert api_origin["OriginAccessControlId"] == {
+        "Fn::GetAtt": "LambdaOriginAccessControl.Id"
+    }
+
+
+def test_cloudfront_public_function_url_has_no_lambda_oac():
+    parsed = _cloudfront_yaml(_context({}))
+    assert "LambdaOriginAccessControl" not in parsed["Resources"]
+
+
+def test_get_hosts_resolves_function_url(monkeypatch):
+    c_ctx = _context({}).container["main"]
+    assert c_ctx is not None
+    fake_cfn = mock.MagicMock()
+    fake_cfn.describe_stacks.return_value = {
+        "Stacks": [
+            {
+                "Outputs": [
+                    {
+                        "OutputKey": "WsgiFunctionUrl",
+                        "OutputValue": "https://abc.lambda-url.ap-northeast-1.on.aws/",
+                    }
+                ]
+            }
+        ]
+    }
+    monkeypatch.setattr("boto3.client", lambda *a, **kw: fake_cfn)
+    assert runtime._get_hosts(c_ctx) == {"wsgi": "abc.lambda-url.ap-northeast-1.on.aws"}
@@ -0,0 +1,88 @@
+"""INIT のフェーズ別計測 (pocket.init_profile) のテスト。"""
+
+import json
+
+import pytest
+
+from pocket import init_profile, runtime
+
+
+@pytest.fixture(autouse=True)
+def _reset_phases():
+    init_profile.reset_init_phases()
+    yield
+    init_profile.reset_init_phases()
+
+
+def test_phase_is_noop_when_disabled(monkeypatch):
+    monkeypatch.delenv("POCKET_INIT_PROFILE", raising=False)
+    with init_profile.phase("toml_read"):
+        pass
+    assert runtime.get_init_phases() == {}
+    assert runtime.emit_init_metrics() is None
+
+
+def test_phase_records_and_accumulates(monkeypatch):
+    monkeypatch.setenv("POCKET_INIT_PROFILE", "1")
+    with init_profile.phase("a"):
+        pass
+    init_profile.record_phase("b", 2.0)
+    init_profile.record_phase("b", 3.0)
+    with pytest.raises(RuntimeError):
+        with init_profile.phase("c"):
+            raise RuntimeError("boom")
+    phases = runtime.get_init_phases()
+    assert list(phases) == ["a", "b", "c"]
+    assert phases["b"] == 5.0
+
+
+def test_emit_init_metrics_prints_emf_once(monkeypatch, capsys):
+    monkeypatch.setenv("POCKET_INIT_PROFILE", "1")
+    monkeypatch.setenv("AWS_LAMBDA_FUNCTION_NAME", "dev-testprj-wsgi")
+    init_profile.record_phase("toml_read", 1.5)
+    init_profile.record_phase("secrets", 20.25)
+
+    event = runtime.emit_init_metrics()
+    assert event is not None
+    assert runtime.emit_init_metrics() is None
+
+    lines = capsys.readouterr().out.strip().splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0]) == event
+    directive = event["_aws"]["CloudWatchMetrics"][0]
+    assert directive["Namespace"] == "MagicPocket/ColdStart"
+    assert directive["Dimensions"] == [["FunctionName"]]
+    assert directive["Metrics"] == [
+        {"Name": "toml_read", "Unit": "Milliseconds"},
+        {"Name": "secrets", "Unit": "Milliseconds"},
+    ]
+    assert event["FunctionName"] == "dev-testprj-wsgi"
+    assert event["toml_read"] == 1.5
+    assert event["secrets"] == 20.25
+
+
+def test_context_load_phases_recorded(use_toml, monkeypatch):
+    monkeypatch.setenv("POCKET_INIT_PROFILE", "1")
+    use_toml("tests/data/toml/default.toml")
+    runtime.get_context("dev")
+    phases = runtime.get_init_phases()
+    assert {"toml_read", "settings_validate", "context_build"} <= set(phases)
+
+
+def test_secret_phases_do_not_include_store_keys(monkeypatch):
+    """phase 名 (= メトリクス名) は store の数によらず固定。"""
+    from types import SimpleNamespace
+
+    monkeypatch.setenv("POCKET_INIT_PROFILE", "1")
+    views = [
+        SimpleNamespace(
+            pocket_key=key,
+            managed={"A": None},
+            user={"B": None},
+            pocket_store=SimpleNamespace(secrets={"A": "a"}),
+            user_store=SimpleNamespace(read_many=lambda names, required: {"B": "b"}),
+        )
+        for key in ("main", "shared")
+    ]
+    runtime._read_secrets_views(views)  # type: ignore[arg-type]
+    assert set(runtime.get_init_phases()) == {"secrets.managed", "secrets.user"}
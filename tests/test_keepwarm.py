@@ -0,0 +1,158 @@
+"""keep-warm ping (pocket.keepwarm / pocket.keepwarm_scheduler) のテスト。"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from moto import mock_aws
+from pydantic import ValidationError
+
+from pocket import keepwarm
+from pocket.context import Context
+from pocket.settings import KeepwarmScheduleEntry, Settings
+
+FUNCTION_ARN = "arn:aws:lambda:ap-southeast-1:123456789012:function:f:live"
+
+
+class FakeLambda:
+    def __init__(self, fail_after: int | None = None):
+        self.calls: list[dict] = []
+        self.fail_after = fail_after
+
+    def invoke(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.fail_after is not None and len(self.calls) > self.fail_after:
+            raise RuntimeError("throttled")
+        return {"StatusCode": 200}
+
+
+@pytest.fixture
+def fake_lambda(monkeypatch):
+    fake = FakeLambda()
+    monkeypatch.setattr("pocket.aws_clients.client", lambda *a, **kw: fake)
+    monkeypatch.setattr("pocket.keepwarm.time.sleep", lambda s: None)
+    return fake
+
+
+def test_wrapped_handler_returns_before_inner(fake_lambda):
+    calls = []
+
+    @keepwarm.keepwarm
+    def handler(event, context):
+        calls.append(event)
+        return "inner"
+
+    result = handler({"pocket_keepwarm": {"concurrency": 1}}, None)
+    assert result == {"keepwarm": True, "warmed": 1}
+    assert calls == []
+    assert handler({"version": "2.0"}, None) == "inner"
+    assert handler.__name__ == "handler"
+
+
+def test_fan_out_invokes_self_concurrently(fake_lambda):
+    context = SimpleNamespace(invoked_function_arn=FUNCTION_ARN)
+    result = keepwarm.handle_keepwarm({"pocket_keepwarm": {"concurrency": 4}}, context)
+    assert result == {"keepwarm": True, "warmed": 4}
+    assert len(fake_lambda.calls) == 3
+    for call in fake_lambda.calls:
+        assert call["FunctionName"] == FUNCTION_ARN
+        # 子の ping は広げずに待ってから返る
+        assert json.loads(call["Payload"]) == {
+            "pocket_keepwarm": {"concurrency": 1, "hold": True}
+        }
+
+
+def test_failed_ping_is_not_counted(fake_lambda):
+    fake_lambda.fail_after = 1
+    context = SimpleNamespace(invoked_function_arn=FUNCTION_ARN)
+    result = keepwarm.handle_keepwarm({"pocket_keepwarm": {"concurrency": 3}}, context)
+    assert result == {"keepwarm": True, "warmed": 2}
+
+
+def test_child_ping_holds(monkeypatch):
+    slept = []
+    monkeypatch.setattr("pocket.keepwarm.time.sleep", slept.append)
+    keepwarm.handle_keepwarm(
+        {"pocket_keepwarm": {"concurrency": 1, "hold": True}}, None
+    )
+    assert slept == [keepwarm.HOLD_SECONDS]
+
+
+def test_concurrency_is_bounded():
+    with pytest.raises(ValidationError):
+        KeepwarmScheduleEntry.model_validate(
+            {
+                "scheduler": "pocket.keepwarm_scheduler",
+                "rate": "5 minutes",
+                "handler": "main.wsgi",
+                "concurrency": 100,
+            }
+        )
+
+
+def _settings(concurrency: int) -> Settings:
+    return Settings.model_validate(
+        {
+            "stage": "dev",
+            "general": {
+                "region": "ap-southeast-1",
+                "project_name": "testprj",
+                "stages": ["dev"],
+            },
+            "s3": {},
+            "container": {
+                "main": {
+                    "dockerfile_path": "tests/sampleprj/Dockerfile",
+                    "handlers": {
+                        "wsgi": {
+                            "command": "pocket.django.lambda_handlers.wsgi_handler",
+                            "apigateway": {},
+                        },
+                    },
+                }
+            },
+            "scheduler": {
+                "schedules": {
+                    "warm_web": {
+                        "scheduler": "pocket.keepwarm_scheduler",
+                        "rate": "5 minutes",
+                        "handler": "main.wsgi",
+                        "concurrency": concurrency,
+                    },
+                }
+            },
+        }
+    )
+
+
+@mock_aws
+def test_keepwarm_schedule_template():
+    context = Context.from_settings(_settings(5))
+    scheduler = context.scheduler["main"]
+    (entry,) = scheduler.schedules
+    assert json.loads(entry.input_json) == {"pocket_keepwarm": {"concurrency": 5}}
+    function = "arn:aws:lambda:ap-southeast-1:${AWS::AccountId}:function:"
+    function += context.container["main"].handlers["wsgi"].function_name
+    assert scheduler.invoked_function_arns == [function]
+    assert scheduler.keepwarm_function_arns == [function, function + ":*"]
+    from pocket_cli.resources.aws.cloudformation import ContainerStack
+
+    yaml = ContainerStack(context.container["main"], scheduler_context=scheduler).yaml
+    assert "dev-testprj-pocket-keepwarm-invoke" in yaml
+    assert '"WarmWebSchedule"' in yaml
+
+
+@mock_aws
+def test_single_ping_does_not_grant_self_invoke():
+    context = Context.from_settings(_settings(1))
+    assert context.scheduler["main"].keepwarm_function_arns == []
+
+
+def test_django_handlers_are_wrapped():
+    """lambda_handlers の import は Django app の起動を伴うため source で確認する。"""
+    src = Path("pocket/django/lambda_handlers.py").read_text()
+    assert "wsgi_handler = keepwarm(" in src
+    assert "@keepwarm\ndef management_command_handler" in src
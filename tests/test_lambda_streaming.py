@@ -0,0 +1,269 @@
+"""response streaming runtime (pocket.lambda_streaming) のテスト。
+
+Runtime API は local の HTTP server で代用し、chunked で届いた body と trailer を
+そのまま記録して検証する。
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import yaml
+from moto import mock_aws
+from pocket_cli.resources.aws.cloudformation import ContainerStack
+from pydantic import ValidationError
+
+from pocket import settings
+from pocket.context import Context
+from pocket.lambda_streaming import (
+    HTTP_INTEGRATION_CONTENT_TYPE,
+    RuntimeClient,
+    StreamingResponse,
+    handle_invocation,
+    make_wsgi_streaming_handler,
+)
+
+
+class _FakeRuntimeApi(BaseHTTPRequestHandler):
+    event: dict = {}
+    posts: list[dict] = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = json.dumps(self.event).encode()
+        self.send_response(200)
+        self.send_header("Lambda-Runtime-Aws-Request-Id", "req-1")
+        self.send_header("Lambda-Runtime-Deadline-Ms", "9999999999999")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_chunked(self):
+        chunks, trailers = [], {}
+        while True:
+            size = int(self.rfile.readline().strip(), 16)
+            if size == 0:
+                break
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+        while line := self.rfile.readline().strip():
+            name, _, value = line.decode().partition(": ")
+            trailers[name] = value
+        return chunks, trailers
+
+    def do_POST(self):
+        if self.headers.get("Transfer-Encoding") == "chunked":
+            chunks, trailers = self._read_chunked()
+        else:
+            chunks = [self.rfile.read(int(self.headers["Content-Length"]))]
+            trailers = {}
+        self.posts.append(
+            {
+                "path": self.path,
+                "headers": dict(self.headers),
+                "chunks": chunks,
+                "trailers": trailers,
+            }
+        )
+        self.send_response(202)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+@pytest.fixture
+def runtime_api():
+    _FakeRuntimeApi.posts = []
+    _FakeRuntimeApi.event = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeRuntimeApi)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield _FakeRuntimeApi, RuntimeClient("127.0.0.1:%s" % server.server_port)
+    server.shutdown()
+    server.server_close()
+
+
+def test_stream_chunks_in_order(runtime_api):
+    api, client = runtime_api
+
+    def handler(event, context):
+        assert context.aws_request_id == "req-1"
+        assert context.get_remaining_time_in_millis() > 0
+        return StreamingResponse(iter([b"a", b"", b"bc"]), content_type="text/plain")
+
+    handle_invocation(client, handler)
+    (post,) = api.posts
+    assert post["path"] == "/2018-06-01/runtime/invocation/req-1/response"
+    assert post["headers"]["Lambda-Runtime-Function-Response-Mode"] == "streaming"
+    assert post["headers"]["Content-Type"] == "text/plain"
+    assert post["chunks"] == [b"a", b"bc"]
+    assert post["trailers"] == {}
+
+
+def test_non_streaming_result_is_json(runtime_api):
+    api, client = runtime_api
+    handle_invocation(client, lambda event, context: {"ok": True})
+    (post,) = api.posts
+    assert post["headers"]["Content-Type"] == "application/json"
+    assert json.loads(b"".join(post["chunks"])) == {"ok": True}
+
+
+def test_handler_error_posts_invocation_error(runtime_api):
+    api, client = runtime_api
+
+    def handler(event, context):
+        raise ValueError("boom")
+
+    handle_invocation(client, handler)
+    (post,) = api.posts
+    assert post["path"] == "/2018-06-01/runtime/invocation/req-1/error"
+    assert json.loads(post["chunks"][0])["errorType"] == "ValueError"
+
+
+def test_error_during_stream_is_reported_in_trailer(runtime_api):
+    api, client = runtime_api
+
+    def body():
+        yield b"partial"
+        raise RuntimeError("disk gone")
+
+    handle_invocation(client, lambda event, context: StreamingResponse(body()))
+    (post,) = api.posts
+    assert post["chunks"] == [b"partial"]
+    assert post["trailers"]["Lambda-Runtime-Function-Error-Type"] == "RuntimeError"
+    error = json.loads(
+        base64.b64decode(post["trailers"]["Lambda-Runtime-Function-Error-Body"])
+    )
+    assert error["errorMessage"] == "disk gone"
+
+
+def _function_url_event(path="/download"):
+    return {
+        "version": "2.0",
+        "rawPath": path,
+        "rawQueryString": "",
+        "headers": {"host": "abc.lambda-url.ap-northeast-1.on.aws"},
+        "requestContext": {
+            "http": {"method": "GET", "protocol": "HTTP/1.1", "sourceIp": "1.2.3.4"}
+        },
+        "isBase64Encoded": False,
+    }
+
+
+def _split_prelude(data: bytes):
+    prelude, _, body = data.partition(b"\x00" * 8)
+    return json.loads(prelude), body
+
+
+def test_wsgi_streaming_handler(runtime_api):
+    api, client = runtime_api
+    api.event = _function_url_event()
+    closed = []
+
+    class Body:
+        def __iter__(self):
+            yield b"part1,"
+            yield b"part2"
+
+        def close(self):
+            closed.append(True)
+
+    def app(environ, start_response):
+        assert environ["PATH_INFO"] == "/download"
+        start_response(
+            "200 OK",
+            [
+                ("Content-Type", "text/csv"),
+                ("Set-Cookie", "a=1"),
+                ("Set-Cookie", "b=2"),
+                ("Vary", "Cookie"),
+                ("Vary", "Accept"),
+            ],
+        )
+        return Body()
+
+    handle_invocation(client, make_wsgi_streaming_handler(app))
+    (post,) = api.posts
+    assert post["headers"]["Content-Type"] == HTTP_INTEGRATION_CONTENT_TYPE
+    # body を結合せず、app の chunk がそのまま送られる
+    assert post["chunks"][1:] == [b"part1,", b"part2"]
+    prelude, body = _split_prelude(b"".join(post["chunks"]))
+    assert prelude == {
+        "statusCode": 200,
+        "headers": {"content-type": "text/csv", "vary": "Cookie, Accept"},
+        "cookies": ["a=1", "b=2"],
+    }
+    assert body == b"part1,part2"
+    assert closed == [True]
+
+
+def test_wsgi_streaming_handler_lazy_start_response_and_write(runtime_api):
+    api, client = runtime_api
+    api.event = _function_url_event()
+
+    def app(environ, start_response):
+        write = start_response("404 Not Found", [("Content-Type", "text/plain")])
+        write(b"written ")
+        yield b"yielded"
+
+    handle_invocation(client, make_wsgi_streaming_handler(app))
+    prelude, body = _split_prelude(b"".join(api.posts[0]["chunks"]))
+    assert prelude["statusCode"] == 404
+    assert body == b"written yielded"
+
+
+def _write_toml(tmp_path):
+    toml_path = tmp_path / "pocket.toml"
+    toml_path.write_text(
+        """
+[general]
+region = "ap-southeast-1"
+project_name = "testprj"
+stages = ["dev"]
+
+[container.main]
+dockerfile_path = "Dockerfile"
+
+[container.main.handlers.wsgi]
+command = "pocket.django.lambda_handlers.wsgi_handler"
+
+[container.main.handlers.download]
+command = "pocket.django.lambda_handlers.wsgi_streaming_handler"
+streaming = true
+"""
+    )
+    return toml_path
+
+
+@mock_aws
+def test_template_streaming_handler(use_toml, tmp_path):
+    use_toml(str(_write_toml(tmp_path)))
+    context = Context.from_toml(stage="dev")
+    assert context.container["main"]
+    parsed = yaml.safe_load(ContainerStack(context.container["main"]).yaml)
+    resources = parsed["Resources"]
+    image_config = resources["DownloadLambdaFunction"]["Properties"]["ImageConfig"]
+    assert image_config["EntryPoint"] == ["python", "-m", "pocket.lambda_streaming"]
+    assert image_config["Command"] == [
+        "pocket.django.lambda_handlers.wsgi_streaming_handler"
+    ]
+    url = resources["DownloadLambdaFunctionUrl"]["Properties"]
+    assert url["InvokeMode"] == "RESPONSE_STREAM"
+    assert url["AuthType"] == "NONE"
+    assert "DownloadFunctionUrl" in parsed["Outputs"]
+    # streaming でない handler は awslambdaric のまま
+    wsgi = resources["WsgiLambdaFunction"]["Properties"]["ImageConfig"]
+    assert "EntryPoint" not in wsgi
+    assert "WsgiLambdaFunctionUrl" not in resources
+
+
+def test_streaming_handler_rejects_apigateway():
+    with pytest.raises(ValidationError, match="streaming handler"):
+        settings.LambdaHandler.model_validate(
+            {"command": "x.y", "streaming": True, "apigateway": {}}
+        )
@@ -699,8 +699,8 @@ def test_shared_view_without_managed_is_not_granted_nor_read():
     object.__setattr__(shared_view, "pocket_store", _ExplodingStore({}))
 
     class _FakeUserStore:
-        def read(self, spec, required=True):
-            return "postgres://example/db"
+        def read_many(self, specs, required=True):
+            return dict.fromkeys(specs, "postgres://example/db")
 
     for sc in own.secrets_views():
         object.__setattr__(sc, "user_store", _FakeUserStore())
@@ -128,6 +128,7 @@ RESOURCE_TYPE_ACTIONS: dict[str, list[str]] = {
     "AWS::Lambda::EventSourceMapping": ["lambda:*"],
     "AWS::Lambda::Function": ["lambda:*"],
     "AWS::Lambda::Permission": ["lambda:*"],
+    "AWS::Lambda::Url": ["lambda:*"],
     "AWS::Logs::LogGroup": ["logs:*"],
     # route53:ChangeResourceRecordSets 欠落事故 c5f33cc の再発防止対象
     "AWS::Route53::RecordSet": [
@@ -165,14 +166,24 @@ def _pascal(method: str) -> str:
     return "".join(part.capitalize() for part in method.split("_"))
 
 
+# client を生成する (モジュール名, 関数名)。pocket.aws_clients は runtime 用の
+# 共有 client registry で、boto3.client と同じく service 名をリテラルで受け取る
+_CLIENT_FACTORIES = {
+    ("boto3", "client"),
+    ("boto3", "resource"),
+    ("aws_clients", "client"),
+}
+
+
 def _client_service(node: ast.AST) -> str | None:
-    """node が boto3.client("X") / boto3.resource("X") なら service 名を返す。"""
+    """node が boto3.client("X") / boto3.resource("X") /
+    aws_clients.client("X") なら service 名を返す。"""
     if not isinstance(node, ast.Call):
         return None
     func = node.func
-    if not (isinstance(func, ast.Attribute) and func.attr in ("client", "resource")):
+    if not (isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name)):
         return None
-    if not (isinstance(func.value, ast.Name) and func.value.id == "boto3"):
+    if (func.value.id, func.attr) not in _CLIENT_FACTORIES:
         return None
     if node.args and isinstance(node.args[0], ast.Constant):
         value = node.args[0].value
@@ -426,6 +437,11 @@ def test_analyzer_tracks_known_callsites():
     assert ("dsql", "list_clusters") in calls
     # self.x = boto3.client パターン + resourcegroupstaggingapi
     assert ("resourcegroupstaggingapi", "tag_resources") in calls
+    # aws_clients.client パターン (secret_store.py / runtime.py / django/utils.py)
+    assert ("ssm", "get_parameter") in calls
+    assert ("secretsmanager", "get_secret_value") in calls
+    assert ("sqs", "send_message") in calls
+    assert ("dsql", "generate_db_connect_admin_auth_token") in calls
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,157 @@
+"""Lambda の応答上限を超える body の S3 offload (pocket.response_offload) のテスト。"""
+
+from __future__ import annotations
+
+import json
+from urllib.parse import urlparse
+
+import boto3
+import pytest
+from moto import mock_aws
+from pydantic import ValidationError
+
+from pocket.apigw_wsgi import make_lambda_handler
+from pocket.context import Context
+from pocket.response_offload import METRICS_NAMESPACE, ResponseOffloader
+from pocket.settings import Settings
+
+BUCKET = "dev-testprj-pocket"
+
+
+def v2_event():
+    return {
+        "version": "2.0",
+        "rawPath": "/export/",
+        "rawQueryString": "",
+        "headers": {"host": "example.com"},
+        "requestContext": {
+            "http": {"method": "GET", "protocol": "HTTP/1.1", "sourceIp": "1.2.3.4"}
+        },
+        "isBase64Encoded": False,
+    }
+
+
+def _app(body: bytes, content_type="text/csv", status="200 OK"):
+    def app(environ, start_response):
+        start_response(
+            status,
+            [
+                ("Content-Type", content_type),
+                ("Content-Disposition", 'attachment; filename="export.csv"'),
+                ("Set-Cookie", "a=1"),
+            ],
+        )
+        return [body]
+
+    return app
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def _handler(app, threshold=100):
+    offloader = ResponseOffloader(
+        BUCKET, prefix="pocket/response-offload/", threshold=threshold
+    )
+    return make_lambda_handler(app, compress_min_size=None, offload=offloader)
+
+
+def test_offloader_creates_no_client_until_first_offload(monkeypatch):
+    from pocket import aws_clients
+
+    ResponseOffloader(BUCKET, prefix="pocket/response-offload/", threshold=100)
+    assert aws_clients._clients == {}
+
+
+def test_large_response_is_offloaded(s3, capsys):
+    body = b"id,name\n" + b"1,abc\n" * 100
+    response = _handler(_app(body))(v2_event(), None)
+    assert response["statusCode"] == 303
+    assert response["body"] == ""
+    assert response["cookies"] == ["a=1"]
+    location = urlparse(response["headers"]["location"])
+    key = location.path.split(f"/{BUCKET}/", 1)[-1].lstrip("/")
+    assert key.startswith("pocket/response-offload/")
+    assert "X-Amz-Algorithm=AWS4-HMAC-SHA256" in location.query
+    obj = s3.get_object(Bucket=BUCKET, Key=key)
+    assert obj["Body"].read() == body
+    assert obj["ContentType"] == "text/csv"
+    assert obj["ContentDisposition"] == 'attachment; filename="export.csv"'
+    emf = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert emf["_aws"]["CloudWatchMetrics"][0]["Namespace"] == METRICS_NAMESPACE
+    assert emf["OffloadedBytes"] == len(body)
+
+
+def test_binary_response_is_decoded_before_upload(s3):
+    payload = bytes(range(256))
+    response = _handler(_app(payload, "application/zip"))(v2_event(), None)
+    assert response["statusCode"] == 303
+    (obj,) = s3.list_objects_v2(Bucket=BUCKET)["Contents"]
+    assert s3.get_object(Bucket=BUCKET, Key=obj["Key"])["Body"].read() == payload
+
+
+def test_small_response_is_returned_as_is(s3):
+    response = _handler(_app(b"id\n1\n"))(v2_event(), None)
+    assert response["statusCode"] == 200
+    assert response["body"] == "id\n1\n"
+    assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET)
+
+
+def test_non_200_response_is_not_offloaded(s3):
+    body = b"x" * 1000
+    response = _handler(_app(body, status="404 Not Found"))(v2_event(), None)
+    assert response["statusCode"] == 404
+    assert response["body"] == "x" * 1000
+
+
+def _settings(s3: bool = True, **offload) -> dict:
+    data: dict = {
+        "stage": "dev",
+        "general": {
+            "region": "ap-northeast-1",
+            "project_name": "testprj",
+            "stages": ["dev"],
+        },
+        "container": {
+            "main": {
+                "dockerfile_path": "Dockerfile",
+                "handlers": {
+                    "wsgi": {
+                        "command": "pocket.django.lambda_handlers.wsgi_handler",
+                        "apigateway": {},
+                    }
+                },
+                "django": {"response_offload": offload},
+            }
+        },
+    }
+    if s3:
+        data["s3"] = {}
+    return data
+
+
+def test_response_offload_requires_s3():
+    with pytest.raises(ValidationError, match="response_offload requires s3"):
+        Settings.model_validate(_settings(s3=False))
+
+
+def test_response_offload_context_and_lifecycle_rule():
+    context = Context.from_settings(
+        Settings.model_validate(_settings(threshold=1000, expiration_days=2))
+    )
+    django = context.container["main"].django
+    assert django is not None and django.response_offload is not None
+    offload = django.response_offload
+    assert context.s3 is not None
+    assert offload.bucket_name == context.s3.bucket_name
+    assert offload.threshold == 1000
+    assert offload.prefix == "pocket/response-offload/"
+    (rule,) = context.s3.lifecycle_rules
+    assert rule.id == "pocket-response-offload-main"
+    assert rule.prefix == "pocket/response-offload/"
+    assert rule.expiration_days == 2
@@ -49,12 +49,12 @@ def test_refresh_dsql_token_regenerates(monkeypatch):
             calls["token_args"] = (endpoint, region)
             return "fresh-token"
 
-    def fake_client(service, region_name=None):
+    def fake_client(service, region_name=None, **kwargs):
         calls["service"] = service
         calls["region_name"] = region_name
         return FakeDsqlClient()
 
-    monkeypatch.setattr(runtime.boto3, "client", fake_client)
+    monkeypatch.setattr("boto3.client", fake_client)
 
     token = refresh_dsql_token()
     assert token == "fresh-token"
@@ -102,10 +102,9 @@ def test_set_envs_from_secrets_retries_after_failure(use_toml, monkeypatch):
         calls["n"] += 1
         if calls["n"] == 1:
             raise RuntimeError("simulated SSM throttling")
-        return {"FROM_SECRETS": "ok"}
+        return {"FROM_SECRETS": "ok"}, None
 
-    monkeypatch.setattr(runtime, "get_secrets", _fail_once)
-    monkeypatch.setattr(runtime, "_set_rds_database_url", lambda: None)
+    monkeypatch.setattr(runtime, "_read_secrets_and_rds_secret", _fail_once)
     monkeypatch.setattr(runtime, "_set_dsql_token", lambda: None)
 
     with pytest.raises(RuntimeError, match="simulated"):
@@ -115,3 +114,82 @@ def test_set_envs_from_secrets_retries_after_failure(use_toml, monkeypatch):
     runtime.set_envs_from_secrets(stage="dev")
     assert os.environ.get("FROM_SECRETS") == "ok"
     assert os.environ.get("POCKET_ENVS_SECRETS_LOADED") == "true"
+
+
+def test_resolve_concurrently_keeps_submission_order():
+    """並列に解決しても結果は submit 順で返り、実際に同時実行されること"""
+    import threading
+
+    barrier = threading.Barrier(3, timeout=5)
+
+    def _call(value):
+        # 3 つ全てが同時に走っていないと Barrier が timeout して落ちる
+        barrier.wait()
+        return value
+
+    results = runtime._resolve_concurrently(
+        [lambda: _call("a"), lambda: _call("b"), lambda: _call("c")]
+    )
+    assert results == ["a", "b", "c"]
+
+
+def test_resolve_concurrently_serial_when_concurrency_is_one(monkeypatch):
+    import threading
+
+    monkeypatch.setenv("POCKET_INIT_CONCURRENCY", "1")
+    main = threading.get_ident()
+    results = runtime._resolve_concurrently([threading.get_ident, threading.get_ident])
+    assert results == [main, main]
+
+
+def test_resolve_concurrently_propagates_first_error():
+    def _fail(msg):
+        raise RuntimeError(msg)
+
+    with pytest.raises(RuntimeError, match="first"):
+        runtime._resolve_concurrently(
+            [lambda: "ok", lambda: _fail("first"), lambda: _fail("second")]
+        )
+
+
+def test_resolve_concurrently_rejects_invalid_concurrency(monkeypatch):
+    monkeypatch.setenv("POCKET_INIT_CONCURRENCY", "0")
+    with pytest.raises(ValueError, match="POCKET_INIT_CONCURRENCY"):
+        runtime._resolve_concurrently([lambda: 1, lambda: 2])
+
+
+def test_secret_reads_share_one_pool_with_rds(monkeypatch):
+    """secret の view ごとの読み出しと RDS の読み出しを 1 つの pool にまとめる。"""
+    from types import SimpleNamespace
+
+    views = [
+        SimpleNamespace(
+            managed={"A": None},
+            user={"B": None},
+            pocket_store=SimpleNamespace(secrets={"A": "a"}),
+            user_store=SimpleNamespace(read_many=lambda names, required: {"B": "b"}),
+        ),
+        SimpleNamespace(
+            managed={},
+            user={"C": None},
+            user_store=SimpleNamespace(read_many=lambda names, required: {"C": "c"}),
+        ),
+    ]
+    context = SimpleNamespace(secrets=None, container={})
+    own = SimpleNamespace(shared_secrets=None)
+    monkeypatch.setattr(
+        runtime, "_own_secrets_views", lambda stage, container: (context, own, views)
+    )
+    monkeypatch.setattr(runtime, "_read_rds_secret_string", lambda: "rds")
+    pools = []
+    resolve = runtime._resolve_concurrently
+
+    def recording_resolve(calls):
+        pools.append(len(calls))
+        return resolve(calls)
+
+    monkeypatch.setattr(runtime, "_resolve_concurrently", recording_resolve)
+    data, rds = runtime._read_secrets_and_rds_secret("dev")
+    assert pools == [4]
+    assert data == {"A": "a", "B": "b", "C": "c"}
+    assert rds == "rds"
@@ -56,3 +56,220 @@ def test_add_or_append_env_joins_with_comma(monkeypatch):
     assert os.environ["ALLOWED_HOSTS"] == "a.example.com,b.example.com"
     add_or_append_env("ALLOWED_HOSTS", "c.example.com")
     assert os.environ["ALLOWED_HOSTS"] == "a.example.com,b.example.com,c.example.com"
+
+
+def test_get_hosts_describes_container_stack_once(use_toml, tmp_path, monkeypatch):
+    """apigateway 付き handler が複数でも describe_stacks は container あたり 1 回。"""
+    from unittest import mock
+
+    toml_path = _write_toml(tmp_path)
+    toml_path.write_text(
+        toml_path.read_text()
+        + """apigateway = {}
+
+[container.main.handlers.admin]
+command = "pocket.django.lambda_handlers.wsgi_handler"
+apigateway = {}
+"""
+    )
+    use_toml(str(toml_path))
+    c_ctx = runtime.get_context("dev").container["main"]
+    fake_cfn = mock.MagicMock()
+    fake_cfn.describe_stacks.return_value = {
+        "Stacks": [
+            {
+                "Outputs": [
+                    {
+                        "OutputKey": "WsgiApiEndpoint",
+                        "OutputValue": "https://a.example.com",
+                    },
+                    {
+                        "OutputKey": "AdminApiEndpoint",
+                        "OutputValue": "https://b.example.com",
+                    },
+                ]
+            }
+        ]
+    }
+    monkeypatch.setattr("boto3.client", lambda *a, **kw: fake_cfn)
+
+    assert runtime._get_hosts(c_ctx) == {
+        "wsgi": "a.example.com",
+        "admin": "b.example.com",
+    }
+    fake_cfn.describe_stacks.assert_called_once_with(
+        StackName="dev-testprj-container-main"
+    )
+
+
+def _manifest(**overrides):
+    """deploy 時の manifest (container には現在の toml の fingerprint を付ける)"""
+    import json
+
+    from pocket.context import Context
+
+    manifest = {
+        "version": runtime.RESOURCE_MANIFEST_VERSION,
+        "stage": "dev",
+        "container": {
+            "main": {"hosts": {}, "queueurls": {"wsgi": None}},
+        },
+        "cloudfront": None,
+    }
+    manifest.update(overrides)
+    context = Context.from_toml(stage="dev")
+    for c_name, entry in manifest["container"].items():
+        entry.setdefault(
+            "fingerprint", runtime._container_fingerprint(context.container[c_name])
+        )
+    return json.dumps(manifest)
+
+
+def _write_api_toml(tmp_path):
+    toml_path = _write_toml(tmp_path)
+    toml_path.write_text(toml_path.read_text() + "apigateway = {}\n")
+    return toml_path
+
+
+def test_resource_manifest_skips_discovery(use_toml, tmp_path, monkeypatch):
+    """deploy 時の manifest が context と整合していれば AWS に問い合わせない。"""
+    use_toml(str(_write_api_toml(tmp_path)))
+    monkeypatch.setattr(
+        os,
+        "environ",
+        {
+            runtime.RESOURCE_MANIFEST_ENV: _manifest(
+                container={
+                    "main": {
+                        "hosts": {"wsgi": "baked.example.com"},
+                        "queueurls": {"wsgi": None},
+                    }
+                }
+            )
+        },
+    )
+
+    def _fail(ac):
+        raise AssertionError("live discovery must not run")
+
+    monkeypatch.setattr(runtime, "_get_hosts", _fail)
+    monkeypatch.setattr(runtime, "_get_queueurls", _fail)
+
+    runtime.set_envs_from_aws_resources(stage="dev")
+    assert os.environ["POCKET_HOSTS"] == "baked.example.com"
+    assert os.environ["POCKET_WSGI_ENDPOINT"] == "https://baked.example.com"
+
+
+def test_stale_resource_manifest_falls_back(use_toml, tmp_path, monkeypatch):
+    """handler 構成が manifest と食い違う・別 stage の manifest は live で解決する。"""
+    use_toml(str(_write_api_toml(tmp_path)))
+    monkeypatch.setattr(runtime, "_get_hosts", lambda ac: {"wsgi": "live.example.com"})
+    monkeypatch.setattr(runtime, "_get_queueurls", lambda ac: {"wsgi": None})
+
+    # apigateway が後から付いた (deploy 時点の manifest には host が無い)
+    monkeypatch.setattr(os, "environ", {runtime.RESOURCE_MANIFEST_ENV: _manifest()})
+    runtime.set_envs_from_aws_resources(stage="dev")
+    assert os.environ["POCKET_HOSTS"] == "live.example.com"
+
+    monkeypatch.setattr(
+        os,
+        "environ",
+        {
+            runtime.RESOURCE_MANIFEST_ENV: _manifest(
+                stage="prd",
+                container={
+                    "main": {
+                        "hosts": {"wsgi": "prd.example.com"},
+                        "queueurls": {"wsgi": None},
+                    }
+                },
+            )
+        },
+    )
+    runtime.set_envs_from_aws_resources(stage="dev")
+    assert os.environ["POCKET_HOSTS"] == "live.example.com"
+
+
+def test_resource_manifest_with_changed_config_falls_back(
+    use_toml, tmp_path, monkeypatch
+):
+    """handler の key が同じでも、deploy 後に設定が変わった manifest は使わない。"""
+    toml_path = _write_toml(tmp_path)
+    toml_path.write_text(toml_path.read_text() + "function_url = {}\n")
+    use_toml(str(toml_path))
+    # function_url の時に deploy した manifest (host の key は apigateway と同じ)
+    baked = _manifest(
+        container={
+            "main": {
+                "hosts": {"wsgi": "old.lambda-url.example.com"},
+                "queueurls": {"wsgi": None},
+            }
+        }
+    )
+    use_toml(str(_write_api_toml(tmp_path)))
+    monkeypatch.setattr(runtime, "_get_hosts", lambda ac: {"wsgi": "live.example.com"})
+    monkeypatch.setattr(runtime, "_get_queueurls", lambda ac: {"wsgi": None})
+    monkeypatch.setattr(os, "environ", {runtime.RESOURCE_MANIFEST_ENV: baked})
+
+    runtime.set_envs_from_aws_resources(stage="dev")
+    assert os.environ["POCKET_HOSTS"] == "live.example.com"
+
+
+def test_discovery_resolves_every_call_in_one_pool(use_toml, tmp_path, monkeypatch):
+    """host / queue URL の呼び出しを入れ子にせず 1 つの pool にまとめる。"""
+    toml_path = _write_toml(tmp_path)
+    toml_path.write_text(
+        toml_path.read_text()
+        + """
+[container.main.handlers.worker]
+command = "pocket.django.lambda_handlers.sqs_management_command_handler"
+sqs = {}
+
+[container.main.handlers.mail]
+command = "pocket.django.lambda_handlers.sqs_management_command_handler"
+sqs = {}
+"""
+    )
+    use_toml(str(toml_path))
+    context = runtime.get_context("dev")
+    pools = []
+    resolve = runtime._resolve_concurrently
+
+    def recording_resolve(calls):
+        pools.append(len(calls))
+        return resolve(calls)
+
+    monkeypatch.setattr(runtime, "_resolve_concurrently", recording_resolve)
+    monkeypatch.setattr(runtime, "_get_hosts", lambda c_ctx: {})
+    monkeypatch.setattr(runtime, "_get_queue_url", lambda name: "url:" + name)
+
+    containers, cf_domains = runtime._discover_resources(
+        context, ["main"], cloudfront=False
+    )
+    assert pools == [3]
+    assert containers["main"]["queueurls"] == {
+        "wsgi": None,
+        "worker": "url:dev-testprj-pocket-main-worker",
+        "mail": "url:dev-testprj-pocket-main-mail",
+    }
+    assert cf_domains is None
+
+
+def test_built_manifest_is_used_at_runtime(use_toml, tmp_path, monkeypatch):
+    """build_resource_manifest の出力は、同じ設定の runtime でそのまま使われる。"""
+    import json
+
+    use_toml(str(_write_api_toml(tmp_path)))
+    monkeypatch.setattr(runtime, "_get_hosts", lambda ac: {"wsgi": "baked.example.com"})
+    monkeypatch.setattr(runtime, "_get_queue_url", lambda name: None)
+    manifest = runtime.build_resource_manifest(runtime.get_context("dev"))
+
+    def _fail(ac):
+        raise AssertionError("live discovery must not run")
+
+    monkeypatch.setattr(runtime, "_get_hosts", _fail)
+    monkeypatch.setattr(
+        os, "environ", {runtime.RESOURCE_MANIFEST_ENV: json.dumps(manifest)}
+    )
+    runtime.set_envs_from_aws_resources(stage="dev")
+    assert os.environ["POCKET_HOSTS"] == "baked.example.com"
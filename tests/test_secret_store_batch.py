@@ -0,0 +1,128 @@
+"""user secret の一括読み出し (GetParameters / BatchGetSecretValue)。"""
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+from pocket import settings
+from pocket.context import SecretsContext
+from pocket.secret_store import SSM_GET_PARAMETERS_LIMIT, read_stored_values
+
+REGION = "ap-southeast-1"
+
+
+@mock_aws
+def test_read_stored_values_ssm_chunks_get_parameters():
+    ssm = boto3.client("ssm", region_name=REGION)
+    names = ["/prj/p%d" % i for i in range(SSM_GET_PARAMETERS_LIMIT + 2)]
+    for name in names:
+        ssm.put_parameter(Name=name, Value="v" + name, Type="SecureString")
+    values = read_stored_values([*names, "/prj/missing"], "ssm", REGION)
+    assert values == {**{name: "v" + name for name in names}, "/prj/missing": None}
+
+
+@mock_aws
+def test_read_stored_values_sm_missing_is_none():
+    sm = boto3.client("secretsmanager", region_name=REGION)
+    sm.create_secret(Name="prj/a", SecretString="a")
+    values = read_stored_values(["prj/a", "prj/missing"], "sm", REGION)
+    assert values == {"prj/a": "a", "prj/missing": None}
+
+
+@mock_aws
+@pytest.mark.parametrize(
+    "store, code", [("ssm", "ParameterNotFound"), ("sm", "ResourceNotFoundException")]
+)
+def test_read_stored_values_required_raises_not_found(store, code):
+    with pytest.raises(ClientError) as ei:
+        read_stored_values(["/prj/missing"], store, REGION, required=True)
+    assert ei.value.response["Error"]["Code"] == code
+    assert "/prj/missing" in ei.value.response["Error"]["Message"]
+
+
+@mock_aws
+def test_read_many_groups_by_effective_store(base_settings):
+    boto3.client("ssm", region_name=REGION).put_parameter(
+        Name="/prj/api_key", Value="from-ssm", Type="SecureString"
+    )
+    boto3.client("secretsmanager", region_name=REGION).create_secret(
+        Name="prj/token", SecretString="from-sm"
+    )
+    secrets = settings.Secrets(
+        store="sm",
+        user={
+            "API_KEY": settings.UserSecretSpec(name="/prj/api_key", store="ssm"),
+            "TOKEN": settings.UserSecretSpec(name="prj/token"),
+        },
+    )
+    sc = SecretsContext.from_settings(secrets, base_settings)
+    assert sc.user_store.read_many(sc.user, required=True) == {
+        "API_KEY": "from-ssm",
+        "TOKEN": "from-sm",
+    }
+
+
+@mock_aws
+def test_read_stored_values_sm_full_and_partial_arn():
+    sm = boto3.client("secretsmanager", region_name=REGION)
+    arn = sm.create_secret(Name="prj/a", SecretString="a")["ARN"]
+    partial = arn[:-7]  # 末尾の -xxxxxx を除いた部分 ARN
+    values = read_stored_values([arn, partial], "sm", REGION, required=True)
+    assert values == {arn: "a", partial: "a"}
+
+
+@mock_aws
+def test_read_stored_values_ssm_version_and_arn():
+    ssm = boto3.client("ssm", region_name=REGION)
+    ssm.put_parameter(Name="/prj/p", Value="v1", Type="SecureString")
+    ssm.put_parameter(Name="/prj/p", Value="v2", Type="SecureString", Overwrite=True)
+    arn = ssm.get_parameter(Name="/prj/p")["Parameter"]["ARN"]
+    values = read_stored_values(
+        ["/prj/p:1", "/prj/p", arn], "ssm", REGION, required=True
+    )
+    assert values == {"/prj/p:1": "v1", "/prj/p": "v2", arn: "v2"}
+
+
+@mock_aws
+def test_read_stored_values_unmatched_id_is_missing(monkeypatch):
+    """結果に対応付かない ID は黙って落とさず、未存在として報告する."""
+
+    class Ssm:
+        def get_parameters(self, Names, WithDecryption):
+            # どの ID にも対応しない結果だけを返す
+            return {"Parameters": [{"Name": "/other", "Value": "x"}]}
+
+    monkeypatch.setattr(
+        "pocket.secret_store.aws_clients.client", lambda *a, **kw: Ssm()
+    )
+    with pytest.raises(ClientError, match="/prj/p:label"):
+        read_stored_values(["/prj/p:label"], "ssm", REGION, required=True)
+
+
+_SSM_ARN = "arn:aws:ssm:%s:123456789012:parameter/prj/p" % REGION
+_LATEST = {"Name": "/prj/p", "Value": "v2", "Version": 2, "ARN": _SSM_ARN}
+_PINNED = {"Name": "/prj/p", "Value": "v1", "Version": 1, "ARN": _SSM_ARN}
+
+
+@pytest.mark.parametrize(
+    "parameters",
+    [
+        [_LATEST, _PINNED],
+        [_PINNED, _LATEST],
+        [_LATEST, {**_PINNED, "Selector": ":1"}],
+    ],
+)
+def test_ssm_versioned_result_does_not_shadow_latest(monkeypatch, parameters):
+    """version 付きの結果がどの順で返っても、名前 / ARN は最新の値を指す。"""
+    from pocket import secret_store
+
+    class FakeSsm:
+        def get_parameters(self, Names, WithDecryption):
+            return {"Parameters": parameters, "InvalidParameters": []}
+
+    monkeypatch.setattr(secret_store.aws_clients, "client", lambda *a, **kw: FakeSsm())
+    values = read_stored_values(
+        ["/prj/p:1", "/prj/p", _SSM_ARN], "ssm", REGION, required=True
+    )
+    assert values == {"/prj/p:1": "v1", "/prj/p": "v2", _SSM_ARN: "v2"}
@@ -0,0 +1,209 @@
+"""AWS Parameters and Secrets Lambda Extension 経由の secret 読み出し。
+
+extension の代わりに localhost に同じ HTTP API を返すサーバーを立て、
+POCKET_SECRETS_EXTENSION_PORT がある Lambda と同じ経路を通す。
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import boto3
+import pytest
+import yaml
+from botocore.exceptions import ClientError
+from moto import mock_aws
+from pocket_cli.resources.aws.cloudformation import ContainerStack
+
+from pocket import settings
+from pocket.context import Context, SecretsContext
+from pocket.resources.aws import secrets_extension
+from pocket.runtime import _read_rds_secret_string_from_store
+from pocket.secret_store import read_stored_value, read_stored_values
+
+REGION = "ap-southeast-1"
+TOKEN = "session-token"
+
+
+class _FakeExtension:
+    def __init__(self):
+        self.secrets: dict[str, str] = {}
+        self.parameters: dict[str, str] = {}
+        self.requests: list[str] = []
+        # 起動直後の extension のように、最初の n 回は準備中のエラーを返す
+        self.not_ready = 0
+
+
+@pytest.fixture
+def extension(monkeypatch):
+    fake = _FakeExtension()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urllib.parse.urlparse(self.path)
+            query = dict(urllib.parse.parse_qsl(url.query))
+            fake.requests.append(url.path)
+            if fake.not_ready:
+                fake.not_ready -= 1
+                return self._send(400, {"message": "extension is not ready"})
+            if self.headers.get("X-Aws-Parameters-Secrets-Token") != TOKEN:
+                return self._send(403, {"message": "missing token"})
+            if url.path == "/secretsmanager/get":
+                value = fake.secrets.get(query["secretId"])
+                if value is None:
+                    return self._send(400, {"__type": "ResourceNotFoundException"})
+                return self._send(
+                    200, {"ARN": "arn:" + query["secretId"], "SecretString": value}
+                )
+            if url.path == "/systemsmanager/parameters/get":
+                value = fake.parameters.get(query["name"])
+                if value is None:
+                    return self._send(400, {"__type": "ParameterNotFound"})
+                return self._send(200, {"Parameter": {"Value": value}})
+            return self._send(404, {"message": "unknown path"})
+
+        def _send(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("localhost", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv(
+        secrets_extension.SECRETS_EXTENSION_PORT_ENV, str(server.server_address[1])
+    )
+    monkeypatch.setenv("AWS_SESSION_TOKEN", TOKEN)
+    monkeypatch.setenv("AWS_REGION", REGION)
+    yield fake
+    server.shutdown()
+    server.server_close()
+
+
+def test_serves_region_only_own_region(extension):
+    assert secrets_extension.serves_region(REGION)
+    assert not secrets_extension.serves_region("us-east-1")
+
+
+def test_serves_region_requires_port(monkeypatch):
+    monkeypatch.setenv(secrets_extension.SECRETS_EXTENSION_PORT_ENV, "")
+    assert not secrets_extension.serves_region(REGION)
+
+
+@pytest.mark.parametrize("store", ["ssm", "sm"])
+def test_read_stored_values_via_extension(extension, store):
+    values = extension.parameters if store == "ssm" else extension.secrets
+    values["/prj/a"] = "a"
+    assert read_stored_values(["/prj/a", "/prj/missing"], store, REGION) == {
+        "/prj/a": "a",
+        "/prj/missing": None,
+    }
+    assert read_stored_value("/prj/a", store, REGION) == "a"
+
+
+@pytest.mark.parametrize(
+    "store, code", [("ssm", "ParameterNotFound"), ("sm", "ResourceNotFoundException")]
+)
+def test_read_stored_values_via_extension_required(extension, store, code):
+    with pytest.raises(ClientError) as ei:
+        read_stored_values(["/prj/missing"], store, REGION, required=True)
+    assert ei.value.response["Error"]["Code"] == code
+
+
+def test_not_ready_extension_is_retried(extension):
+    extension.secrets["prj/a"] = "a"
+    extension.not_ready = 3
+    res = secrets_extension.get_secret_value("prj/a")
+    assert res is not None and res["SecretString"] == "a"
+    assert len(extension.requests) == 4
+
+
+def test_extension_error_is_raised(extension, monkeypatch):
+    monkeypatch.setenv("AWS_SESSION_TOKEN", "wrong")
+    monkeypatch.setattr(secrets_extension, "_CONNECT_RETRY_INTERVAL", 0)
+    with pytest.raises(secrets_extension.SecretsExtensionError):
+        secrets_extension.get_secret_value("prj/a")
+    # 準備中と区別できないエラーも、再試行を使い切ってから送出する
+    assert len(extension.requests) == secrets_extension._CONNECT_ATTEMPTS
+
+
+def test_pocket_store_reads_via_extension(extension, base_settings):
+    sc = SecretsContext.from_settings(settings.Secrets(store="sm"), base_settings)
+    extension.secrets[sc.pocket_key] = json.dumps(
+        {sc.stage: {sc.project_name: {"SECRET_KEY": "value"}}}
+    )
+    store = sc.pocket_store
+    assert isinstance(store, secrets_extension.ExtensionSecretsManager)
+    assert store.secrets == {"SECRET_KEY": "value"}
+    assert extension.requests == ["/secretsmanager/get"]
+
+
+def test_pocket_store_writes_from_direct_read(extension, base_settings):
+    sc = SecretsContext.from_settings(settings.Secrets(store="sm"), base_settings)
+    with mock_aws():
+        sm = boto3.client("secretsmanager", region_name=REGION)
+        sm.create_secret(
+            Name=sc.pocket_key,
+            SecretString=json.dumps(
+                {sc.stage: {sc.project_name: {"A": "new", "B": "b"}}}
+            ),
+        )
+        # extension の cache は API より古い
+        extension.secrets[sc.pocket_key] = json.dumps(
+            {sc.stage: {sc.project_name: {"A": "old"}}}
+        )
+        store = sc.pocket_store
+        assert store.secrets == {"A": "old"}
+        store.delete_secret_keys({"B"})
+        data = json.loads(sm.get_secret_value(SecretId=sc.pocket_key)["SecretString"])
+        assert data[sc.stage][sc.project_name] == {"A": "new"}
+
+
+def test_rds_secret_via_extension(extension, monkeypatch):
+    monkeypatch.setenv("POCKET_RDS_SECRET_ARN", "arn:rds")
+    extension.secrets["arn:rds"] = '{"username": "u"}'
+    assert _read_rds_secret_string_from_store() == '{"username": "u"}'
+    monkeypatch.setenv("POCKET_RDS_SECRET_ARN", "arn:missing")
+    with pytest.raises(RuntimeError):
+        _read_rds_secret_string_from_store()
+
+
+@mock_aws
+def test_template_renders_extension_envs(use_toml, tmp_path):
+    toml_path = tmp_path / "pocket.toml"
+    toml_path.write_text(
+        """
+[general]
+region = "ap-southeast-1"
+project_name = "testprj"
+stages = ["dev"]
+
+[container.main]
+dockerfile_path = "Dockerfile"
+
+[container.main.secrets_extension]
+ttl = 60
+
+[container.main.handlers.web]
+command = "myapp-lambda"
+"""
+    )
+    use_toml(str(toml_path))
+    context = Context.from_toml(stage="dev")
+    yaml_str = ContainerStack(context.container["main"]).yaml
+    envs = yaml.safe_load(yaml_str)["Resources"]["WebLambdaFunction"]["Properties"][
+        "Environment"
+    ]["Variables"]
+    assert envs[secrets_extension.SECRETS_EXTENSION_PORT_ENV] == "2773"
+    assert envs["PARAMETERS_SECRETS_EXTENSION_HTTP_PORT"] == "2773"
+    assert envs["SECRETS_MANAGER_TTL"] == "60"
+    assert envs["SSM_PARAMETER_STORE_TTL"] == "60"
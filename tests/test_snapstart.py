@@ -0,0 +1,115 @@
+"""SnapStart の before_snapshot / after_restore (snapshot の前後を手元で再現する)。"""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from pocket import aws_clients, runtime
+from pocket.runtime import (
+    SNAPSTART_SECRETS_ENV,
+    after_restore,
+    before_snapshot,
+    register_snapstart_hooks,
+    set_envs_from_secrets,
+)
+
+
+@pytest.fixture
+def lambda_env(monkeypatch):
+    """secret 1 件と DSQL を持つ Lambda の INIT を再現する。"""
+    state = {"secret": "v1", "tokens": 0}
+    for key in ("API_KEY", "POCKET_DSQL_TOKEN", "POCKET_ENVS_SECRETS_LOADED"):
+        monkeypatch.setenv(key, "")
+    monkeypatch.setenv("POCKET_STAGE", "dev")
+    monkeypatch.setenv("POCKET_DSQL_ENDPOINT", "abc.dsql.ap-northeast-1.on.aws")
+    monkeypatch.setenv("POCKET_DSQL_REGION", "ap-northeast-1")
+    monkeypatch.setattr(
+        runtime, "get_secrets", lambda stage=None: {"API_KEY": state["secret"]}
+    )
+    monkeypatch.setattr(runtime, "_read_rds_secret_string", lambda: None)
+    monkeypatch.setattr(
+        runtime,
+        "_read_secrets_and_rds_secret",
+        lambda stage: ({"API_KEY": state["secret"]}, None),
+    )
+
+    class FakeDsqlClient:
+        def generate_db_connect_admin_auth_token(self, endpoint, region):
+            state["tokens"] += 1
+            return "token-%d" % state["tokens"]
+
+    monkeypatch.setattr("boto3.client", lambda *a, **k: FakeDsqlClient())
+    monkeypatch.setattr(runtime, "_loaded_secret_keys", set())
+    runtime.reset_snapstart_hooks()
+    yield state
+    runtime.reset_snapstart_hooks()
+
+
+def test_snapshot_lifecycle_reloads_secrets(lambda_env):
+    calls = []
+    register_snapstart_hooks(
+        before=[lambda: calls.append("before")], after=[lambda: calls.append("after")]
+    )
+    set_envs_from_secrets("dev")
+    assert os.environ["API_KEY"] == "v1"
+    assert os.environ["POCKET_DSQL_TOKEN"] == "token-1"
+
+    before_snapshot()
+    assert calls == ["before"]
+    assert "API_KEY" not in os.environ
+    assert "POCKET_DSQL_TOKEN" not in os.environ
+    assert "POCKET_ENVS_SECRETS_LOADED" not in os.environ
+    assert aws_clients._clients == {}
+    # cache に載せた secret も snapshot に残さない
+    assert runtime._secret_caches == {}
+
+    # snapshot から restore されるまでの間に secret がローテーションされた
+    lambda_env["secret"] = "v2"
+    after_restore()
+    assert calls == ["before", "after"]
+    assert os.environ["API_KEY"] == "v2"
+    assert os.environ["POCKET_DSQL_TOKEN"] == "token-2"
+    assert os.environ["POCKET_ENVS_SECRETS_LOADED"] == "true"
+    assert runtime.get_secret("API_KEY") == "v2"
+
+
+def test_snapshot_lifecycle_keep_secrets(lambda_env, monkeypatch):
+    monkeypatch.setenv(SNAPSTART_SECRETS_ENV, "keep")
+    set_envs_from_secrets("dev")
+    before_snapshot()
+    assert os.environ["API_KEY"] == "v1"
+    assert os.environ["POCKET_ENVS_SECRETS_LOADED"] == "true"
+
+    lambda_env["secret"] = "v2"
+    after_restore()
+    # secret は snapshot のまま、短命の DSQL トークンだけ作り直す
+    assert os.environ["API_KEY"] == "v1"
+    assert os.environ["POCKET_DSQL_TOKEN"] == "token-2"
+
+
+def test_invalid_snapstart_secrets_mode(lambda_env, monkeypatch):
+    monkeypatch.setenv(SNAPSTART_SECRETS_ENV, "drop")
+    with pytest.raises(ValueError):
+        before_snapshot()
+
+
+def test_register_outside_snapstart_is_noop(lambda_env, monkeypatch):
+    monkeypatch.delenv("AWS_LAMBDA_INITIALIZATION_TYPE", raising=False)
+    assert register_snapstart_hooks() is False
+
+
+def test_register_under_snapstart(lambda_env, monkeypatch):
+    import snapshot_restore_py
+
+    registered = []
+    monkeypatch.setattr(
+        snapshot_restore_py, "register_before_snapshot", registered.append
+    )
+    monkeypatch.setattr(
+        snapshot_restore_py, "register_after_restore", registered.append
+    )
+    monkeypatch.setenv("AWS_LAMBDA_INITIALIZATION_TYPE", "snap-start")
+    assert register_snapstart_hooks() is True
+    assert registered == [before_snapshot, after_restore]
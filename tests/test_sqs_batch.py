@@ -0,0 +1,128 @@
+"""SQS record の並行処理 (pocket.sqs_batch) のテスト。"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+from moto import mock_aws
+
+from pocket.context import Context
+from pocket.settings import Settings
+from pocket.sqs_batch import SQS_CONCURRENCY_ENV, get_concurrency, process_records
+
+
+def _records(n):
+    return [{"messageId": f"m{i}", "body": str(i)} for i in range(n)]
+
+
+def _fail_odd(record):
+    if int(record["body"]) % 2:
+        raise ValueError(record["body"])
+
+
+def test_sequential_runs_in_caller_thread():
+    threads = []
+
+    def func(record):
+        threads.append(threading.current_thread())
+        _fail_odd(record)
+
+    failures = process_records(_records(4), func)
+    assert [r["messageId"] for r, _ in failures] == ["m1", "m3"]
+    assert set(threads) == {threading.current_thread()}
+
+
+def test_concurrent_failures_keep_record_order():
+    def func(record):
+        # 後ろの record ほど早く終わらせ、完了順と records の順をずらす
+        time.sleep(0.01 * (10 - int(record["body"])))
+        _fail_odd(record)
+
+    failures = process_records(_records(10), func, concurrency=5)
+    assert [r["messageId"] for r, _ in failures] == ["m1", "m3", "m5", "m7", "m9"]
+    assert [str(e) for _, e in failures] == ["1", "3", "5", "7", "9"]
+
+
+def test_concurrent_records_overlap():
+    def func(record):
+        time.sleep(0.1)
+
+    start = time.perf_counter()
+    assert process_records(_records(8), func, concurrency=8) == []
+    assert time.perf_counter() - start < 0.1 * 4
+
+
+def test_worker_exit_runs_in_each_worker():
+    exited = []
+
+    def on_exit():
+        exited.append(threading.current_thread().name)
+
+    process_records(_records(10), lambda r: None, concurrency=3, on_worker_exit=on_exit)
+    assert sorted(exited) == ["pocket-sqs-0", "pocket-sqs-1", "pocket-sqs-2"]
+
+
+def test_system_exit_in_worker_is_a_failure():
+    def func(record):
+        if record["body"] == "2":
+            raise SystemExit(1)
+
+    failures = process_records(_records(3), func, concurrency=2)
+    assert [r["messageId"] for r, _ in failures] == ["m2"]
+    assert isinstance(failures[0][1], SystemExit)
+
+
+def test_get_concurrency(monkeypatch):
+    monkeypatch.delenv(SQS_CONCURRENCY_ENV, raising=False)
+    assert get_concurrency() == 1
+    monkeypatch.setenv(SQS_CONCURRENCY_ENV, "4")
+    assert get_concurrency() == 4
+
+
+def _settings(concurrency):
+    return Settings.model_validate(
+        {
+            "stage": "dev",
+            "general": {
+                "region": "ap-southeast-1",
+                "project_name": "testprj",
+                "stages": ["dev"],
+            },
+            "container": {
+                "main": {
+                    "dockerfile_path": "tests/sampleprj/Dockerfile",
+                    "handlers": {
+                        "sqsmanagement": {
+                            "command": "pocket.django.lambda_handlers."
+                            "sqs_management_command_report_failures_handler",
+                            "sqs": {"concurrency": concurrency},
+                        },
+                    },
+                }
+            },
+        }
+    )
+
+
+def test_concurrency_must_be_positive():
+    with pytest.raises(ValueError, match="greater than or equal to 1"):
+        _settings(0)
+
+
+@mock_aws
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_concurrency_env_in_template(concurrency):
+    from pocket_cli.resources.aws.cloudformation import ContainerStack
+
+    context = Context.from_settings(_settings(concurrency))
+    container = context.container["main"]
+    sqs = container.handlers["sqsmanagement"].sqs
+    assert sqs is not None
+    assert sqs.concurrency == concurrency
+    yaml = ContainerStack(container).yaml
+    if concurrency == 1:
+        assert SQS_CONCURRENCY_ENV not in yaml
+    else:
+        assert f'"{SQS_CONCURRENCY_ENV}": "4"' in yaml
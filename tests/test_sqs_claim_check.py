@@ -0,0 +1,210 @@
+"""SQS の大きな message body の S3 claim check (pocket.sqs_claim_check) のテスト。"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import boto3
+import pytest
+from moto import mock_aws
+from pydantic import ValidationError
+
+from pocket.command_handler import BaseCommandHandler
+from pocket.context import Context, SqsClaimCheckContext
+from pocket.settings import Settings
+from pocket.sqs_claim_check import (
+    CLAIM_CHECK_KEY,
+    offload_body,
+    parse_pointer,
+    resolved_body,
+)
+
+BUCKET = "dev-testprj-pocket"
+PREFIX = "pocket/sqs-claim-check/"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    with mock_aws():
+        monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def _keys(s3):
+    return [o["Key"] for o in s3.list_objects_v2(Bucket=BUCKET).get("Contents", [])]
+
+
+def _offload(body, threshold=100):
+    return offload_body(body, bucket_name=BUCKET, prefix=PREFIX, threshold=threshold)
+
+
+def test_small_body_is_sent_as_is(s3):
+    body = json.dumps({"command": "noop", "args": [], "kwargs": {}})
+    assert _offload(body) == body
+    assert parse_pointer(body) is None
+    assert _keys(s3) == []
+
+
+def test_large_body_round_trip(s3):
+    body = json.dumps({"command": "bulk", "args": list(range(100)), "kwargs": {}})
+    message = _offload(body)
+    pointer = parse_pointer(message)
+    assert pointer is not None
+    assert pointer["bucket"] == BUCKET
+    assert pointer["key"].startswith(PREFIX)
+    assert pointer["size"] == len(body)
+    with resolved_body(message) as resolved:
+        assert resolved == body
+        assert _keys(s3) == [pointer["key"]]
+    assert _keys(s3) == []
+
+
+def test_object_is_kept_when_processing_fails(s3):
+    message = _offload("x" * 1000)
+    with pytest.raises(RuntimeError), resolved_body(message):
+        raise RuntimeError("command failed")
+    pointer = parse_pointer(message)
+    assert pointer is not None
+    assert _keys(s3) == [pointer["key"]]
+
+
+def test_ordinary_body_with_marker_is_not_a_pointer():
+    body = json.dumps({"command": CLAIM_CHECK_KEY, "args": [], "kwargs": {}})
+    assert parse_pointer(body) is None
+
+
+class SpecHandler(BaseCommandHandler):
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.specs = []
+
+    def build_argv(self, spec):
+        self.specs.append(spec)
+        if self.fail:
+            raise ValueError("bad spec")
+        return ["true"]
+
+    def on_start(self, spec):
+        pass
+
+    def on_finish(self, spec, exit_code):
+        pass
+
+    def on_crash(self, spec, exc):
+        pass
+
+
+@pytest.mark.parametrize("fail", [False, True])
+def test_command_handler_resolves_pointer(s3, fail):
+    spec = {"job_id": "j1", "ids": list(range(100))}
+    message = _offload(json.dumps(spec))
+    handler = SpecHandler(fail=fail)
+    result = handler({"Records": [{"body": message, "messageId": "m1"}]}, None)
+    assert handler.specs == [spec]
+    if fail:
+        assert result == {"batchItemFailures": [{"itemIdentifier": "m1"}]}
+        assert len(_keys(s3)) == 1
+    else:
+        assert result == {"batchItemFailures": []}
+        assert _keys(s3) == []
+
+
+def test_django_sqs_handler_resolves_pointer():
+    source = Path("pocket/django/lambda_handlers.py").read_text()
+    assert 'with resolved_body(record["body"]) as body:' in source
+
+
+def _settings(s3: bool = True, **claim_check) -> dict:
+    data: dict = {
+        "stage": "dev",
+        "general": {
+            "region": "ap-northeast-1",
+            "project_name": "testprj",
+            "stages": ["dev"],
+        },
+        "container": {
+            "main": {
+                "dockerfile_path": "Dockerfile",
+                "handlers": {
+                    "sqsmanagement": {
+                        "command": "pocket.django.lambda_handlers."
+                        "sqs_management_command_report_failures_handler",
+                        "sqs": {"claim_check": claim_check},
+                    }
+                },
+            }
+        },
+    }
+    if s3:
+        data["s3"] = {}
+    return data
+
+
+def test_claim_check_requires_s3():
+    with pytest.raises(ValidationError, match="claim_check requires s3"):
+        Settings.model_validate(_settings(s3=False))
+
+
+def test_claim_check_must_outlive_dead_letter_queue():
+    with pytest.raises(ValidationError, match="expiration_days must be longer"):
+        Settings.model_validate(_settings(expiration_days=14))
+
+
+def test_claim_check_context_and_lifecycle_rule():
+    context = Context.from_settings(Settings.model_validate(_settings(threshold=1000)))
+    sqs = context.container["main"].handlers["sqsmanagement"].sqs
+    assert sqs is not None and sqs.claim_check is not None
+    assert context.s3 is not None
+    assert sqs.claim_check.bucket_name == context.s3.bucket_name
+    assert sqs.claim_check.threshold == 1000
+    (rule,) = context.s3.lifecycle_rules
+    assert rule.id == "pocket-sqs-claim-check-main-sqsmanagement"
+    assert rule.prefix == PREFIX
+    assert rule.expiration_days == 15
+
+
+@pytest.fixture
+def django_utils():
+    from django.conf import settings as dj_settings
+
+    if not dj_settings.configured:
+        dj_settings.configure(DATABASES={}, INSTALLED_APPS=[])
+    from pocket.django import utils
+
+    return utils
+
+
+@pytest.mark.parametrize("queue_key", ["sqsmanagement", "main_sqsmanagement"])
+def test_get_claim_check_from_context(django_utils, monkeypatch, queue_key):
+    context = Context.from_settings(Settings.model_validate(_settings()))
+    monkeypatch.setattr(django_utils, "get_context", lambda stage: context)
+    monkeypatch.setenv("POCKET_STAGE", "dev")
+    monkeypatch.setenv("POCKET_CONTAINER", "main")
+    claim_check = django_utils._get_claim_check(queue_key)
+    assert claim_check is not None and claim_check.prefix == PREFIX
+    assert django_utils._get_claim_check("other") is None
+
+
+def test_call_command_sends_pointer(django_utils, s3, monkeypatch):
+    sqs = boto3.client("sqs", region_name="us-east-1")
+    url = sqs.create_queue(QueueName="sqsmanagement")["QueueUrl"]
+    monkeypatch.setenv("POCKET_SQSMANAGEMENT_QUEUEURL", url)
+    claim_check = SqsClaimCheckContext(
+        bucket_name=BUCKET,
+        region="us-east-1",
+        prefix=PREFIX,
+        threshold=100,
+        expiration_days=15,
+    )
+    monkeypatch.setattr(django_utils, "_get_claim_check", lambda key: claim_check)
+    django_utils.pocket_call_command("bulk", args=list(range(100)))
+    django_utils.pocket_call_command_many([{"command": "noop"}])
+    messages = sqs.receive_message(QueueUrl=url, MaxNumberOfMessages=10)["Messages"]
+    bodies = sorted((m["Body"] for m in messages), key=len)
+    assert json.loads(bodies[0])["command"] == "noop"
+    with resolved_body(bodies[1]) as body:
+        assert json.loads(body)["args"] == list(range(100))
+    assert _keys(s3) == []